@@ -0,0 +1,133 @@
+import logging
+import os
+
+from PIL import ImageColor
+
+from .font_registry import BUNDLED_FONTS_DIR as CAPTIONS_FONTS_DIR, load_font
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {play_res_x}
+PlayResY: {play_res_y}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+{style}
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def color_to_ass(color, alpha=0):
+    """Convert a color name or hex string ('white', '#BA4A00') into an ASS &HAABBGGRR color"""
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return f"&H{alpha:02X}{blue:02X}{green:02X}{red:02X}"
+
+
+def seconds_to_ass_time(seconds):
+    """Convert seconds into the H:MM:SS.cc format used by ASS events"""
+    centiseconds = int(round(max(seconds, 0) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    mins, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{mins:02d}:{secs:02d}.{centiseconds:02d}"
+
+
+def escape_ass_text(text):
+    """Escape caption text so libass does not read it as override tags"""
+    return text.replace("\\", "/").replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def get_font_family(font_path):
+    """Return the family name libass will look up for a bundled font file"""
+    try:
+        return load_font(font_path, 20).getname()[0]
+    except Exception as e:
+        logging.warning(f"Could not read font family from {font_path}: {e}")
+        return "Arial"
+
+
+def ass_font_size(font_path, font_size):
+    """ImageMagick sizes text by em while libass sizes it by line height, so rescale to keep glyphs the same size"""
+    try:
+        ascent, descent = load_font(font_path, 100).getmetrics()
+        return round(font_size * (ascent + descent) / 100, 1)
+    except Exception:
+        return round(font_size, 1)
+
+
+def write_ass(subtitles, output_path, video_width, video_height, font_path=None, font_size=60,
+              primary_color='white', outline_color='black', outline_width=None, caption_width=540,
+              position=('center', 0.4), time_offset=0, anchor='top', uppercase=True):
+    """Write caption cues to an ASS file styled like the TextClip captions from VideoCaptioner.
+
+    Args:
+        subtitles (list): (start_seconds, end_seconds, text) tuples
+        output_path (str): Where to save the .ass file
+        video_width (int): Width of the video the captions are burned into
+        video_height (int): Height of the video the captions are burned into
+        font_path (str, optional): Font file, normally one of src/captions/fonts
+        font_size (float, optional): Caption font size. Defaults to 60
+        primary_color (str, optional): Text color. Defaults to 'white'
+        outline_color (str, optional): Stroke color. Defaults to 'black'
+        outline_width (float, optional): Stroke width. Defaults to font_size / 15
+        caption_width (int, optional): Width of the caption box before the 80% margin. Defaults to 540
+        position (tuple, optional): Relative ('center', y) position of the caption anchor. Defaults to ('center', 0.4)
+        time_offset (float, optional): Seconds added to every cue, for captions that start mid-video
+        anchor (str, optional): 'top' to place the top of the caption at position, 'bottom' for its bottom
+            line, so captions of any number of lines stay clear of the frame edge. Defaults to 'top'
+        uppercase (bool, optional): Uppercase the text like the short-form captions. Defaults to True
+
+    Returns:
+        str: Path to the written ASS file
+    """
+    # Same sizing as VideoCaptioner.create_shadow_text
+    text_size = font_size * 1.1
+    outline_width = font_size / 15 if outline_width is None else outline_width
+    box_width = caption_width * 0.8
+    margin_h = max(int((video_width - box_width) / 2), 0)
+    if anchor == 'bottom':
+        alignment, margin_v = 2, int(video_height * (1 - position[1]))
+    else:
+        alignment, margin_v = 8, int(video_height * position[1])
+
+    font_name = get_font_family(font_path) if font_path else "Arial"
+    fontsize = ass_font_size(font_path, text_size) if font_path else round(text_size, 1)
+
+    style = (
+        f"Style: Caption,{font_name},{fontsize},{color_to_ass(primary_color)},{color_to_ass(primary_color)},"
+        f"{color_to_ass(outline_color)},&H00000000,0,0,0,0,100,100,0,0,1,"
+        # ImageMagick strokes straddle the glyph edge, libass outlines sit outside it
+        f"{round(outline_width / 2, 2)},0,{alignment},{margin_h},{margin_h},{margin_v},1"
+    )
+
+    lines = [ASS_HEADER.format(play_res_x=int(video_width), play_res_y=int(video_height), style=style)]
+    for start, end, text in subtitles:
+        text = text.upper() if uppercase else text
+        lines.append(
+            f"Dialogue: 0,{seconds_to_ass_time(start + time_offset)},{seconds_to_ass_time(end + time_offset)},"
+            f"Caption,,0,0,0,,{escape_ass_text(text)}\n"
+        )
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+    logging.info(f"ASS captions written to {output_path}")
+    return output_path
+
+
+def _escape_filter_value(value):
+    # Escaped once for the filter option parser and once more for the filtergraph parser
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, f"\\{char}")
+    for char in ("\\", "'", "[", "]", ",", ";"):
+        value = value.replace(char, f"\\{char}")
+    return value
+
+
+def ass_filter(ass_path, fonts_dir=CAPTIONS_FONTS_DIR):
+    """Build the ffmpeg -vf argument that burns an ASS file in with libass"""
+    return f"ass=filename={_escape_filter_value(os.path.abspath(ass_path))}:fontsdir={_escape_filter_value(fonts_dir)}"
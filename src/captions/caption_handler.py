@@ -1,10 +1,13 @@
 import os
 import logging
-from PIL import Image, ImageFont, ImageDraw
+from PIL import Image, ImageDraw
 import numpy as np
+import uuid
 
 from .subtitle_generator import SubtitleGenerator
 from .video_captioner import VideoCaptioner
+from .ass_writer import write_ass
+from .font_registry import load_font
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -20,22 +23,67 @@ class CaptionHandler:
         self.video_captioner = VideoCaptioner()
         self.default_font = "Dacherry.ttf"
 
-    async def process(self, audio_file: str, captions_color="white", shadow_color="cyan", font_size=60, font=None, width=540):
-        subtitles_file = await self.subtitle_generator.generate_subtitles(audio_file)
+    async def process(self, audio_file: str, captions_color="white", shadow_color="cyan", font_size=60, font=None, width=540,
+                      mode="clips", highlight_color="yellow"):
+        """Transcribe audio_file and render caption clips for it.
+
+        Returns:
+            tuple: (SubtitleTrack, caption_clips)
+        """
+        subtitles = await self.subtitle_generator.generate_subtitles(audio_file)
+        if mode == "karaoke":
+            caption_clips = self.video_captioner.generate_karaoke_captions_to_video(
+                subtitles,
+                font=font,
+                captions_color=captions_color,
+                shadow_color=shadow_color,
+                highlight_color=highlight_color,
+                font_size=font_size,
+                width=width
+            )
+            return subtitles, caption_clips
+
         caption_clips = self.video_captioner.generate_captions_to_video(
-            subtitles_file,
+            subtitles,
             font=font,
             captions_color=captions_color,
             shadow_color=shadow_color,
             font_size=font_size,
             width=width
         )
-        return subtitles_file, caption_clips
+        return subtitles, caption_clips
+
+    async def process_ass(self, audio_file: str, captions_color="white", shadow_color="cyan", font_size=60, font=None, width=540,
+                          video_width=540, video_height=960, time_offset=0, ass_path=None):
+        """Generate subtitles and an ASS file that ffmpeg burns in during the final encode, instead of caption clips.
+
+        Returns:
+            tuple: (SubtitleTrack, ass_file), ass_file is None if subtitles could not be generated
+        """
+        subtitles = await self.subtitle_generator.generate_subtitles(audio_file)
+        if not subtitles:
+            return subtitles, None
+
+        font_path = self.video_captioner.get_font_path(font) if font else self.video_captioner.default_font
+        ass_path = ass_path or os.path.join(self.subtitle_generator.base_dir, 'assets', f'captions_{uuid.uuid4()}.ass')
+        ass_file = write_ass(
+            subtitles,
+            ass_path,
+            video_width,
+            video_height,
+            font_path=font_path,
+            font_size=font_size,
+            primary_color=captions_color,
+            outline_color=shadow_color,
+            caption_width=width,
+            time_offset=time_offset
+        )
+        return subtitles, ass_file
 
     def create_subtitle_clip(self, text, font_size, color, shadow_color, font_path, video_width, video_height):
         try:
             # Load font
-            font = ImageFont.truetype(font_path, int(font_size))
+            font = load_font(font_path, int(font_size))
             
             # Calculate max characters per line based on video width
             max_chars_per_line = int(video_width / (font_size * 0.6))  # Adjust multiplier as needed
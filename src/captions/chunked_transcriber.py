@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from ..media.pcm import iter_pcm_blocks, pcm_to_wav_bytes
+
+
+def find_silence_cut(samples, sample_rate, min_index, frame_ms=30, silence_db=-40, min_silence_ms=300):
+    """Pick a cut point in samples[min_index:] using a frame energy VAD.
+
+    Returns the middle of the longest run of silent frames (quieter than silence_db, or than the
+    10th percentile of the window if the audio never gets that quiet), or the quietest frame if no
+    run is at least min_silence_ms long.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    window = samples[min_index:]
+    n_frames = len(window) // frame
+    if n_frames == 0:
+        return len(samples)
+
+    frames = window[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    threshold = max(silence_db, np.percentile(energy_db, 10))
+    silent = energy_db <= threshold
+
+    # Longest run of silent frames
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    if len(run_starts):
+        longest = int(np.argmax(run_ends - run_starts))
+        if (run_ends[longest] - run_starts[longest]) * frame_ms >= min_silence_ms:
+            cut_frame = (run_starts[longest] + run_ends[longest]) // 2
+            return min_index + int(cut_frame) * frame
+
+    return min_index + int(np.argmin(energy_db)) * frame
+
+
+def iter_silence_chunks(media_path, sample_rate=16000, min_chunk_seconds=30, max_chunk_seconds=120):
+    """Stream audio and split it at silences into chunks of min_chunk_seconds to max_chunk_seconds.
+
+    At most max_chunk_seconds of audio (plus one block) is buffered at a time. media_path can also be
+    samples already decoded at sample_rate.
+
+    Yields:
+        tuple: (offset_seconds, samples)
+    """
+    max_samples = int(max_chunk_seconds * sample_rate)
+    min_samples = int(min_chunk_seconds * sample_rate)
+    buffer = np.zeros(0, dtype=np.float32)
+    offset = 0
+
+    blocks = [media_path] if isinstance(media_path, np.ndarray) else iter_pcm_blocks(media_path, sample_rate)
+    for block in blocks:
+        buffer = np.concatenate((buffer, block))
+        while len(buffer) >= max_samples:
+            cut = find_silence_cut(buffer[:max_samples], sample_rate, min_samples)
+            yield offset / sample_rate, buffer[:cut]
+            buffer = buffer[cut:]
+            offset += cut
+
+    if len(buffer):
+        yield offset / sample_rate, buffer
+
+
+class ChunkedTranscriber:
+    """Transcribes long audio in silence-aligned chunks with bounded concurrency.
+
+    The async transcribe function receives a chunk as WAV bytes and returns (start, end, word) tuples relative
+    to the chunk; they are shifted back by the chunk offset and stitched in order. Reading the next chunk
+    waits for a free slot, so memory stays bounded by max_concurrency chunks whatever the input length.
+    """
+
+    def __init__(self, transcribe_fn, max_concurrency=3, sample_rate=16000, min_chunk_seconds=30, max_chunk_seconds=120):
+        self.transcribe_fn = transcribe_fn
+        self.max_concurrency = max_concurrency
+        self.sample_rate = sample_rate
+        self.min_chunk_seconds = min_chunk_seconds
+        self.max_chunk_seconds = max_chunk_seconds
+
+    async def transcribe(self, media_path):
+        """Transcribe the audio track of media_path, or mono float32 samples at sample_rate.
+
+        Returns:
+            list: (start, end, word) tuples in seconds from the start of the file
+        """
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        chunks = iter_silence_chunks(media_path, self.sample_rate, self.min_chunk_seconds, self.max_chunk_seconds)
+        tasks = []
+
+        async def transcribe_chunk(offset, wav_bytes):
+            try:
+                words = await self.transcribe_fn(wav_bytes)
+                return [(start + offset, end + offset, word) for start, end, word in words]
+            finally:
+                semaphore.release()
+
+        reading = None
+        try:
+            while True:
+                await semaphore.acquire()
+                # Shielded so a cancellation doesn't leave next() running in its thread unnoticed
+                reading = asyncio.create_task(asyncio.to_thread(next, chunks, None))
+                chunk = await asyncio.shield(reading)
+                if chunk is None:
+                    semaphore.release()
+                    break
+                offset, samples = chunk
+                wav_bytes = pcm_to_wav_bytes(samples, self.sample_rate)
+                tasks.append(asyncio.create_task(transcribe_chunk(offset, wav_bytes)))
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if reading is not None:
+                # The generator can't be closed (and its ffmpeg reaped) while next() is still executing
+                await asyncio.gather(reading, return_exceptions=True)
+            chunks.close()
+
+        words = [word for chunk_words in results for word in chunk_words]
+        logging.info(f"Transcribed {len(tasks)} chunks ({len(words)} words) in {time.perf_counter() - start_time:.1f}s")
+        return words
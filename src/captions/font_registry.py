@@ -0,0 +1,105 @@
+import functools
+import logging
+import os
+import sys
+import threading
+
+from PIL import ImageFont
+
+BUNDLED_FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+
+
+def system_font_dirs():
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", "C:\\Windows")
+        return [os.path.join(windir, "Fonts"), os.path.join(home, "AppData", "Local", "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(home, ".fonts"), os.path.join(home, ".local", "share", "fonts")]
+
+
+@functools.lru_cache(maxsize=64)
+def load_font(font_path, size):
+    """Load a FreeType font once per (path, size) and keep it in an LRU cache"""
+    return ImageFont.truetype(font_path, int(size))
+
+
+class FontRegistry:
+    """Index of the bundled fonts (src/captions/fonts) and the system font directories.
+
+    Directories are scanned once, on first lookup. Files are indexed by file name straight away; family
+    and style names are only read from the files the first time a lookup does not match a file name.
+    """
+
+    def __init__(self, font_dirs=None):
+        self.font_dirs = font_dirs or [BUNDLED_FONTS_DIR] + system_font_dirs()
+        self._by_filename = None
+        self._by_family = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        by_filename = {}
+        for font_dir in self.font_dirs:
+            for root, _, files in os.walk(font_dir):
+                for file_name in sorted(files):
+                    if not file_name.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, file_name)
+                    # Earlier directories win, so bundled fonts shadow system fonts with the same name
+                    by_filename.setdefault(file_name.lower(), path)
+                    by_filename.setdefault(os.path.splitext(file_name)[0].lower(), path)
+        logging.info(f"Font registry indexed {len(by_filename) // 2} font files")
+        return by_filename
+
+    def _index_families(self):
+        by_family = {}
+        for path in dict.fromkeys(self._by_filename.values()):
+            try:
+                family, style = load_font(path, 12).getname()
+            except Exception:
+                continue
+            by_family.setdefault((family.lower(), (style or "regular").lower()), path)
+            by_family.setdefault((family.lower(), None), path)
+        return by_family
+
+    def find(self, font_name, style=None):
+        """Return the path of a font by file name ('Dacherry.ttf', 'Dacherry') or family ('Arial', style 'Bold').
+
+        Returns:
+            str: Path to the font file, None if no font matches
+        """
+        if not font_name:
+            return None
+        if os.path.isfile(font_name):
+            return font_name
+
+        with self._lock:
+            if self._by_filename is None:
+                self._by_filename = self._scan()
+            path = self._by_filename.get(os.path.basename(font_name).lower())
+            if path:
+                return path
+
+            if self._by_family is None:
+                self._by_family = self._index_families()
+        family = font_name.lower()
+        if style:
+            return self._by_family.get((family, style.lower()))
+        for default_style in ("regular", "book", "normal", "roman", None):
+            path = self._by_family.get((family, default_style))
+            if path:
+                return path
+        return None
+
+    def load(self, font_name, size):
+        """Find a font and load it at size, Pillow's default font if it can't be found"""
+        path = self.find(font_name)
+        if path:
+            return load_font(path, size)
+        logging.warning(f"Font {font_name} not found, using default font")
+        return ImageFont.load_default(int(size))
+
+
+font_registry = FontRegistry()
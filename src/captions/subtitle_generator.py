@@ -1,11 +1,19 @@
+import asyncio
 import logging
 import os
 import pysrt
-import uuid
+import numpy as np
 import whisper
 from whisper.utils import get_writer
 
 from .utils import convert_seconds_to_srt_time
+from .chunked_transcriber import ChunkedTranscriber
+from .subtitle_track import SubtitleTrack
+from ..media.pcm import pcm_to_wav_bytes
+from ..providers.llm_clients import async_openai
+
+# Longest 16 kHz WAV that fits in the 25 MB upload limit of whisper-1, longer audio is sent in chunks
+WHISPER_API_MAX_SECONDS = 800
 
 class SubtitleGenerator:
     def __init__(self):
@@ -13,131 +21,127 @@ class SubtitleGenerator:
         self.model = whisper.load_model("base")
         self.convert_seconds_to_srt_time = convert_seconds_to_srt_time
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.chunked_transcriber = ChunkedTranscriber(
+            lambda wav_bytes: self._transcribe_words(("chunk.wav", wav_bytes)),
+            max_concurrency=int(os.getenv('TRANSCRIPTION_MAX_CONCURRENCY', 3))
+        )
+
+    async def generate_subtitles(self, audio_file: str, srt_path: str = None):
+        """Transcribe audio into an in-memory SubtitleTrack with word timings.
+
+        Args:
+            audio_file (str or np.ndarray): Audio file to transcribe, or 16 kHz mono float32 samples
+            srt_path (str, optional): Also export the subtitles to this SRT file
 
-    async def generate_subtitles(self, audio_file: str):
+        Returns:
+            SubtitleTrack: The subtitles, None on failure
+        """
         try:
             subtitles = await self.speech_to_text(audio_file)
-            srt_file = pysrt.SubRipFile()
-
-            for index, (start, end, text) in enumerate(subtitles):
-                srt_file.append(pysrt.SubRipItem(index=index + 1, start=start, end=end, text=text))
-            
-            unique_id = uuid.uuid4()
-            output_dir = os.path.join(self.base_dir, 'assets')
-            output_file = os.path.join(output_dir, f'subtitles_{unique_id}.srt')
-            srt_file.save(output_file)
+            if srt_path:
+                subtitles.to_srt(srt_path)
             
-            logging.info("Subtitles generated and saved successfully.")
-            return output_file  # Return the path to the saved SRT file
+            logging.info("Subtitles generated successfully.")
+            return subtitles
         except Exception as e:
             logging.error(f"Error generating subtitles: {e}")
             return None
 
     async def speech_to_text(self, audio_file: str):
+        """Transcribe with Whisper and group the words into short caption cues (2 words, or less before a pause)"""
         try:
-            logging.info(f"Starting transcription for {audio_file}")
-            result = self.model.transcribe(audio_file, word_timestamps=True, verbose=True)
+            source = f"{len(audio_file) / 16000:.1f}s of PCM" if isinstance(audio_file, np.ndarray) else audio_file
+            logging.info(f"Starting transcription for {source}")
+            # Local Whisper is CPU bound, run it off the event loop
+            result = await asyncio.to_thread(self.model.transcribe, audio_file, word_timestamps=True, verbose=True)
             
             if not result.get('segments'):
                 logging.error("No segments found in transcription result")
-                return []
+                return SubtitleTrack.from_cues([])
             
             logging.info(f"Transcription completed with {len(result['segments'])} segments")
             
-            subtitles = []
+            cues = []
             
             # Process all segments, not just the first one
             for segment in result['segments']:
                 current_words = []
-                subtitle_start_time = None
                 
                 for i, word_info in enumerate(segment['words']):
-                    word_start_time = self.convert_seconds_to_srt_time(word_info['start'])
-                    word_end_time = self.convert_seconds_to_srt_time(word_info['end'])
-
-                    if subtitle_start_time is None:
-                        subtitle_start_time = word_start_time
-
-                    current_words.append(word_info['word'].strip())
+                    current_words.append((word_info['start'], word_info['end'], word_info['word'].strip()))
 
-                    if len(current_words) >= 2 or (i > 0 and word_start_time.ordinal - self.convert_seconds_to_srt_time(segment['words'][i-1]['end']).ordinal >= 600):
-                        formatted_text = " ".join(current_words)
-                        subtitles.append((subtitle_start_time, word_end_time, formatted_text))
+                    if len(current_words) >= 2 or (i > 0 and word_info['start'] - segment['words'][i-1]['end'] >= 0.6):
+                        cues.append(current_words)
                         current_words = []
-                        subtitle_start_time = None
 
                 if current_words:
-                    formatted_text = " ".join(current_words)
-                    subtitles.append((subtitle_start_time, word_end_time, formatted_text))
+                    cues.append(current_words)
 
-            logging.info(f"Generated {len(subtitles)} subtitles")
-            return subtitles
+            logging.info(f"Generated {len(cues)} subtitles")
+            return SubtitleTrack.from_word_groups(cues)
         except Exception as e:
             logging.error(f"Error in speech-to-text transcription: {e}")
-            return []
+            return SubtitleTrack.from_cues([])
 
-    async def generate_subtitles_for_translation(self, audio_file):
+    async def generate_subtitles_for_translation(self, audio_file, chunked=False):
         try:
-            subtitles = await self.speech_to_text_for_translation(audio_file)
-            srt_file = pysrt.SubRipFile()
-
-            for index, (start, end, text) in enumerate(subtitles):
-                srt_file.append(pysrt.SubRipItem(index=index + 1, start=start, end=end, text=text))
+            subtitles = await self.speech_to_text_for_translation(audio_file, chunked=chunked)
             
-            unique_id = uuid.uuid4()
-            output_dir = os.path.join(self.base_dir, 'assets')
-            output_file = os.path.join(output_dir, f'subtitles_{unique_id}.srt')
-            srt_file.save(output_file)
-            
-            logging.info("Subtitles generated and saved successfully.")
-            return output_file  # Return the path to the saved SRT file
+            logging.info("Subtitles generated successfully.")
+            return subtitles
         except Exception as e:
             logging.error(f"Error generating subtitles: {e}")
             return None
 
-    async def speech_to_text_for_translation(self, audio_file):
+    async def speech_to_text_for_translation(self, audio_file, chunked=False):
+        """Transcribe with OpenAI's whisper-1 and group the words into subtitles of up to 8 words.
+
+        Args:
+            audio_file (str or np.ndarray): Audio file (any video file when chunked is True), or 16 kHz mono
+                float32 samples
+            chunked (bool, optional): Stream the audio and transcribe it in silence-aligned chunks, keeps
+                memory flat and stays under the API upload limit for long videos. Defaults to False
+
+        Returns:
+            SubtitleTrack: Subtitles with two lines of up to 4 words each
+        """
         try:
-            audio_file = open(audio_file, "rb")  # Open the audio file
-            transcript = self.openai.audio.transcriptions.create(  # Use OpenAI's transcription method
-                file=audio_file,
-                model="whisper-1",
-                response_format="verbose_json",
-                timestamp_granularities=["word"]
-            )
-            subtitles = []
-            current_words = []
-            subtitle_start_time = None
-
-            for i, word_info in enumerate(transcript.words):
-                word_start_time = self.convert_seconds_to_srt_time(word_info.start)
-                word_end_time = self.convert_seconds_to_srt_time(word_info.end)
-
-                previous_word_end = self.convert_seconds_to_srt_time(transcript.words[i - 1].end)
-
-                if subtitle_start_time is None:
-                    subtitle_start_time = word_start_time
-
-                current_words.append(word_info.word.strip())
-
-                #check if current subtitle is long enough or if the next word is too long
-                if len(current_words) >= 8:
-                    formatted_text = " ".join(current_words[:4]) + "\n" + " ".join(current_words[4:])
-                    subtitles.append((subtitle_start_time, word_end_time, formatted_text))
-                    current_words = []
-                    subtitle_start_time = None
-
-            # Handle any remaining word
-            if current_words:
-                formatted_text = " ".join(current_words[:4])
-                if len(current_words) > 4:
-                    formatted_text += "\n" + " ".join(current_words[4:])
-                subtitles.append((subtitle_start_time, word_end_time, formatted_text))
+            if isinstance(audio_file, np.ndarray):
+                if chunked or len(audio_file) > WHISPER_API_MAX_SECONDS * 16000:
+                    words = await self.chunked_transcriber.transcribe(audio_file)
+                else:
+                    # Samples are wrapped in a WAV header in memory, no codec involved
+                    words = await self._transcribe_words(("audio.wav", pcm_to_wav_bytes(audio_file)))
+            elif chunked:
+                words = await self.chunked_transcriber.transcribe(audio_file)
+            else:
+                with open(audio_file, "rb") as f:  # Open the audio file
+                    words = await self._transcribe_words(f)
+
+            words = [(start, end, word.strip()) for start, end, word in words]
+            groups = [words[i:i + 8] for i in range(0, len(words), 8)]
+            subtitles = SubtitleTrack.from_word_groups(groups)
+            # Two lines of up to 4 words each
+            subtitles.texts = [
+                " ".join(w for _, _, w in group[:4]) + ("\n" + " ".join(w for _, _, w in group[4:]) if len(group) > 4 else "")
+                for group in groups
+            ]
 
             logging.info(f"Speech-to-text transcription completed.")
             return subtitles
         except Exception as e:
             logging.error(f"Error in speech-to-text transcription: {e}")
-            return []
+            return SubtitleTrack.from_cues([])
+
+    async def _transcribe_words(self, audio):
+        """Run whisper-1 on an open file or (filename, bytes) tuple and return (start, end, word) tuples"""
+        transcript = await async_openai().audio.transcriptions.create(  # Use OpenAI's transcription method
+            file=audio,
+            model="whisper-1",
+            response_format="verbose_json",
+            timestamp_granularities=["word"]
+        )
+        return [(word_info.start, word_info.end, word_info.word) for word_info in transcript.words]
 
     def generate_captions_to_video(self, subtitles_path, font=None, captions_color='#BA4A00', 
                                   shadow_color='white', font_size=60, width=540):
@@ -0,0 +1,93 @@
+import logging
+
+import numpy as np
+import pysrt
+
+
+class SubtitleTrack:
+    """Caption cues, and optionally their words, held in memory as float arrays of seconds.
+
+    This is what the subtitle generator hands to the caption renderers, the image keyword extractor and
+    the translation engine, so nothing has to be written to and re-parsed from an SRT file. Words are
+    stored flat, the words of cue i are word_offsets[i]:word_offsets[i + 1].
+    """
+
+    def __init__(self, starts, ends, texts, word_starts=None, word_ends=None, word_texts=None, word_offsets=None):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.texts = list(texts)
+        self.word_starts = np.asarray(word_starts if word_starts is not None else [], dtype=np.float64)
+        self.word_ends = np.asarray(word_ends if word_ends is not None else [], dtype=np.float64)
+        self.word_texts = list(word_texts or [])
+        self.word_offsets = np.asarray(word_offsets if word_offsets is not None else np.zeros(len(self.texts) + 1), dtype=np.int64)
+
+    @classmethod
+    def from_cues(cls, cues):
+        """Build a track from (start_seconds, end_seconds, text) tuples"""
+        cues = list(cues)
+        return cls([c[0] for c in cues], [c[1] for c in cues], [c[2] for c in cues])
+
+    @classmethod
+    def from_word_groups(cls, groups, separator=" "):
+        """Build a track from lists of (start, end, word) tuples, one list per cue"""
+        groups = [group for group in groups if group]
+        words = [word for group in groups for word in group]
+        return cls(
+            [group[0][0] for group in groups],
+            [group[-1][1] for group in groups],
+            [separator.join(word for _, _, word in group) for group in groups],
+            [word[0] for word in words],
+            [word[1] for word in words],
+            [word[2] for word in words],
+            np.concatenate(([0], np.cumsum([len(group) for group in groups]))).astype(np.int64)
+        )
+
+    @classmethod
+    def from_srt(cls, srt_path):
+        subs = pysrt.open(srt_path)
+        return cls([sub.start.ordinal / 1000 for sub in subs], [sub.end.ordinal / 1000 for sub in subs], [sub.text for sub in subs])
+
+    @property
+    def has_words(self):
+        return len(self.word_texts) > 0
+
+    @property
+    def duration(self):
+        return float(self.ends.max()) if len(self.ends) else 0.0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        """Iterate over (start_seconds, end_seconds, text) cues"""
+        return zip(self.starts.tolist(), self.ends.tolist(), self.texts)
+
+    def words(self, cue_index):
+        """(start, end, word) tuples of one cue"""
+        start, end = self.word_offsets[cue_index], self.word_offsets[cue_index + 1]
+        return list(zip(self.word_starts[start:end].tolist(), self.word_ends[start:end].tolist(), self.word_texts[start:end]))
+
+    def cue_at(self, t):
+        """Index of the cue shown at time t, or None between cues"""
+        index = int(np.searchsorted(self.starts, t, side='right')) - 1
+        if index < 0 or t >= self.ends[index]:
+            return None
+        return index
+
+    def with_texts(self, texts):
+        """Same timings with new cue texts (e.g. translated), word timings are dropped"""
+        return SubtitleTrack(self.starts.copy(), self.ends.copy(), texts)
+
+    def to_srt(self, srt_path):
+        """Optional SRT export"""
+        srt_file = pysrt.SubRipFile()
+        for index, (start, end, text) in enumerate(self, 1):
+            srt_file.append(pysrt.SubRipItem(
+                index=index,
+                start=pysrt.SubRipTime.from_ordinal(int(round(start * 1000))),
+                end=pysrt.SubRipTime.from_ordinal(int(round(end * 1000))),
+                text=text
+            ))
+        srt_file.save(srt_path)
+        logging.info(f"Subtitles exported to {srt_path}")
+        return srt_path
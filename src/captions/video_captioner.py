@@ -1,17 +1,20 @@
-from moviepy.editor import TextClip, CompositeVideoClip
+from moviepy.editor import TextClip, CompositeVideoClip, VideoClip
+import numpy as np
 import pysrt
 import logging
-import os
+
+from .word_atlas import WordAtlas
+from .font_registry import font_registry
+from .subtitle_track import SubtitleTrack
 
 class VideoCaptioner:
     def __init__(self):
         self.default_font = self.get_font_path("Dacherry.ttf")
 
     def get_font_path(self, font_name):
-        # Look for the font in the 'fonts' directory within the project
-        captions_root = os.path.dirname(os.path.abspath(__file__))
-        font_path = os.path.join(captions_root, "fonts", font_name)
-        if os.path.exists(font_path):
+        # Look for the font in the 'fonts' directory within the project, then in the system fonts
+        font_path = font_registry.find(font_name)
+        if font_path:
             return font_path
         else:
         
@@ -53,7 +56,10 @@ class VideoCaptioner:
 
             logging.info(f"Received subtitles: {type(subtitles)}")  # Debug log
 
-            if isinstance(subtitles, str):
+            if isinstance(subtitles, SubtitleTrack):
+                # In-memory track, cues are already (start_seconds, end_seconds, text)
+                subtitles = list(subtitles)
+            elif isinstance(subtitles, str):
                 # If subtitles is a string (file path), read the SRT file
                 subtitles = pysrt.open(subtitles)
             elif isinstance(subtitles, list):
@@ -100,3 +106,76 @@ class VideoCaptioner:
             logging.error(f"Error adding captions to video: {e}")
             logging.exception("Traceback:")  # This will log the full traceback
             return []
+
+    def generate_karaoke_captions_to_video(self,
+                                           subtitles,
+                                           font=None,
+                                           captions_color='white',
+                                           shadow_color='black',
+                                           highlight_color='yellow',
+                                           font_size=60,
+                                           width=540
+                                           ):
+        """Word-highlight captions rendered as a single clip.
+
+        Every distinct word is rasterized once per color state into a WordAtlas, frames are composed from
+        atlas slices and only recomposed when the cue or the active word changes.
+
+        Args:
+            subtitles (SubtitleTrack): Subtitles with word timings, from SubtitleGenerator.generate_subtitles
+
+        Returns:
+            list: A list with one caption clip, or an empty list on failure
+        """
+        font = self.get_font_path(font) if font else self.default_font
+        try:
+            if not subtitles or not subtitles.has_words:
+                logging.warning("Karaoke captions need word timings, no captions generated")
+                return []
+
+            fontsize = int(font_size * 1.1)
+            atlas = WordAtlas(
+                font,
+                fontsize,
+                {'base': (captions_color, shadow_color), 'active': (highlight_color, shadow_color)},
+                stroke_width=max(int(font_size / 15), 1)
+            )
+            atlas.build(word.upper() for word in subtitles.word_texts)
+            cue_words = [[word.upper() for _, _, word in subtitles.words(i)] for i in range(len(subtitles))]
+
+            box_width = int(width * 0.8)
+            layouts = [atlas.layout(words, box_width) for words in cue_words]
+            box_height = max(height for _, height in layouts)
+
+            blank = np.zeros((box_height, box_width, 4), dtype=np.float32)
+            cache = {'key': None, 'frame': blank}
+
+            def frame_at(t):
+                cue_index = subtitles.cue_at(t)
+                if cue_index is None or not cue_words[cue_index]:
+                    key = None
+                else:
+                    first, last = subtitles.word_offsets[cue_index], subtitles.word_offsets[cue_index + 1]
+                    active = int(np.searchsorted(subtitles.word_starts[first:last], t, side='right')) - 1
+                    key = (cue_index, max(active, 0))
+                if key != cache['key']:
+                    canvas = blank.copy()
+                    if key is not None:
+                        words = cue_words[key[0]]
+                        states = ['active' if i == key[1] else 'base' for i in range(len(words))]
+                        atlas.compose(canvas, words, layouts[key[0]][0], states)
+                    cache['key'], cache['frame'] = key, canvas
+                return cache['frame']
+
+            duration = subtitles.duration
+            mask = VideoClip(lambda t: frame_at(t)[..., 3], ismask=True, duration=duration)
+            karaoke_clip = (VideoClip(lambda t: (frame_at(t)[..., :3] * 255).astype(np.uint8), duration=duration)
+                            .set_mask(mask)
+                            .set_position(('center', 0.4), relative=True))
+
+            logging.info(f"Generated karaoke captions for {len(subtitles)} cues from {len(atlas.slices)} word bitmaps")
+            return [karaoke_clip]
+        except Exception as e:
+            logging.error(f"Error adding karaoke captions to video: {e}")
+            logging.exception("Traceback:")
+            return []
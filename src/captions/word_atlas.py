@@ -0,0 +1,121 @@
+import logging
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .font_registry import load_font
+
+
+class WordAtlas:
+    """Rasterizes every distinct word once per color state into one RGBA sheet.
+
+    Frames are then composed from slices of the sheet instead of rendering text per cue or per frame.
+    """
+
+    def __init__(self, font_path, font_size, states, stroke_width=0, max_sheet_width=2048):
+        """
+        Args:
+            font_path (str): Font file used to rasterize the words, None for Pillow's default font
+            font_size (int): Font size in pixels
+            states (dict): State name -> (fill_color, stroke_color), e.g. {'base': ('white', 'black')}
+            stroke_width (int, optional): Stroke width in pixels. Defaults to 0
+            max_sheet_width (int, optional): Width at which the packer starts a new shelf. Defaults to 2048
+        """
+        self.font = load_font(font_path, int(font_size)) if font_path else ImageFont.load_default(int(font_size))
+        self.states = states
+        self.stroke_width = int(stroke_width)
+        self.max_sheet_width = max_sheet_width
+        ascent, descent = self.font.getmetrics()
+        self.line_height = ascent + descent + 2 * self.stroke_width
+        self.space_width = int(self.font.getlength(' '))
+        self.sheet = np.zeros((0, 0, 4), dtype=np.uint8)
+        self.slices = {}  # (word, state) -> (x, y, w, h) in the sheet
+
+    def word_width(self, word):
+        return int(np.ceil(self.font.getlength(word))) + 2 * self.stroke_width
+
+    def build(self, words):
+        """Rasterize each distinct word once for every state and pack them into shelves of the sheet"""
+        keys = [(word, state) for word in dict.fromkeys(words) for state in self.states]
+        positions = {}
+        x = y = sheet_width = 0
+        for key in keys:
+            w = self.word_width(key[0])
+            if x > 0 and x + w > self.max_sheet_width:
+                x, y = 0, y + self.line_height
+            positions[key] = (x, y, w, self.line_height)
+            x += w
+            sheet_width = max(sheet_width, x)
+
+        sheet = Image.new("RGBA", (max(sheet_width, 1), y + self.line_height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(sheet)
+        for (word, state), (x, y, w, h) in positions.items():
+            fill, stroke = self.states[state]
+            draw.text(
+                (x + self.stroke_width, y + self.stroke_width),
+                word,
+                font=self.font,
+                fill=fill,
+                stroke_width=self.stroke_width,
+                stroke_fill=stroke
+            )
+
+        self.sheet = np.array(sheet)
+        self.slices = positions
+        logging.info(f"Built word atlas with {len(positions)} bitmaps ({sheet.width}x{sheet.height})")
+        return self
+
+    def get(self, word, state):
+        """Return the RGBA slice of the sheet for a word in the given state"""
+        x, y, w, h = self.slices[(word, state)]
+        return self.sheet[y:y + h, x:x + w]
+
+    def layout(self, words, box_width):
+        """Wrap words into centered lines that fit box_width.
+
+        Returns:
+            tuple: ([(x, y), ...] for each word, total height)
+        """
+        lines = [[]]
+        line_width = 0
+        for index, word in enumerate(words):
+            w = self.word_width(word)
+            needed = w if not lines[-1] else line_width + self.space_width + w
+            if lines[-1] and needed > box_width:
+                lines.append([index])
+                line_width = w
+            else:
+                lines[-1].append(index)
+                line_width = needed
+
+        positions = [None] * len(words)
+        for line_index, line in enumerate(lines):
+            widths = [self.word_width(words[i]) for i in line]
+            x = max((box_width - (sum(widths) + self.space_width * (len(line) - 1))) // 2, 0)
+            for i, w in zip(line, widths):
+                positions[i] = (x, line_index * self.line_height)
+                x += w + self.space_width
+        return positions, len(lines) * self.line_height
+
+    def compose(self, canvas, words, positions, states):
+        """Alpha-blend word slices onto an RGBA float canvas in place.
+
+        The sheet and the canvas hold straight (not premultiplied) alpha, as moviepy expects of a clip and its
+        mask, so the blended color is divided back by the resulting alpha.
+        """
+        height, width = canvas.shape[:2]
+        for word, (x, y), state in zip(words, positions, states):
+            bitmap = self.get(word, state)
+            h, w = min(bitmap.shape[0], height - y), min(bitmap.shape[1], width - x)
+            if h <= 0 or w <= 0:
+                continue
+            src = bitmap[:h, :w].astype(np.float32) / 255
+            dst = canvas[y:y + h, x:x + w]
+            alpha = src[..., 3:4]
+            dst_alpha = dst[..., 3:4] * (1 - alpha)
+            out_alpha = alpha + dst_alpha
+            rgb = src[..., :3] * alpha + dst[..., :3] * dst_alpha
+            np.divide(rgb, out_alpha, out=rgb, where=out_alpha > 0)
+            dst[..., :3] = rgb
+            dst[..., 3:4] = out_alpha
+        return canvas
@@ -1,12 +1,23 @@
+import asyncio
+import json
+import httpx
 import requests
-import pysrt  
 import logging
 import os
-import re
 from openai import OpenAI 
 import math
 import time
 
+from .captions.subtitle_track import SubtitleTrack
+from .providers.circuit_breaker import circuit_breaker_stats, get_circuit_breaker
+from .providers.http_client import AsyncHttpClient, http_client, http_metrics
+from .providers.orchestrator import ProviderOrchestrator
+from .providers.image_cache import image_cache
+from .providers.llm_clients import async_openrouter
+from .providers.local_library import local_library
+from .providers.pollinations import fetch_pollinations_image_async
+from .providers.rate_limiter import rate_limiter
+
 from dotenv import load_dotenv  # To load environment variables
 
 # Load environment variables from .env file
@@ -18,53 +29,44 @@ class ImageHandler:
         self.openai_api_key = openai_api_key
         self.pixabay_api_key = os.getenv('PIXABAY_API_KEY') or ''
         self.openai = OpenAI(api_key=self.openai_api_key)
+        self.openrouter = OpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=os.getenv("OPENROUTER_API_KEY")
+        )
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        # Max requests in flight per provider while fetching the images of a video
+        self.provider_concurrency = {
+            'pollinations': int(os.getenv('POLLINATIONS_MAX_CONCURRENCY', 4)),
+            'pexels': int(os.getenv('PEXELS_MAX_CONCURRENCY', 4)),
+            'pixabay': int(os.getenv('PIXABAY_MAX_CONCURRENCY', 4)),
+            'download': int(os.getenv('DOWNLOAD_MAX_CONCURRENCY', 8))
+        }
+        # Local library images smaller than this are not used, they are shown at a third of the video height
+        self.local_image_min_height = int(os.getenv('LOCAL_IMAGE_MIN_HEIGHT', 480))
+        # Races or hedges the image providers (IMAGE_PROVIDER_MODE), keeps their latency stats across videos
+        self.provider_orchestrator = ProviderOrchestrator()
 
-    def generate_image_pollinations(self, query, width=1024, height=1024, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=15):
+    async def generate_image_pollinations(self, client, query, width=1024, height=1024, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=15):
         """Generate an image using Pollinations AI API
         
         Args:
+            client (AsyncHttpClient): Client used for the request
             query (str): Text description of the image to generate
             width (int, optional): Width of generated image. Defaults to 1024
             height (int, optional): Height of generated image. Defaults to 1024
             model (str, optional): Model to use for generation
-            seed (int, optional): Seed for reproducible results
+            seed (int, optional): Seed for reproducible results, a random one is used and returned if not set
             nologo (bool, optional): Turn off logo rendering. Defaults to False
             private (bool, optional): Prevent image from appearing in public feed. Defaults to True
             enhance (bool, optional): Enable prompt enhancing via LLM. Defaults to False
             timeout (int, optional): Maximum time to wait for image generation in seconds. Defaults to 15
         
         Returns:
-            list: List containing the generated image URL if successful, empty list otherwise
+            dict: The generated image bytes ('content'), 'content_type', 'url' and 'seed', None on failure
         """
-        # Build query parameters
-        params = {
-            'width': width,
-            'height': height,
-            'nologo': str(nologo).lower(),
-            'private': str(private).lower(),
-            'enhance': str(enhance).lower()
-        }
-        if model:
-            params['model'] = model
-        if seed is not None:
-            params['seed'] = seed
-
-        # URL encode the prompt
-        encoded_query = requests.utils.quote(query)
-        generate_url = f"https://image.pollinations.ai/prompt/{encoded_query}"
-
-        try:
-            full_url = requests.Request('GET', generate_url, params=params).prepare().url
-            response = requests.get(full_url, timeout=timeout)
-            if response.status_code == 200:
-                return [full_url]
-            return []
-        except Exception as e:
-            logging.error(f"Error generating image URL: {e}")
-            return []
+        return await fetch_pollinations_image_async(client, query, width, height, model, seed, nologo, private, enhance, timeout)
 
-    def search_pexels_images(self, query):
+    async def search_pexels_images(self, client, query):
         """Search for images using Pexels API and return the URLs."""
         search_url = "https://api.pexels.com/v1/search"
 
@@ -77,21 +79,47 @@ class ImageHandler:
             'per_page': 2
         }
         
+        cached_urls = await asyncio.to_thread(image_cache.get_urls, 'pexels', query)
+        if cached_urls:
+            return cached_urls
+
+        # Ask the breaker first, a token is only spent on a request that is actually sent
+        breaker = get_circuit_breaker('pexels')
+        if not breaker.allow():
+            logging.info("Pexels circuit is open, skipping")
+            return []
+
         try:
-            response = requests.get(search_url, headers=headers, params=params)
+            acquired = await rate_limiter.acquire_async('pexels', self.pexels_api_key)
+        except BaseException:
+            breaker.release()
+            raise
+        if not acquired:
+            breaker.release()
+            return []
+
+        try:
+            response = await client.get(search_url, headers=headers, params=params)
+            breaker.record_response(response.status_code, response.headers)
             response.raise_for_status()  # Raise an error for bad responses
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error occurred: {e}")  # Log the error
             return []  # Return an empty list on error
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
         except Exception as e:
-            logging.error(f"An error occurred during the request: {e}")
+            breaker.record_failure()
+            logging.error(f"An error occurred during the request: {e!r}")
             return []
 
         search_results = response.json()
         image_urls = [photo['src']['original'] for photo in search_results.get('photos', [])]  # Extract image URLs
+        if image_urls:
+            await asyncio.to_thread(image_cache.put_urls, 'pexels', query, image_urls)
         return image_urls
 
-    def search_pixabay_images(self, query):
+    async def search_pixabay_images(self, client, query):
         """Search for images using Pixabay API and return the URLs."""
         search_url = "https://pixabay.com/api/"
         
@@ -102,18 +130,44 @@ class ImageHandler:
             'per_page': 3
         }
         
+        cached_urls = await asyncio.to_thread(image_cache.get_urls, 'pixabay', query)
+        if cached_urls:
+            return cached_urls
+
+        # Ask the breaker first, a token is only spent on a request that is actually sent
+        breaker = get_circuit_breaker('pixabay')
+        if not breaker.allow():
+            logging.info("Pixabay circuit is open, skipping")
+            return []
+
+        try:
+            acquired = await rate_limiter.acquire_async('pixabay', self.pixabay_api_key)
+        except BaseException:
+            breaker.release()
+            raise
+        if not acquired:
+            breaker.release()
+            return []
+
         try:
-            response = requests.get(search_url, params=params)
+            response = await client.get(search_url, params=params)
+            breaker.record_response(response.status_code, response.headers)
             response.raise_for_status()  # Raise an error for bad responses
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logging.error(f"HTTP error occurred: {e}")  # Log the error
             return []  # Return an empty list on error
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
         except Exception as e:
-            logging.error(f"An error occurred during the request: {e}")
+            breaker.record_failure()
+            logging.error(f"An error occurred during the request: {e!r}")
             return []
 
         search_results = response.json()
         image_urls = [hit['largeImageURL'] for hit in search_results.get('hits', [])]  # Extract image URLs
+        if image_urls:
+            await asyncio.to_thread(image_cache.put_urls, 'pixabay', query, image_urls)
         return image_urls
 
     def search_google_images(self, query):
@@ -129,7 +183,7 @@ class ImageHandler:
         }
         
         try:
-            response = requests.get(search_url, params=params)
+            response = http_client.get(search_url, params=params)
             response.raise_for_status()  # Raise an error for bad responses
         except requests.exceptions.HTTPError as e:
             logging.error(f"HTTP error occurred: {e}")  # Log the error
@@ -143,31 +197,31 @@ class ImageHandler:
         image_urls = [item['link'] for item in search_results.get('items', [])]  # Extract image URLs
         return image_urls
 
-    def download_image(self, url, filename):
-        """Download an image from a URL."""
+    async def download_image(self, client, url):
+        """Download an image from a URL into the image cache, or reuse the cached copy."""
+        cached_path = await asyncio.to_thread(image_cache.get_file, url)
+        if cached_path:
+            logging.info(f"Using cached image: {cached_path}")
+            return cached_path
+
         try:
-            response = requests.get(url, timeout=10)  # Timeout for network issues
+            response = await client.get(url, timeout=10)  # Timeout for network issues
             response.raise_for_status()  # Raise for HTTP errors
-            
-            # Use absolute path for saving images
-            assets_dir = os.path.join(self.base_dir, '..', 'assets', 'images')
-            os.makedirs(assets_dir, exist_ok=True)  # Ensure directory exists
-            
-            full_path = os.path.join(assets_dir, filename)
-            with open(full_path, 'wb') as f:
-                f.write(response.content)
-            return full_path
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Failed to download image: {e}")
+            return await asyncio.to_thread(image_cache.put_bytes, response.content, response.headers.get('Content-Type'), url)
+        except httpx.HTTPError as e:
+            logging.error(f"Failed to download image: {e!r}")
         except Exception as e:
             logging.error(f"Error while saving image: {e}")
         return None
 
-    def extract_keywords_from_subtitles(self, subtitles_file, video_duration):
-        """Extract key phrases from subtitles based on video duration."""
+    def extract_keywords_from_subtitles(self, subtitles, video_duration):
+        """Extract key phrases from subtitles based on video duration.
+
+        subtitles is a SubtitleTrack, or the path of an SRT file.
+        """
         seconds_per_keyword = 5
         try:
-            subs = pysrt.open(subtitles_file)
+            subs = SubtitleTrack.from_srt(subtitles) if isinstance(subtitles, str) else subtitles
             keywords = []
             current_text = []
             
@@ -180,12 +234,12 @@ class ImageHandler:
             current_duration = 0
             keyword_end_time = duration_per_keyword
             
-            for sub in subs:
-                if sub.start.seconds < keyword_end_time:
-                    current_text.append(sub.text)
+            for start, _, text in subs:
+                if start < keyword_end_time:
+                    current_text.append(text)
                 else:
                     keywords.append(' '.join(current_text))
-                    current_text = [sub.text]
+                    current_text = [text]
                     keyword_end_time += duration_per_keyword
 
             # Add any remaining text as the last keyword
@@ -224,47 +278,122 @@ class ImageHandler:
             logging.error(f"Error generating refined keyword: {e}")
             return keyword
 
-    def get_images_from_subtitles(self, subtitles_file_path, video_context, video_duration):
-        """Fetch relevant images based on the subtitles and video duration."""
-        keywords = self.extract_keywords_from_subtitles(subtitles_file_path, video_duration)
-        image_paths = []
-
-        for keyword in keywords:
-            try:
-                refined_keyword = self.refine_keyword_with_openai(keyword, video_context)
-            except Exception as e:
-                logging.error(f"Error refining keyword: {keyword}")
-                refined_keyword = keyword  # Use original keyword if refinement fails
-
-            logging.info(f"Searching image for keywords: {refined_keyword}")
-
-            try:
-                ## Search for images using first Pollinations API
-                image_urls = self.generate_image_pollinations(refined_keyword)
-                if not image_urls:
-                    ## Search for images using Pexels API
-                    image_urls = self.search_pexels_images(refined_keyword)
-                    if not image_urls:
-                        ## Search for images using Pixabay API
-                        image_urls = self.search_pixabay_images(refined_keyword)
-                    logging.info(f"No images found on Pexels, searching on Pixabay: {image_urls}")
-                if not image_urls:
-                    logging.info(f"No images found on Pixabay")
-            except Exception as e:
-                logging.error(f"Error searching for images: {e}")
-                image_paths.append(None)  # Add None for failed image search
-                continue
-
-            if image_urls:
-                refined_keyword = re.sub(r'[^a-zA-Z0-9_]', '', refined_keyword.replace(' ', '_').replace('"', ''))
-                img_filename = f"subtitle_image_{refined_keyword}.jpg"
-                logging.info(f"Downloading image: {image_urls[0]}")
-                downloaded_path = self.download_image(image_urls[0], img_filename)
-                if downloaded_path:
-                    image_paths.append(downloaded_path)
-                else:
-                    image_paths.append(None)  # Add None for failed download
-            else:
-                image_paths.append(None)  # Add None if no image URLs found
+    async def refine_keywords_with_openai(self, keywords, video_context):
+        """Refine all the keywords of a video in a single completion.
+
+        The model returns a JSON array of queries, one per keyword. Any keyword without a usable query in
+        the answer (or all of them, if the answer can't be parsed) falls back to the original keyword.
+
+        Returns:
+            list: One refined query per keyword, in order
+        """
+        if not keywords:
+            return []
+        try:
+            completion = await async_openrouter().chat.completions.create(
+                model="mistralai/mistral-7b-instruct:free",
+                temperature=0.25,
+                response_format={"type": "json_object"},
+                messages=[
+                    {
+                        'role': 'system',
+                        'content': '''You are a query generation system designed to enhance video automation...
+You receive a numbered list of phrases from the same video. Return a JSON object {"queries": [...]} with exactly one short image search query per phrase, in the same order.'''
+                    },
+                    {
+                        'role': 'user',
+                        'content': f'Video topic: {video_context}\nPhrases:\n' + '\n'.join(f'{i + 1}. "{keyword}"' for i, keyword in enumerate(keywords))
+                    }
+                ],
+                extra_headers={
+                    "HTTP-Referer": "https://your-site.com",
+                    "X-Title": "Your App Name",
+                }
+            )
+            queries = json.loads(completion.choices[0].message.content)
+            if isinstance(queries, dict):
+                queries = queries.get('queries', [])
+            if not isinstance(queries, list):
+                raise ValueError(f"expected a list of queries, got {type(queries).__name__}")
+        except Exception as e:
+            logging.error(f"Error generating refined keywords: {e}")
+            return list(keywords)
+
+        if len(queries) != len(keywords):
+            logging.warning(f"Got {len(queries)} refined keywords for {len(keywords)} keywords")
+        refined_keywords = []
+        for i, keyword in enumerate(keywords):
+            query = queries[i] if i < len(queries) else None
+            refined_keywords.append(query.strip() if isinstance(query, str) and query.strip() else keyword)
+        return refined_keywords
+
+    async def get_images_from_subtitles(self, subtitles, video_context, video_duration):
+        """Fetch relevant images based on the subtitles and video duration.
+
+        All keywords are processed concurrently, with at most provider_concurrency requests in flight per
+        provider. The result has one entry per keyword, in order, None where no image could be fetched.
+        """
+        keywords = self.extract_keywords_from_subtitles(subtitles, video_duration)
+        # All keywords are refined in one LLM round trip
+        refined_keywords = await self.refine_keywords_with_openai(keywords, video_context)
+        limits = {name: asyncio.Semaphore(limit) for name, limit in self.provider_concurrency.items()}
+        local_min_score = await asyncio.to_thread(self._local_library_min_score)
+
+        async with AsyncHttpClient() as client:
+            image_paths = await asyncio.gather(
+                *(self._get_image_for_keyword(client, limits, refined_keyword, local_min_score) for refined_keyword in refined_keywords)
+            )
+
+        logging.info(f"Image provider stats ({self.provider_orchestrator.mode}): {self.provider_orchestrator.stats()}")
+        logging.info(f"Image provider circuit breakers: {circuit_breaker_stats()}")
+        logging.info(f"HTTP metrics: {http_metrics.snapshot()}")
+
+        return list(image_paths)
+
+    def _local_library_min_score(self):
+        """Accept weaker local library matches while the stock photo API quotas are nearly used up"""
+        if rate_limiter.budget_low('pexels', self.pexels_api_key) and rate_limiter.budget_low('pixabay', self.pixabay_api_key):
+            logging.info("Pexels and Pixabay quotas are low, preferring local library images")
+            return local_library.min_score / 2
+        return None
+
+    async def _get_image_for_keyword(self, client, limits, refined_keyword, local_min_score=None):
+        logging.info(f"Searching image for keywords: {refined_keyword}")
+
+        ## A good enough match in the local library means no network call at all
+        local_path = await asyncio.to_thread(local_library.best_match, refined_keyword, None, 0, self.local_image_min_height, local_min_score)
+        if local_path:
+            # Library files are used through a normalized cached copy, like downloaded images
+            return await asyncio.to_thread(image_cache.put_file, local_path)
+
+        async def pollinations():
+            return await self.generate_image_pollinations(client, refined_keyword)
+
+        async def pexels():
+            return await self.search_pexels_images(client, refined_keyword)
+
+        async def pixabay():
+            return await self.search_pixabay_images(client, refined_keyword)
+
+        try:
+            ## Pollinations returns the image bytes, Pexels and Pixabay return image URLs
+            provider, image_result = await self.provider_orchestrator.run([
+                ('pollinations', pollinations, limits['pollinations']),
+                ('pexels', pexels, limits['pexels']),
+                ('pixabay', pixabay, limits['pixabay'])
+            ])
+        except Exception as e:
+            logging.error(f"Error searching for images: {e}")
+            return None  # None for failed image search
+
+        if not image_result:
+            logging.info(f"No images found for keywords: {refined_keyword}")
+            return None  # None if no image found
+
+        if provider == 'pollinations':
+            logging.info(f"Using Pollinations image (seed {image_result['seed']}): {image_result['path']}")
+            return image_result['path']
 
-        return image_paths
+        logging.info(f"Downloading image from {provider}: {image_result[0]}")
+        async with limits['download']:
+            return await self.download_image(client, image_result[0])  # None for failed download
@@ -1,18 +1,23 @@
+import asyncio
 import json
 import os
 import logging
-import uuid
 import math
 
-from moviepy.editor import VideoFileClip, ImageClip, AudioFileClip, TextClip, CompositeVideoClip, CompositeAudioClip, ColorClip, concatenate_audioclips
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from moviepy.editor import VideoFileClip, ImageClip, AudioFileClip, TextClip, CompositeVideoClip, CompositeAudioClip, ColorClip
+from PIL import Image
 
 from .utils.llm_calls import generate_voice
 from .utils.images_generation import search_pexels_images, search_pixabay_images, download_image, generate_image_pollinations
 
 from ..captions.caption_handler import CaptionHandler
+from ..captions.ass_writer import ass_filter
+from ..media.pcm import codec_pass_metrics, concat_pcm
+from ..providers.image_cache import image_cache
+from ..providers.local_library import local_library, orientation_of
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 class PyJson2Video:
 
@@ -119,6 +124,17 @@ class PyJson2Video:
             source_type = image.get('source_type', 'prompt')
             
             try:
+                # Handle 'full' argument and determine target dimensions
+                if image.get('max_width') == 'full':
+                    target_width = max_width
+                else:
+                    target_width = min(int(image.get('max_width', max_width)), max_width)
+
+                if image.get('max_height') == 'full':
+                    target_height = max_height
+                else:
+                    target_height = min(int(image.get('max_height', max_height)), max_height)
+
                 # Get image source
                 image_source = None
                 image_urls = []
@@ -127,50 +143,57 @@ class PyJson2Video:
                     image_source = image['source_content']
                 elif source_type == 'prompt':
                     query = image['source_content']
-                    # Try different image sources in sequence
-                    image_urls = generate_image_pollinations(query)
-                    if not image_urls:
+                    # Try different image sources in sequence, the local library first. Library images must
+                    # have the orientation of the target box and at least half its size, or they would be blurry
+                    image_result = None
+                    orientation = orientation_of(target_width, target_height)
+                    local_path = local_library.best_match(
+                        query, None if orientation == 'square' else orientation, target_width // 2, target_height // 2
+                    )
+                    if not local_path:
+                        image_result = generate_image_pollinations(query)
+                    if not local_path and not image_result:
                         logger.info("Trying Pexels as fallback...")
                         image_urls = search_pexels_images(query)
-                    if not image_urls:
+                    if not local_path and not image_result and not image_urls:
                         logger.info("Trying Pixabay as final fallback...")
                         image_urls = search_pixabay_images(query)
                     
-                    if image_urls:
+                    # Images live in the shared image cache, they are not temporary files of this job
+                    if local_path:
+                        # Library files are used through a normalized cached copy, like downloaded images
+                        image_source = image_cache.put_file(local_path)
+                    elif image_result:
+                        # Pollinations already returned the image, no second request
+                        image_source = image_result['path']
+                    elif image_urls:
                         image_source = download_image(image_urls[0])
-                        if image_source:
-                            self.temp_files.append(image_source)  # Track downloaded image
                     else:
                         logger.error(f"No images found for prompt: {query}")
                         continue
                 elif source_type == 'url':
                     image_source = download_image(image['source_content'])
-                    if image_source:
-                        self.temp_files.append(image_source)  # Track downloaded image
 
-                # Create and process the image clip
-                clip = ImageClip(image_source)
-                
-                # Handle 'full' argument and determine target dimensions
-                if image.get('max_width') == 'full':
-                    target_width = max_width
-                else:
-                    target_width = min(int(image.get('max_width', max_width)), max_width)
+                if not image_source:
+                    logger.error(f"Could not get image {image.get('image_id', 'unknown')}, skipping it")
+                    continue
 
-                if image.get('max_height') == 'full':
-                    target_height = max_height
-                else:
-                    target_height = min(int(image.get('max_height', max_height)), max_height)
+                # Size of the image from the cache index, or from the file header for user provided paths
+                image_size = image_cache.dimensions(image_source)
+                if image_size is None:
+                    with Image.open(image_source) as img:
+                        image_size = img.size
+                image_width, image_height = image_size
 
                 # Calculate the scaling factor to maintain aspect ratio with 10% zoom
-                width_ratio = (target_width / clip.w) * 1.1  # 10% zoom
-                height_ratio = (target_height / clip.h) * 1.1  # 10% zoom
+                width_ratio = (target_width / image_width) * 1.1  # 10% zoom
+                height_ratio = (target_height / image_height) * 1.1  # 10% zoom
                 scale_factor = min(width_ratio, height_ratio)
 
-                # Resize the clip with zoom
-                new_width = math.ceil(clip.w * scale_factor)
-                new_height = math.ceil(clip.h * scale_factor)
-                clip = clip.resize(width=new_width, height=new_height)
+                # Create the clip and resize it with zoom
+                new_width = math.ceil(image_width * scale_factor)
+                new_height = math.ceil(image_height * scale_factor)
+                clip = ImageClip(image_source).resize(width=new_width, height=new_height)
                 
                 # Handle position
                 position = image.get('position', [50, 50]) # Default to center if not specified
@@ -233,8 +256,8 @@ class PyJson2Video:
 
         for index, script in enumerate(self.data.get('script', [])):
             try:
-                audio_path = await generate_voice(script['text'])
-                self.temp_files.append(audio_path)  # Track generated voice audio
+                # Voice-overs live in the shared voice cache, they are not temporary files of this job
+                audio_path = await generate_voice(script['text'], self.data.get('extra_args', {}).get('tts_backend'))
                 script_clip = AudioFileClip(audio_path)
                 
                 # Determine start time based on the previous end_time script item
@@ -343,6 +366,7 @@ class PyJson2Video:
             resolution = extra_args.get('resolution', {'width': 1920, 'height': 1080})
             background_color = extra_args.get('background_color', [249, 249, 249])
             captions_settings = extra_args.get('captions', {})
+            ffmpeg_params = None
             
             # If background_color is a string, convert it to RGB
             if isinstance(background_color, str):
@@ -367,25 +391,38 @@ class PyJson2Video:
             if captions_settings.get('enabled', False):
                 script_audio_clips = [clip for clip in self.audio_clips if hasattr(clip, 'filename')]
                 if script_audio_clips:
-                    # Concatenate all audio clips
-                    final_audio = concatenate_audioclips(script_audio_clips)
-                    
-                    # Save the concatenated audio temporarily
-                    temp_audio_path = os.path.join(os.path.dirname(__file__), 'assets', f"temp_combined_audio_{uuid.uuid4()}.wav")
-                    temp_files.append(temp_audio_path)  # Track for cleanup
-                    final_audio.write_audiofile(temp_audio_path)
+                    # Concatenate all audio clips as 16 kHz PCM in memory, no WAV is encoded for Whisper to decode again
+                    combined_audio = await asyncio.to_thread(concat_pcm, [(clip.filename, clip.duration) for clip in script_audio_clips])
+                    codec_pass_metrics.record("json2video captions", 2)
                     
                     # Generate captions
-                    subtitles_path, subtitle_clips = await self.caption_handler.process(
-                        temp_audio_path,
-                        captions_settings.get('color', 'white'),
-                        captions_settings.get('background_color', 'black'),
-                        captions_settings.get('font_size', resolution['height'] * 0.05),
-                        captions_settings.get('font', 'LEMONMILK-Bold.otf'),
-                        resolution['width']
-                    )
-                    if subtitles_path:
-                        temp_files.append(subtitles_path)  # Track for cleanup
+                    if captions_settings.get('mode') == 'ass':
+                        # Burn the captions in with libass during the final encode
+                        subtitles, ass_captions_path = await self.caption_handler.process_ass(
+                            combined_audio,
+                            captions_settings.get('color', 'white'),
+                            captions_settings.get('background_color', 'black'),
+                            captions_settings.get('font_size', resolution['height'] * 0.05),
+                            captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                            resolution['width'],
+                            video_width=resolution['width'],
+                            video_height=resolution['height']
+                        )
+                        subtitle_clips = []
+                        if ass_captions_path:
+                            temp_files.append(ass_captions_path)  # Track for cleanup
+                            ffmpeg_params = ['-vf', ass_filter(ass_captions_path)]
+                    else:
+                        subtitles, subtitle_clips = await self.caption_handler.process(
+                            combined_audio,
+                            captions_settings.get('color', 'white'),
+                            captions_settings.get('background_color', 'black'),
+                            captions_settings.get('font_size', resolution['height'] * 0.05),
+                            captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                            resolution['width'],
+                            mode=captions_settings.get('mode', 'clips'),
+                            highlight_color=captions_settings.get('highlight_color', 'yellow')
+                        )
                     
                     self.video_clips.extend(subtitle_clips)
             
@@ -406,7 +443,8 @@ class PyJson2Video:
                 fps=30,
                 codec='libx264',
                 preset='veryfast',
-                audio_codec='aac'
+                audio_codec='aac',
+                ffmpeg_params=ffmpeg_params
             )
 
             # Close all clips to free up resources
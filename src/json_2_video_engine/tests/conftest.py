@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Set before any test module imports the shared image cache, so tests never use the real one
+os.environ["IMAGE_CACHE_DIR"] = tempfile.mkdtemp(prefix="image_cache_")
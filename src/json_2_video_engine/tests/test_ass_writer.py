@@ -0,0 +1,95 @@
+import sys
+import os
+import subprocess
+
+import imageio_ffmpeg
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.captions.ass_writer import _escape_filter_value, ass_filter, escape_ass_text, seconds_to_ass_time, write_ass
+
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    style = next(line for line in content.splitlines() if line.startswith('Style: '))
+    dialogues = [line for line in content.splitlines() if line.startswith('Dialogue: ')]
+    return style.split(','), dialogues
+
+
+def test_seconds_to_ass_time_rounds_to_centiseconds():
+    assert seconds_to_ass_time(0) == '0:00:00.00'
+    assert seconds_to_ass_time(1.234) == '0:00:01.23'
+    assert seconds_to_ass_time(1.235001) == '0:00:01.24'
+    # Rounding up carries into the seconds and minutes
+    assert seconds_to_ass_time(59.999) == '0:01:00.00'
+    assert seconds_to_ass_time(-0.5) == '0:00:00.00'
+
+
+def test_seconds_to_ass_time_rolls_over_hours():
+    assert seconds_to_ass_time(3599.99) == '0:59:59.99'
+    assert seconds_to_ass_time(3600) == '1:00:00.00'
+    assert seconds_to_ass_time(2 * 3600 + 61.5) == '2:01:01.50'
+
+
+def test_escape_ass_text_neutralizes_override_tags():
+    assert escape_ass_text('{\\b1}bold') == '(/b1)bold'
+    assert escape_ass_text('C:\\path') == 'C:/path'
+    assert escape_ass_text('two\nlines') == 'two\\Nlines'
+
+
+def test_write_ass_styles_and_times_cues(tmp_path):
+    path = write_ass(
+        [(0, 1.5, 'hello {world}'), (1.5, 3, 'line\nbreak')], str(tmp_path / 'captions.ass'), 1080, 1920,
+        font_size=60, caption_width=540, time_offset=10
+    )
+    style, dialogues = read_events(path)
+
+    assert style[1] == 'Arial' and style[2] == '66.0'
+    assert style[3] == '&H00FFFFFF' and style[5] == '&H00000000'
+    # Top-anchored, centered box 80% of the caption width, top at 40% of the frame
+    assert style[18:22] == ['8', '324', '324', '768']
+    assert dialogues == [
+        'Dialogue: 0,0:00:10.00,0:00:11.50,Caption,,0,0,0,,HELLO (WORLD)',
+        'Dialogue: 0,0:00:11.50,0:00:13.00,Caption,,0,0,0,,LINE\\NBREAK',
+    ]
+
+
+def test_escape_filter_value_escapes_for_option_and_filtergraph():
+    assert _escape_filter_value('a:b') == 'a\\\\:b'
+    assert _escape_filter_value("it's") == "it\\\\\\'s"
+    assert _escape_filter_value('a[1],b;c') == 'a\\[1\\]\\,b\\;c'
+    # Windows drive letter and backslash separators
+    assert _escape_filter_value('C:\\Fonts\\x.ass') == 'C\\\\:\\\\\\\\Fonts\\\\\\\\x.ass'
+
+
+def test_ass_filter_uses_absolute_escaped_paths(tmp_path):
+    ass_path = tmp_path / "it's:here.ass"
+    value = ass_filter(str(ass_path), fonts_dir='/fonts')
+    assert value == f"ass=filename={_escape_filter_value(str(ass_path))}:fontsdir=/fonts"
+    assert "it\\\\\\'s\\\\:here.ass" in value
+
+
+def test_ass_filter_burns_in_from_an_awkward_path(tmp_path):
+    ass_dir = tmp_path / "it's:a,b[1]"
+    ass_dir.mkdir()
+    ass_path = write_ass([(0, 1, 'hello')], str(ass_dir / 'captions.ass'), 160, 120)
+    subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'color=c=blue:s=160x120:d=1',
+         '-vf', ass_filter(ass_path), '-frames:v', '1', str(tmp_path / 'frame.png')],
+        check=True
+    )
+    assert os.path.getsize(tmp_path / 'frame.png') > 0
+
+
+def test_write_ass_bottom_anchor_keeps_case(tmp_path):
+    path = write_ass(
+        [(0, 1, 'Hola, ¿qué tal?')], str(tmp_path / 'captions.ass'), 1920, 1080,
+        font_size=1080 * 0.045, caption_width=1920, position=('center', 0.92), anchor='bottom', uppercase=False
+    )
+    style, dialogues = read_events(path)
+
+    # Bottom-centered, the last line 8% of the frame above the bottom edge
+    assert style[18:22] == ['2', '192', '192', '86']
+    assert dialogues[0].endswith(',Hola, ¿qué tal?')
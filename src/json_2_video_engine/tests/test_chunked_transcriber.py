@@ -0,0 +1,86 @@
+import sys
+import os
+import asyncio
+import io
+import time
+import wave
+
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.captions import chunked_transcriber
+from src.captions.chunked_transcriber import ChunkedTranscriber, find_silence_cut
+
+SAMPLE_RATE = 1000
+
+
+def tone(seconds):
+    return (0.5 * np.sin(np.arange(int(seconds * SAMPLE_RATE)) * 0.3)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_cut_lands_in_the_longest_silence():
+    samples = np.concatenate((tone(2), silence(0.4), tone(1), silence(1), tone(1)))
+    cut = find_silence_cut(samples, SAMPLE_RATE, min_index=SAMPLE_RATE)
+    assert 3.4 * SAMPLE_RATE < cut < 4.4 * SAMPLE_RATE
+
+    # Silences before min_index are never picked
+    cut = find_silence_cut(samples, SAMPLE_RATE, min_index=int(4.5 * SAMPLE_RATE))
+    assert cut >= 4.5 * SAMPLE_RATE
+
+
+def test_words_are_shifted_by_their_chunk_offset():
+    samples = np.concatenate((tone(3), silence(1), tone(3), silence(1), tone(2)))
+    chunk_lengths = []
+
+    async def transcribe(wav_bytes):
+        with wave.open(io.BytesIO(wav_bytes)) as wav_file:
+            seconds = wav_file.getnframes() / wav_file.getframerate()
+        chunk_lengths.append(seconds)
+        index = len(chunk_lengths)
+        await asyncio.sleep(0.05 if index == 1 else 0)  # Chunks finishing out of order
+        return [(0.0, 0.5, f"start{index}"), (seconds - 0.5, seconds, f"end{index}")]
+
+    transcriber = ChunkedTranscriber(transcribe, max_concurrency=2, sample_rate=SAMPLE_RATE, min_chunk_seconds=2, max_chunk_seconds=5)
+    words = asyncio.run(transcriber.transcribe(samples))
+
+    assert len(chunk_lengths) == 3
+    assert sum(chunk_lengths) == len(samples) / SAMPLE_RATE
+    starts = [start for start, _, _ in words]
+    assert starts == sorted(starts)
+    assert [word for _, _, word in words][:2] == ["start1", "end1"]
+    assert words[-1][1] == len(samples) / SAMPLE_RATE
+
+
+def test_cancel_while_reading_closes_the_chunks(monkeypatch):
+    closed = []
+
+    def slow_chunks(*args):
+        try:
+            for index in range(3):
+                time.sleep(0.2)
+                yield index, silence(1)
+        finally:
+            closed.append(True)
+
+    async def transcribe(wav_bytes):
+        return []
+
+    async def main():
+        task = asyncio.create_task(ChunkedTranscriber(transcribe).transcribe("audio.wav"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    monkeypatch.setattr(chunked_transcriber, 'iter_silence_chunks', slow_chunks)
+    try:
+        asyncio.run(main())
+        raise AssertionError("transcribe was not cancelled")
+    except asyncio.CancelledError:
+        pass
+    assert closed == [True]
@@ -0,0 +1,55 @@
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.media.pcm import write_wav
+from src.translation.dubbing import assemble_dub, decode_audio, time_stretch
+
+SAMPLE_RATE = 24000
+
+
+def sine(frequency, seconds):
+    return (0.5 * np.sin(2 * np.pi * frequency * np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE)).astype(np.float32)
+
+
+def dominant_frequency(samples):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * SAMPLE_RATE / len(samples)
+
+
+def test_time_stretch_keeps_the_pitch():
+    speech = sine(440, 1.0)
+    for target_seconds in (0.6, 1.7):
+        stretched = time_stretch(speech, int(target_seconds * SAMPLE_RATE))
+        assert len(stretched) == int(target_seconds * SAMPLE_RATE)
+        assert abs(dominant_frequency(stretched) - 440) < 5
+
+
+def test_time_stretch_pads_or_trims_small_differences():
+    speech = sine(440, 1.0)
+    assert np.array_equal(time_stretch(speech, SAMPLE_RATE - 100), speech[:SAMPLE_RATE - 100])
+    padded = time_stretch(speech, SAMPLE_RATE + 100)
+    assert np.array_equal(padded[:SAMPLE_RATE], speech) and not padded[SAMPLE_RATE:].any()
+    assert len(time_stretch(speech, 0)) == 0
+
+
+def test_assemble_dub_fits_each_cue():
+    tmp_dir = tempfile.mkdtemp(prefix="dubbing_")
+    first, second = os.path.join(tmp_dir, "first.wav"), os.path.join(tmp_dir, "second.wav")
+    write_wav(first, sine(440, 1.0), SAMPLE_RATE)
+    write_wav(second, sine(660, 0.5), SAMPLE_RATE)
+
+    output_path = assemble_dub([(0.5, 1.0, first), (2.0, 3.0, second)], os.path.join(tmp_dir, "dub.wav"), SAMPLE_RATE, total_duration=4.0)
+    track = decode_audio(output_path, SAMPLE_RATE)
+
+    assert len(track) == 4 * SAMPLE_RATE
+    seconds = np.arange(len(track)) / SAMPLE_RATE
+    loud = np.abs(track) > 0.05
+    assert not loud[(seconds < 0.5) | ((seconds > 1.0) & (seconds < 2.0)) | (seconds > 3.0)].any()
+    assert abs(dominant_frequency(track[int(0.5 * SAMPLE_RATE):SAMPLE_RATE]) - 440) < 5
+    assert abs(dominant_frequency(track[2 * SAMPLE_RATE:3 * SAMPLE_RATE]) - 660) < 5
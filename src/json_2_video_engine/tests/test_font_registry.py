@@ -0,0 +1,49 @@
+import sys
+import os
+import shutil
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.captions.font_registry import BUNDLED_FONTS_DIR, FontRegistry, load_font
+
+
+def test_find_by_file_name_with_or_without_extension():
+    registry = FontRegistry([BUNDLED_FONTS_DIR])
+    expected = os.path.join(BUNDLED_FONTS_DIR, 'LEMONMILK-Bold.otf')
+    assert registry.find('LEMONMILK-Bold.otf') == expected
+    assert registry.find('lemonmilk-bold') == expected
+    # Paths from older settings are matched on their file name
+    assert registry.find('/old/fonts/Dacherry.ttf') == os.path.join(BUNDLED_FONTS_DIR, 'Dacherry.ttf')
+
+
+def test_find_by_family_and_style():
+    registry = FontRegistry([BUNDLED_FONTS_DIR])
+    assert registry.find('Deep Shadow') == os.path.join(BUNDLED_FONTS_DIR, 'DeepShadow.ttf')
+    assert registry.find('LEMON MILK', 'Bold') == os.path.join(BUNDLED_FONTS_DIR, 'LEMONMILK-Bold.otf')
+    # Without a style, a family with no regular face falls back to any of its faces
+    assert registry.find('Cartoon Check') == os.path.join(BUNDLED_FONTS_DIR, 'CartoonCheck-Black.ttf')
+    assert registry.find('LEMON MILK', 'Italic') is None
+
+
+def test_earlier_directories_shadow_later_ones(tmp_path):
+    shutil.copy(os.path.join(BUNDLED_FONTS_DIR, 'Dacherry.ttf'), tmp_path / 'Dacherry.ttf')
+    registry = FontRegistry([str(tmp_path), BUNDLED_FONTS_DIR])
+    assert registry.find('Dacherry.ttf') == str(tmp_path / 'Dacherry.ttf')
+
+
+def test_missing_font_falls_back_to_default():
+    registry = FontRegistry([BUNDLED_FONTS_DIR])
+    assert registry.find('No Such Font') is None
+    assert registry.find('') is None
+    assert registry.load('No Such Font', 24) is not None
+
+
+def test_load_font_is_cached_per_path_and_size():
+    path = os.path.join(BUNDLED_FONTS_DIR, 'Dacherry.ttf')
+    font = load_font(path, 40)
+    hits = load_font.cache_info().hits
+    assert load_font(path, 40) is font
+    assert load_font.cache_info().hits == hits + 1
+    assert load_font(path, 41) is not font
+    assert FontRegistry([BUNDLED_FONTS_DIR]).load('Dacherry', 40) is font
@@ -0,0 +1,163 @@
+import sys
+import os
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.providers import http_client
+from src.providers.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.providers.http_client import AsyncHttpClient, HttpClient, backoff_delay, http_metrics
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Attempts that were backed off, without waiting"""
+    attempts = []
+
+    def no_delay(attempt, base=0.5, cap=8.0):
+        attempts.append(attempt)
+        return 0
+    monkeypatch.setattr(http_client, 'backoff_delay', no_delay)
+    return attempts
+
+
+def scripted(*outcomes):
+    """MockTransport handler answering each request with the next status code, or raising the next exception"""
+    calls = []
+
+    def handler(request):
+        outcome = outcomes[len(calls)]
+        calls.append(request)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        return httpx.Response(status_code, headers=headers, content=b'image')
+    return handler, calls
+
+
+def fetch(handler, url='https://provider.test/image', **kwargs):
+    async def run():
+        client = AsyncHttpClient(**kwargs)
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            return await client.get(url)
+    return asyncio.run(run())
+
+
+def test_backoff_delay_is_jittered_under_an_exponential_cap():
+    for attempt in range(6):
+        delays = [backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= min(8.0, 0.5 * 2 ** attempt) for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_server_errors_are_retried_with_backoff(backoffs):
+    handler, calls = scripted(503, 502, 200)
+    response = fetch(handler, max_retries=2)
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert backoffs == [0, 1]
+
+
+def test_last_response_is_returned_when_retries_run_out(backoffs):
+    handler, calls = scripted(500, 500, 500)
+    assert fetch(handler, max_retries=2).status_code == 500
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried(backoffs):
+    handler, calls = scripted(404)
+    assert fetch(handler).status_code == 404
+    assert len(calls) == 1 and backoffs == []
+
+
+def test_short_retry_after_is_honored_instead_of_backoff(backoffs):
+    handler, calls = scripted((429, {'Retry-After': '0'}), 200)
+    assert fetch(handler).status_code == 200
+    assert len(calls) == 2 and backoffs == []
+
+
+def test_long_retry_after_is_returned_and_opens_the_breaker(backoffs):
+    handler, calls = scripted((429, {'Retry-After': '120'}))
+    response = fetch(handler)
+    assert response.status_code == 429 and len(calls) == 1
+
+    breaker = CircuitBreaker("test", failure_threshold=3, cooldown=1)
+    breaker.record_response(response.status_code, response.headers)
+    assert breaker.state == OPEN
+    assert breaker.opened_until - time.monotonic() > 100
+
+
+def test_connection_errors_are_retried_then_raised(backoffs):
+    handler, calls = scripted(httpx.ConnectError("refused"), 200)
+    assert fetch(handler).status_code == 200
+
+    handler, calls = scripted(*[httpx.ConnectError("refused")] * 3)
+    with pytest.raises(httpx.ConnectError):
+        fetch(handler, max_retries=2)
+    assert len(calls) == 3
+
+
+def test_read_timeouts_are_not_retried(backoffs):
+    handler, calls = scripted(httpx.ReadTimeout("slow"), 200)
+    with pytest.raises(httpx.ReadTimeout):
+        fetch(handler)
+    assert len(calls) == 1
+
+
+def test_breaker_follows_responses_through_the_client(backoffs):
+    breaker = CircuitBreaker("test", failure_threshold=2, cooldown=0.01)
+    handler, calls = scripted(500, 503, 200)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_response(fetch(handler, max_retries=0).status_code)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    breaker.record_response(fetch(handler, max_retries=0).status_code)
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['transitions'] == {'closed->open': 1, 'open->half_open': 1, 'half_open->closed': 1}
+
+
+def test_retries_are_counted_per_host(backoffs):
+    handler, calls = scripted(503, 200)
+    fetch(handler, url='https://metrics.test/image')
+    host = http_metrics.snapshot()['metrics.test']
+    assert host['requests'] == 2 and host['retries'] == 1
+    assert host['statuses'] == {503: 1, 200: 1}
+
+
+class ScriptedAdapter(BaseAdapter):
+    def __init__(self, *status_codes):
+        super().__init__()
+        self.status_codes = list(status_codes)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = self.status_codes[self.calls]
+        response.request = request
+        response.url = request.url
+        self.calls += 1
+        return response
+
+    def close(self):
+        pass
+
+
+def test_sync_client_retries_server_errors(backoffs):
+    client = HttpClient(max_retries=2)
+    adapter = ScriptedAdapter(502, 200)
+    client.session.mount('https://', adapter)
+    assert client.get('https://sync.test/image').status_code == 200
+    assert adapter.calls == 2 and backoffs == [0]
@@ -0,0 +1,120 @@
+import sys
+import os
+import asyncio
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src import image_handler
+from src.image_handler import ImageHandler
+from src.providers.local_library import LocalImageLibrary
+
+
+class InFlight:
+    """Counts concurrent calls"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    async def __aenter__(self):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        await asyncio.sleep(0.02)
+
+    async def __aexit__(self, *exc_info):
+        self.current -= 1
+
+
+def make_handler(monkeypatch, tmp_path, keywords):
+    monkeypatch.setattr(image_handler, 'local_library', LocalImageLibrary(str(tmp_path / 'missing.sqlite3')))
+    handler = ImageHandler('pexels-key', 'openai-key')
+    handler.provider_concurrency.update({'pollinations': 2, 'pexels': 3, 'pixabay': 3, 'download': 2})
+    handler.extract_keywords_from_subtitles = lambda subtitles, video_duration: keywords
+
+    async def refine(keywords, video_context):
+        return list(keywords)
+    handler.refine_keywords_with_openai = refine
+    handler._local_library_min_score = lambda: None
+    return handler
+
+
+def test_keywords_are_fetched_concurrently_in_order(monkeypatch, tmp_path):
+    keywords = ['cat', 'stock dog', 'nothing', 'bird', 'stock fish', 'cow']
+    handler = make_handler(monkeypatch, tmp_path, keywords)
+    pollinations, downloads = InFlight(), InFlight()
+
+    async def generate_image_pollinations(client, query):
+        async with pollinations:
+            if query.startswith('stock') or query == 'nothing':
+                return None
+            return {'path': f'/cache/{query}.jpg', 'seed': 1}
+
+    async def search_pexels_images(client, query):
+        return [f'https://pexels.test/{query}.jpg'] if query.startswith('stock') else []
+
+    async def search_pixabay_images(client, query):
+        return []
+
+    async def download_image(client, url):
+        async with downloads:
+            return f'/cache/{url.rsplit("/", 1)[1]}'
+
+    handler.generate_image_pollinations = generate_image_pollinations
+    handler.search_pexels_images = search_pexels_images
+    handler.search_pixabay_images = search_pixabay_images
+    handler.download_image = download_image
+
+    paths = asyncio.run(handler.get_images_from_subtitles([], 'animals', 30))
+    # One entry per keyword, in order, None where no image was found
+    assert paths == ['/cache/cat.jpg', '/cache/stock dog.jpg', None, '/cache/bird.jpg', '/cache/stock fish.jpg', '/cache/cow.jpg']
+    # Keywords ran concurrently, within the per-provider limits
+    assert pollinations.peak == 2
+    assert 1 <= downloads.peak <= 2
+
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if isinstance(self.content, Exception):
+            raise self.content
+        message = type('Message', (), {'content': self.content})
+        return type('Completion', (), {'choices': [type('Choice', (), {'message': message})]})
+
+
+def refine(monkeypatch, keywords, content):
+    completions = FakeCompletions(content)
+    client = type('Client', (), {'chat': type('Chat', (), {'completions': completions})})
+    monkeypatch.setattr(image_handler, 'async_openrouter', lambda: client)
+    handler = ImageHandler('pexels-key', 'openai-key')
+    return asyncio.run(handler.refine_keywords_with_openai(keywords, 'a trip to Japan')), completions.calls
+
+
+def test_keywords_are_refined_in_one_call(monkeypatch):
+    refined, calls = refine(monkeypatch, ['we landed in tokyo', 'the food was great'], '{"queries": ["tokyo airport", "japanese food"]}')
+    assert refined == ['tokyo airport', 'japanese food']
+    assert len(calls) == 1
+    assert '1. "we landed in tokyo"\n2. "the food was great"' in calls[0]['messages'][1]['content']
+
+
+def test_missing_or_empty_queries_fall_back_to_the_keyword(monkeypatch):
+    refined, _ = refine(monkeypatch, ['one', 'two', 'three', 'four'], '{"queries": ["first", "  ", 3]}')
+    assert refined == ['first', 'two', 'three', 'four']
+    # A bare JSON array is accepted too
+    refined, _ = refine(monkeypatch, ['one', 'two'], '["first", "second", "extra"]')
+    assert refined == ['first', 'second']
+
+
+def test_unusable_answer_falls_back_to_all_keywords(monkeypatch):
+    for content in ('not json', '{"queries": "tokyo"}', '42', RuntimeError("rate limited")):
+        refined, _ = refine(monkeypatch, ['one', 'two'], content)
+        assert refined == ['one', 'two']
+
+
+def test_no_keywords_means_no_call(monkeypatch):
+    assert refine(monkeypatch, [], '{"queries": []}') == ([], [])
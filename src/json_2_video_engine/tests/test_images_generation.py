@@ -0,0 +1,92 @@
+import sys
+import os
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from PIL import Image
+
+from src.json_2_video_engine.utils.images_generation import download_image, generate_image_pollinations
+from src.providers.image_cache import image_cache
+
+
+def encode_image(mode, size, fmt):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+PNG_BYTES = encode_image("RGBA", (64, 32), "PNG")
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        CountingHandler.requests_seen.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG_BYTES)))
+        self.end_headers()
+        self.wfile.write(PNG_BYTES)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NotFoundHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = PNG_BYTES  # A valid image in an error response must still be refused
+        self.send_response(404)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_pollinations_image_is_fetched_once_and_cached():
+    server = HTTPServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        result = generate_image_pollinations("a red fox", base_url=base_url)
+        cached_result = generate_image_pollinations("A red fox!", base_url=base_url)
+    finally:
+        server.shutdown()
+
+    assert len(CountingHandler.requests_seen) == 1
+    assert f"seed={result['seed']}" in CountingHandler.requests_seen[0]
+    assert result['path'].startswith(os.environ["IMAGE_CACHE_DIR"])
+    assert result['path'].endswith(".png")
+    with Image.open(result['path']) as img:
+        assert (img.mode, img.size) == ("RGBA", (64, 32))
+    assert cached_result['path'] == result['path']
+    assert cached_result['seed'] == result['seed']
+
+
+def test_saved_images_are_normalized():
+    # CMYK JPEG over the maximum side is converted to RGB and downscaled
+    with Image.open(image_cache.put_bytes(encode_image("CMYK", (4000, 1000), "JPEG"), "image/jpeg")) as img:
+        assert (img.format, img.mode, img.size) == ("JPEG", "RGB", (1920, 480))
+
+    # Decompression bombs and non-images are rejected before decoding
+    assert image_cache.put_bytes(encode_image("1", (8000, 8000), "PNG"), "image/png") is None
+    assert image_cache.put_bytes(b"<html>rate limited</html>", "text/html") is None
+
+
+def test_download_image_skips_http_errors():
+    server = HTTPServer(("127.0.0.1", 0), NotFoundHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/missing.png"
+        assert download_image(url) is None
+        assert image_cache.get_file(url) is None
+    finally:
+        server.shutdown()
@@ -0,0 +1,42 @@
+import sys
+import os
+import asyncio
+import gc
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+
+from src.providers import llm_clients
+from src.providers.llm_clients import OPENROUTER_BASE_URL, async_openai, async_openrouter
+
+
+async def loop_clients():
+    return async_openai(), async_openrouter(), async_openai(), async_openrouter()
+
+
+def test_clients_are_reused_within_a_loop_and_share_one_pool():
+    openai, openrouter, openai_again, openrouter_again = asyncio.run(loop_clients())
+    assert openai is openai_again and openrouter is openrouter_again
+    assert openai is not openrouter
+    assert str(openrouter.base_url).rstrip('/') == OPENROUTER_BASE_URL
+    assert openai._client is openrouter._client
+
+
+def test_each_loop_gets_its_own_clients():
+    first, second = asyncio.run(loop_clients()), asyncio.run(loop_clients())
+    assert first[0] is not second[0]
+    assert first[0]._client is not second[0]._client
+
+
+def test_clients_of_a_finished_loop_are_released():
+    gc.collect()
+    before = len(llm_clients._clients)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(loop_clients())
+    assert len(llm_clients._clients) == before + 1
+    loop.close()
+    del loop
+    gc.collect()
+    assert len(llm_clients._clients) == before
@@ -0,0 +1,116 @@
+import sys
+import os
+import json
+
+from PIL import Image
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.providers.local_library import LocalImageLibrary, read_sidecar
+
+
+def make_image(path, size, tags=None, caption=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, 'green').save(path)
+    if tags is not None:
+        with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'tags': tags, 'caption': caption or ''}, f)
+    elif caption is not None:
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(caption)
+    return path
+
+
+def make_library(tmp_path):
+    library_dir = tmp_path / 'library'
+    images = {
+        'lake': make_image(str(library_dir / 'nature' / 'img_001.jpg'), (400, 300), ['mountain', 'lake', 'sunrise'], 'A calm mountain lake'),
+        'peak': make_image(str(library_dir / 'nature' / 'mountain_peak.jpg'), (300, 400)),
+        'city': make_image(str(library_dir / 'city' / 'img_002.png'), (300, 300), caption='Night skyline of a big city'),
+        'tiny': make_image(str(library_dir / 'nature' / 'lake_small.jpg'), (40, 30)),
+    }
+    # BM25 weighs terms by how rare they are in the whole library
+    for i, subject in enumerate(['pasta', 'dog', 'guitar', 'office', 'bicycle', 'coffee']):
+        make_image(str(library_dir / 'misc' / f'{subject}.jpg'), (200, 200), [subject, str(i)])
+    library = LocalImageLibrary(str(tmp_path / 'index.sqlite3'), min_score=1.0)
+    assert library.index_directory(str(library_dir)) == 10
+    return library, library_dir, images
+
+
+def test_missing_index_is_skipped(tmp_path):
+    library = LocalImageLibrary(str(tmp_path / 'missing.sqlite3'))
+    assert not library.available
+    assert library.search('mountain') == []
+    assert library.best_match('mountain') is None
+
+
+def test_bm25_ranks_images_matching_more_terms_first(tmp_path):
+    library, _, images = make_library(tmp_path)
+    results = library.search('mountain lake at sunrise', min_width=100)
+    assert [result['path'] for result in results] == [images['lake'], images['peak']]
+    assert results[0]['score'] > results[1]['score'] > 0
+
+    # Folder names, captions from .txt sidecars and stemmed terms are searchable
+    assert [result['path'] for result in library.search('cities skyline')] == [images['city']]
+    assert len(library.search('nature', min_width=100)) == 2
+    # Stopwords alone match nothing
+    assert library.search('a photo of the') == []
+
+
+def test_orientation_and_size_filters(tmp_path):
+    library, _, images = make_library(tmp_path)
+    assert [result['path'] for result in library.search('mountain', orientation='landscape')] == [images['lake']]
+    assert [result['path'] for result in library.search('mountain', orientation='portrait')] == [images['peak']]
+    assert [result['path'] for result in library.search('city', orientation='square')] == [images['city']]
+    assert library.search('city', orientation='portrait') == []
+
+    assert images['tiny'] in [result['path'] for result in library.search('lake')]
+    assert images['tiny'] not in [result['path'] for result in library.search('lake', min_width=100, min_height=100)]
+
+
+def test_best_match_requires_min_score(tmp_path):
+    library, _, images = make_library(tmp_path)
+    assert library.best_match('mountain lake', min_width=100) == images['lake']
+    assert library.best_match('mountain lake', min_score=1000) is None
+    assert library.best_match('volcano') is None
+    # A weak match (one common term, in the folder name only) is not used
+    assert library.best_match('nature documentary') is None
+
+
+def test_reindex_updates_changed_and_drops_removed_files(tmp_path):
+    library, library_dir, images = make_library(tmp_path)
+    assert library.index_directory(str(library_dir)) == 0
+
+    make_image(images['city'], (300, 300), ['volcano'])
+    os.utime(images['city'], (1, 1))
+    os.remove(images['peak'])
+    assert library.index_directory(str(library_dir)) == 1
+
+    assert [result['path'] for result in library.search('volcano')] == [images['city']]
+    assert library.search('skyline') == []
+    assert not library.contains(images['peak'])
+    assert library.contains(images['lake'])
+
+
+def test_read_sidecar(tmp_path):
+    image_path = make_image(str(tmp_path / 'a.jpg'), (10, 10), ['red', 'car'], 'A red car')
+    assert read_sidecar(image_path) == ('red car', 'A red car')
+
+    image_path = make_image(str(tmp_path / 'b.jpg'), (10, 10), caption='  Just a caption \n')
+    assert read_sidecar(image_path) == ('', 'Just a caption')
+
+    with open(tmp_path / 'c.json', 'w') as f:
+        f.write('{not json')
+    assert read_sidecar(str(tmp_path / 'c.jpg')) == ('', '')
+
+
+def test_read_sidecar_tolerates_bad_sidecars(tmp_path):
+    with open(tmp_path / 'a.json', 'w') as f:
+        json.dump({'tags': 'sunset beach', 'caption': 'Sunset'}, f)
+    # A string is not split into one tag per character
+    assert read_sidecar(str(tmp_path / 'a.jpg')) == ('', 'Sunset')
+
+    # An unreadable caption file is skipped
+    os.mkdir(tmp_path / 'b.txt')
+    assert read_sidecar(str(tmp_path / 'b.jpg')) == ('', '')
@@ -0,0 +1,71 @@
+import sys
+import os
+import asyncio
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.providers.orchestrator import ProviderOrchestrator
+
+
+def provider(result, delay, started):
+    async def call():
+        started.append(result)
+        await asyncio.sleep(delay)
+        return result
+    return call
+
+
+def test_sequential_is_the_default_and_falls_back_in_order():
+    started = []
+    orchestrator = ProviderOrchestrator()
+    assert orchestrator.mode == 'sequential'
+    result = asyncio.run(orchestrator.run([
+        ('first', provider(None, 0.01, started)),
+        ('second', provider('image', 0.01, started)),
+        ('third', provider('other', 0.01, started))
+    ]))
+    assert result == ('second', 'image')
+    assert started == [None, 'image']
+    assert orchestrator.stats()['first']['success_rate'] == 0
+
+
+def test_race_returns_the_fastest_and_cancels_the_rest():
+    started = []
+    orchestrator = ProviderOrchestrator(mode='race')
+    result = asyncio.run(orchestrator.run([
+        ('slow', provider('slow image', 1, started)),
+        ('fast', provider('fast image', 0.01, started))
+    ]))
+    assert result == ('fast', 'fast image')
+    assert started == ['slow image', 'fast image']
+    assert orchestrator.stats()['slow']['cancelled'] == 1
+
+
+def test_hedged_starts_the_next_provider_after_the_delay():
+    started = []
+    orchestrator = ProviderOrchestrator(mode='hedged', default_hedge_delay=0.05)
+    result = asyncio.run(orchestrator.run([
+        ('slow', provider('slow image', 1, started)),
+        ('fast', provider('fast image', 0.01, started))
+    ]))
+    assert result == ('fast', 'fast image')
+
+    # The cancelled call counts as a latency sample of at least the time it ran
+    slow_stats = orchestrator.stats()['slow']
+    assert slow_stats['cancelled'] == 1
+    assert slow_stats['p50'] >= 0.05
+
+
+def test_latency_is_measured_from_the_concurrency_slot():
+    orchestrator = ProviderOrchestrator()
+
+    async def main():
+        limit = asyncio.Semaphore(1)
+        async with limit:
+            run = asyncio.create_task(orchestrator.run([('limited', provider('image', 0.01, []), limit)]))
+            await asyncio.sleep(0.2)
+        return await run
+
+    assert asyncio.run(main()) == ('limited', 'image')
+    assert orchestrator.stats()['limited']['p50'] < 0.1
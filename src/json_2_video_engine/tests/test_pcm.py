@@ -0,0 +1,59 @@
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.media.pcm import concat_pcm, iter_pcm_blocks, load_pcm, write_wav
+
+SAMPLE_RATE = 16000
+
+
+def make_wav(tmp_dir, name, seconds, value):
+    path = os.path.join(tmp_dir, name)
+    write_wav(path, np.full(int(seconds * SAMPLE_RATE), value, dtype=np.float32), SAMPLE_RATE)
+    return path
+
+
+def test_load_pcm_pads_and_trims_to_the_duration():
+    tmp_dir = tempfile.mkdtemp(prefix="pcm_")
+    one_second = make_wav(tmp_dir, "one.wav", 1.0, 0.5)
+
+    samples = load_pcm(one_second, SAMPLE_RATE)
+    assert samples.dtype == np.float32 and len(samples) == SAMPLE_RATE
+    assert samples.flags.writeable
+    assert np.allclose(samples, 0.5, atol=1e-3)
+
+    padded = load_pcm(one_second, SAMPLE_RATE, duration=1.5)
+    assert len(padded) == int(1.5 * SAMPLE_RATE)
+    assert np.allclose(padded[:SAMPLE_RATE], 0.5, atol=1e-3) and not padded[SAMPLE_RATE:].any()
+    assert len(load_pcm(one_second, SAMPLE_RATE, duration=0.25)) == SAMPLE_RATE // 4
+
+
+def test_concat_pcm_lays_segments_end_to_end():
+    tmp_dir = tempfile.mkdtemp(prefix="pcm_")
+    first = make_wav(tmp_dir, "first.wav", 0.5, 0.25)
+    second = make_wav(tmp_dir, "second.wav", 1.0, -0.5)
+
+    # The first segment is shorter than its slot and gets padded, the second is cut
+    samples = concat_pcm([(first, 1.0), (second, 0.5)], SAMPLE_RATE)
+    assert len(samples) == int(1.5 * SAMPLE_RATE)
+    assert np.allclose(samples[:SAMPLE_RATE // 2], 0.25, atol=1e-3)
+    assert not samples[SAMPLE_RATE // 2:SAMPLE_RATE].any()
+    assert np.allclose(samples[SAMPLE_RATE:], -0.5, atol=1e-3)
+
+
+def test_blocks_stream_the_whole_track():
+    tmp_dir = tempfile.mkdtemp(prefix="pcm_")
+    path = make_wav(tmp_dir, "track.wav", 2.5, 0.1)
+    blocks = list(iter_pcm_blocks(path, SAMPLE_RATE, block_seconds=1.0))
+    assert [len(block) for block in blocks] == [SAMPLE_RATE, SAMPLE_RATE, SAMPLE_RATE // 2]
+
+
+def test_load_pcm_raises_on_unreadable_input():
+    with pytest.raises(RuntimeError):
+        load_pcm(os.path.join(tempfile.mkdtemp(prefix="pcm_"), "missing.wav"))
@@ -0,0 +1,109 @@
+import sys
+import os
+import json
+import subprocess
+import wave
+
+import imageio_ffmpeg
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+import src.media.probe as probe_module
+from src.media.probe import get_dimensions, get_duration, probe
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    probe_module._probe.cache_clear()
+    yield
+    probe_module._probe.cache_clear()
+
+
+def write_wav(path, seconds, sample_rate=8000):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b'\x00\x00' * int(seconds * sample_rate))
+    return str(path)
+
+
+def make_video(path):
+    subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=size=160x120:rate=10:duration=2',
+         '-f', 'lavfi', '-i', 'sine=frequency=220:duration=2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest', str(path)],
+        check=True
+    )
+    return str(path)
+
+
+def test_audio_is_probed_from_its_header(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe_module, '_ffmpeg_infos', None)
+    monkeypatch.setattr(probe_module, '_ffprobe', None)
+    path = write_wav(tmp_path / 'voice.wav', 1.5)
+    info = probe(path)
+    assert info['duration'] == pytest.approx(1.5)
+    assert info['has_audio'] and info['width'] is None
+    assert info['size'] == os.path.getsize(path)
+    assert get_dimensions(path) == (None, None)
+
+
+def test_cache_is_invalidated_when_size_or_mtime_changes(tmp_path, monkeypatch):
+    calls = []
+    read_header = probe_module.mutagen.File
+    monkeypatch.setattr(probe_module.mutagen, 'File', lambda path: calls.append(path) or read_header(path))
+    path = write_wav(tmp_path / 'voice.wav', 1)
+
+    assert get_duration(path) == pytest.approx(1)
+    # Callers get a copy, changing it does not change the cached entry
+    probe(path)['duration'] = 0
+    assert get_duration(tmp_path / 'voice.wav') == pytest.approx(1)
+    assert len(calls) == 1
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert get_duration(path) == pytest.approx(1)
+    assert len(calls) == 2
+
+    # Rewritten in place with a different size
+    write_wav(path, 2)
+    assert get_duration(path) == pytest.approx(2)
+    assert len(calls) == 3
+
+
+def test_video_falls_back_to_ffmpeg_without_ffprobe(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe_module.shutil, 'which', lambda name: None)
+    path = make_video(tmp_path / 'video.mp4')
+    info = probe(path)
+    assert (info['width'], info['height']) == (160, 120)
+    assert info['fps'] == pytest.approx(10)
+    assert info['duration'] == pytest.approx(2, abs=0.1)
+    assert info['has_audio']
+
+
+def test_ffprobe_output_is_parsed(tmp_path, monkeypatch):
+    output = {
+        'format': {'duration': '12.5'},
+        'streams': [
+            {'codec_type': 'audio'},
+            {'codec_type': 'video', 'width': 1080, 'height': 1920, 'avg_frame_rate': '30000/1001'},
+        ]
+    }
+    monkeypatch.setattr(probe_module.shutil, 'which', lambda name: '/usr/bin/ffprobe')
+    monkeypatch.setattr(probe_module.subprocess, 'run', lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, json.dumps(output).encode()))
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'not really a video')
+
+    info = probe(path)
+    assert info['duration'] == 12.5
+    assert get_dimensions(path) == (1080, 1920)
+    assert info['fps'] == pytest.approx(29.97, abs=0.01)
+    assert info['has_audio']
+
+
+def test_missing_file_returns_none(tmp_path):
+    assert probe(tmp_path / 'missing.mp4') is None
+    assert get_duration(tmp_path / 'missing.mp4') is None
+    assert get_dimensions(tmp_path / 'missing.mp4') == (None, None)
@@ -0,0 +1,51 @@
+import sys
+import os
+import tempfile
+import time
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.json_2_video_engine.utils import images_generation
+from src.providers.circuit_breaker import CircuitBreaker
+from src.providers.rate_limiter import RateLimiter, parse_rate_limit
+
+
+def make_limiter(limit, max_wait=0):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="rate_limiter_"), "buckets.sqlite3")
+    return RateLimiter(db_path=db_path, limits={'pexels': parse_rate_limit(limit)}, max_wait=max_wait)
+
+
+def test_bucket_is_shared_and_refuses_past_max_wait():
+    limiter = make_limiter('2/3600')
+    assert limiter.acquire('pexels', 'key')
+    # Another instance on the same database (another process) sees the same bucket
+    assert RateLimiter(db_path=limiter.db_path, limits=limiter.limits, max_wait=0).acquire('pexels', 'key')
+    assert not limiter.acquire('pexels', 'key')
+
+    # Buckets are per API key, unknown providers are not limited
+    assert limiter.acquire('pexels', 'other key')
+    assert limiter.acquire('unknown')
+
+
+def test_acquire_waits_for_the_refill():
+    limiter = make_limiter('1/0.2', max_wait=1)
+    assert limiter.acquire('pexels')
+    start = time.monotonic()
+    assert limiter.acquire('pexels')
+    assert 0.1 < time.monotonic() - start < 1
+    assert limiter.budget_low('pexels')
+
+
+def test_open_breaker_does_not_spend_a_token(monkeypatch):
+    limiter = make_limiter('5/3600')
+    breaker = CircuitBreaker("pexels", failure_threshold=1, cooldown=60)
+    breaker.record_failure()
+    monkeypatch.setattr(images_generation, 'rate_limiter', limiter)
+    monkeypatch.setattr(images_generation, 'get_circuit_breaker', lambda name: breaker)
+    monkeypatch.setattr(images_generation.image_cache, 'get_urls', lambda *args: None)
+
+    assert images_generation.search_pexels_images("a query") == []
+    tokens, capacity = limiter.remaining('pexels', images_generation.pexels_api_key)
+    assert tokens == capacity
@@ -0,0 +1,70 @@
+import sys
+import os
+import re
+import subprocess
+import tempfile
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.media.pcm import get_ffmpeg_binary
+from src.media.remux import mux_audio_tracks, replace_audio
+
+
+def ffmpeg(*arguments):
+    subprocess.run([get_ffmpeg_binary(), '-y', '-loglevel', 'error', *arguments], check=True)
+
+
+def make_video(tmp_dir):
+    video_path = os.path.join(tmp_dir, "video.mp4")
+    ffmpeg('-f', 'lavfi', '-i', 'testsrc=size=160x120:rate=10:duration=2', '-f', 'lavfi', '-i', 'sine=frequency=220:duration=2',
+           '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest', video_path)
+    return video_path
+
+
+def make_audio(tmp_dir, name, frequency):
+    audio_path = os.path.join(tmp_dir, name)
+    ffmpeg('-f', 'lavfi', '-i', f'sine=frequency={frequency}:duration=2', audio_path)
+    return audio_path
+
+
+def streams(media_path):
+    """Stream lines of `ffmpeg -i` and the whole report"""
+    report = subprocess.run([get_ffmpeg_binary(), '-hide_banner', '-i', media_path], capture_output=True, text=True).stderr
+    return re.findall(r'Stream #0:\d+.*', report), report
+
+
+def test_replace_audio_copies_the_video_stream():
+    tmp_dir = tempfile.mkdtemp(prefix="remux_")
+    video_path = make_video(tmp_dir)
+    output_path = replace_audio(video_path, make_audio(tmp_dir, "dub.wav", 440), os.path.join(tmp_dir, "dubbed.mp4"))
+
+    assert output_path == os.path.join(tmp_dir, "dubbed.mp4")
+    output_streams, _ = streams(output_path)
+    assert len(output_streams) == 2
+    assert 'Video: h264' in output_streams[0] and 'Audio: aac' in output_streams[1]
+
+    # Stream copy: the encoded frames are the same bytes as in the source
+    def video_bytes(path):
+        return subprocess.run([get_ffmpeg_binary(), '-loglevel', 'error', '-i', path, '-map', '0:v', '-c', 'copy', '-f', 'h264', '-'],
+                              capture_output=True, check=True).stdout
+    assert video_bytes(output_path) == video_bytes(video_path)
+
+
+def test_replace_audio_reports_failure():
+    tmp_dir = tempfile.mkdtemp(prefix="remux_")
+    assert replace_audio(os.path.join(tmp_dir, "missing.mp4"), make_audio(tmp_dir, "dub.wav", 440), os.path.join(tmp_dir, "out.mp4")) is None
+
+
+def test_one_audio_track_per_language():
+    tmp_dir = tempfile.mkdtemp(prefix="remux_")
+    video_path = make_video(tmp_dir)
+    tracks = [(make_audio(tmp_dir, "french.wav", 440), "French"), (make_audio(tmp_dir, "german.wav", 660), "German")]
+    output_path = mux_audio_tracks(video_path, tracks, os.path.join(tmp_dir, "multi.mp4"))
+
+    output_streams, report = streams(output_path)
+    assert len(output_streams) == 3
+    assert 'Video: h264' in output_streams[0]
+    assert all('Audio: aac' in stream for stream in output_streams[1:])
+    assert re.search(r'handler_name\s*:\s*French', report) and re.search(r'handler_name\s*:\s*German', report)
+    assert report.index('French') < report.index('German')
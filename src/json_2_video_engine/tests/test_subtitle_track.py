@@ -0,0 +1,41 @@
+import sys
+import os
+import tempfile
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.captions.subtitle_track import SubtitleTrack
+
+
+def make_track():
+    return SubtitleTrack.from_word_groups([
+        [(0.0, 0.4, "Hello"), (0.45, 0.9, "there")],
+        [(1.5, 1.8, "second"), (1.85, 2.25, "cue")]
+    ])
+
+
+def test_srt_round_trip_keeps_cues():
+    track = make_track()
+    srt_path = track.to_srt(os.path.join(tempfile.mkdtemp(prefix="subtitles_"), "track.srt"))
+    loaded = SubtitleTrack.from_srt(srt_path)
+
+    assert list(loaded) == [(0.0, 0.9, "Hello there"), (1.5, 2.25, "second cue")]
+    assert not loaded.has_words
+    assert loaded.duration == 2.25
+
+
+def test_words_and_cue_lookup():
+    track = make_track()
+    assert track.has_words
+    assert track.words(1) == [(1.5, 1.8, "second"), (1.85, 2.25, "cue")]
+    assert track.cue_at(0.5) == 0
+    assert track.cue_at(1.2) is None
+    assert track.cue_at(2.0) == 1
+    assert track.cue_at(2.25) is None
+
+
+def test_with_texts_keeps_timings_and_drops_words():
+    translated = make_track().with_texts(["Bonjour", "deuxième"])
+    assert list(translated) == [(0.0, 0.9, "Bonjour"), (1.5, 2.25, "deuxième")]
+    assert not translated.has_words
@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+import json
+from types import SimpleNamespace
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.translation import subtitle_translator
+from src.translation.subtitle_translator import SubtitleTranslator
+
+
+class FakeCompletions:
+    """Translates to upper case, leaving out the indices in `missing` (forever if `keep_missing`)"""
+
+    def __init__(self, missing=(), keep_missing=False):
+        self.missing = set(missing)
+        self.keep_missing = keep_missing
+        self.payloads = []
+
+    async def create(self, messages, **kwargs):
+        payload = json.loads(messages[-1]['content'])
+        self.payloads.append(payload)
+        translations = {index: text.upper() for index, text in payload['translate'].items() if int(index) not in self.missing}
+        if not self.keep_missing:
+            self.missing = set()
+        content = json.dumps({'translations': translations})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def fake_client(completions):
+    return lambda: SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+TEXTS = [f"line {i}" for i in range(7)]
+
+
+def test_windows_carry_context(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(subtitle_translator, 'async_openrouter', fake_client(completions))
+    translated = asyncio.run(SubtitleTranslator(window_size=3, context_size=1).translate(TEXTS, "French"))
+
+    assert translated == [text.upper() for text in TEXTS]
+    second_window = next(payload for payload in completions.payloads if '3' in payload['translate'])
+    assert list(second_window['context_before']) == ['2']
+    assert list(second_window['translate']) == ['3', '4', '5']
+    assert list(second_window['context_after']) == ['6']
+
+
+def test_missing_subtitles_are_asked_for_again(monkeypatch):
+    completions = FakeCompletions(missing={1, 4})
+    monkeypatch.setattr(subtitle_translator, 'async_openrouter', fake_client(completions))
+    translated = asyncio.run(SubtitleTranslator(window_size=7, context_size=1).translate(TEXTS, "French"))
+
+    assert translated == [text.upper() for text in TEXTS]
+    assert len(completions.payloads) == 2
+    assert list(completions.payloads[1]['translate']) == ['1', '4']
+
+
+def test_subtitles_still_missing_keep_their_text(monkeypatch):
+    completions = FakeCompletions(missing={2}, keep_missing=True)
+    monkeypatch.setattr(subtitle_translator, 'async_openrouter', fake_client(completions))
+    translated = asyncio.run(SubtitleTranslator(window_size=7).translate(TEXTS, "French"))
+
+    assert translated[2] == "line 2"
+    assert translated[3] == "LINE 3"
+    assert len(completions.payloads) == 2
@@ -0,0 +1,116 @@
+import sys
+import os
+import asyncio
+import io
+import tempfile
+import wave
+
+import pytest
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.tts import backends
+from src.tts.backends import EspeakBackend, PiperBackend, TTSBackend, get_tts_backend, language_code, register_tts_backend, wav_bytes
+
+# Stands in for piper: one WAV per line of stdin, its path printed on stdout, like `piper --output_dir`
+FAKE_PIPER = '''#!{python}
+import os, sys, wave
+output_dir = sys.argv[sys.argv.index('--output_dir') + 1]
+for index, line in enumerate(sys.stdin):
+    path = os.path.join(output_dir, f'{{os.getpid()}}-{{index}}.wav')
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(22050)
+        wav_file.writeframes(bytes(2 * 100 * len(line.strip())))
+    print(path, flush=True)
+'''
+
+
+class SilentBackend(TTSBackend):
+    name = 'silent'
+    default_model = 'silence'
+    default_voice = 'none'
+    sample_rate = 22050
+
+    async def _generate(self, text, model, voice, speed, response_format):
+        return wav_bytes(bytes(2 * self.sample_rate), self.sample_rate), 'wav'
+
+
+class MissingBackend(SilentBackend):
+    name = 'missing'
+
+    def available(self):
+        return False
+
+
+def read_wav(content):
+    with wave.open(io.BytesIO(content)) as wav_file:
+        return wav_file.getframerate(), wav_file.getnframes()
+
+
+def test_backend_selection():
+    register_tts_backend(SilentBackend())
+    register_tts_backend(MissingBackend())
+    assert get_tts_backend('silent').name == 'silent'
+    assert get_tts_backend(None) is get_tts_backend(backends.DEFAULT_TTS_BACKEND)
+    instance = MissingBackend()
+    assert get_tts_backend(instance) is instance
+    with pytest.raises(ValueError):
+        get_tts_backend('no-such-backend')
+    with pytest.raises(RuntimeError):
+        get_tts_backend('missing')
+    assert 'silent' in backends.available_tts_backends()
+    assert 'missing' not in backends.available_tts_backends()
+
+
+def test_wav_is_upsampled_in_process(monkeypatch):
+    async def no_transcode(*args):
+        raise AssertionError("ffmpeg should not be needed")
+
+    monkeypatch.setattr(backends, 'transcode', no_transcode)
+    content = asyncio.run(SilentBackend().synthesize("hello", response_format='wav', sample_rate=24000))
+    assert read_wav(content) == (24000, 24000)
+
+
+def test_language_picks_the_offline_voice():
+    assert language_code("Brazilian Portuguese") == 'pt-br'
+    assert language_code("fr") == 'fr'
+    assert language_code("Klingon") is None
+    assert EspeakBackend().for_language("Spanish") == (None, 'es')
+    assert EspeakBackend().for_language("Chinese") == (None, 'cmn')
+    assert EspeakBackend().for_language("Klingon") == (None, None)
+
+
+def test_piper_keeps_one_process_per_voice():
+    tmp_dir = tempfile.mkdtemp(prefix="piper_")
+    binary = os.path.join(tmp_dir, "piper")
+    with open(binary, "w") as f:
+        f.write(FAKE_PIPER.format(python=sys.executable))
+    os.chmod(binary, 0o755)
+    for name in ("de_DE-test-medium.onnx", "pt_PT-test-medium.onnx", "pt_BR-test-medium.onnx"):
+        open(os.path.join(tmp_dir, name), "w").close()
+
+    piper = PiperBackend()
+    piper.binary = binary
+    piper.voices_dir = tmp_dir
+    model, _ = piper.for_language("Brazilian Portuguese")
+    assert os.path.basename(model) == "pt_BR-test-medium.onnx"
+
+    async def speak_all():
+        return await asyncio.gather(*(piper.synthesize(f"line {i}", model, response_format='wav', sample_rate=22050) for i in range(5)))
+
+    try:
+        contents = asyncio.run(speak_all())
+        assert [read_wav(content) for content in contents] == [(22050, 600)] * 5
+        assert len(piper._processes) == 1
+    finally:
+        piper.close()
+    assert not piper._processes
+
+
+def test_wav_at_the_native_rate_is_returned_as_generated():
+    content = asyncio.run(SilentBackend().synthesize("hello", response_format='wav'))
+    assert read_wav(content) == (22050, 22050)
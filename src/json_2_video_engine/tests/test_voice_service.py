@@ -0,0 +1,87 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.tts.backends import TTSBackend
+from src.tts.voice_service import VoiceService
+
+
+class RecordingBackend(TTSBackend):
+    name = 'recording'
+    default_model = 'model'
+    default_voice = 'voice'
+
+    def __init__(self):
+        self.calls = []
+
+    async def synthesize(self, text, model=None, voice=None, speed=1.0, response_format="mp3", sample_rate=None):
+        self.calls.append(text)
+        return text.encode('utf-8').ljust(100, b'\0')
+
+
+def speak(service, backend, text, **kwargs):
+    return asyncio.run(service.synthesize(text, backend=backend, **kwargs))
+
+
+def test_repeated_text_is_served_from_the_cache(tmp_path):
+    service, backend = VoiceService(str(tmp_path), max_bytes=10 ** 6), RecordingBackend()
+    path = speak(service, backend, "Welcome back to the channel")
+    assert service.contains(path) and path.endswith('.mp3')
+
+    # Whitespace differences don't change the speech
+    assert speak(service, backend, "  Welcome back\nto the   channel ") == path
+    assert backend.calls == ["Welcome back to the channel"]
+    assert service.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+    # Another process using the same directory shares the audio
+    assert speak(VoiceService(str(tmp_path), max_bytes=10 ** 6), backend, "Welcome back to the channel") == path
+    assert len(backend.calls) == 1
+
+
+def test_voice_settings_are_part_of_the_key(tmp_path):
+    service, backend = VoiceService(str(tmp_path), max_bytes=10 ** 6), RecordingBackend()
+    paths = {
+        speak(service, backend, "Hello"),
+        speak(service, backend, "Hello", voice='alloy'),
+        speak(service, backend, "Hello", speed=1.25),
+        speak(service, backend, "Hello", response_format='wav'),
+        speak(service, backend, "Hello", model='other'),
+    }
+    assert len(paths) == 5 and len(backend.calls) == 5
+
+
+def test_deleted_file_is_generated_again(tmp_path):
+    service, backend = VoiceService(str(tmp_path), max_bytes=10 ** 6), RecordingBackend()
+    path = speak(service, backend, "Hello")
+    os.remove(path)
+    assert speak(service, backend, "Hello") == path
+    assert os.path.exists(path) and len(backend.calls) == 2
+
+
+def test_least_recently_used_audio_is_evicted(tmp_path):
+    service, backend = VoiceService(str(tmp_path), max_bytes=250, min_age=0), RecordingBackend()
+    first = speak(service, backend, "first")
+    time.sleep(0.01)
+    second = speak(service, backend, "second")
+    time.sleep(0.01)
+    # Using the first file again makes the second the least recently used
+    assert speak(service, backend, "first") == first
+    time.sleep(0.01)
+    third = speak(service, backend, "third")
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert speak(service, backend, "second") == second
+    assert backend.calls == ["first", "second", "third", "second"]
+
+
+def test_recently_used_audio_is_not_evicted(tmp_path):
+    service, backend = VoiceService(str(tmp_path), max_bytes=150, min_age=3600), RecordingBackend()
+    paths = [speak(service, backend, text) for text in ("one", "two", "three")]
+    # Over max_bytes, but a running job may still be using every file
+    assert all(os.path.exists(path) for path in paths)
@@ -0,0 +1,37 @@
+import sys
+import os
+
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.captions.word_atlas import WordAtlas
+
+
+def make_atlas():
+    return WordAtlas(None, 32, {'base': ('white', 'white'), 'active': ('yellow', 'yellow')}).build(["HELLO", "WORLD", "HELLO"])
+
+
+def test_each_word_is_rasterized_once_per_state():
+    atlas = make_atlas()
+    assert set(atlas.slices) == {(word, state) for word in ("HELLO", "WORLD") for state in ('base', 'active')}
+    assert atlas.get("HELLO", 'base').shape == (atlas.line_height, atlas.word_width("HELLO"), 4)
+
+
+def test_compose_keeps_straight_alpha():
+    atlas = make_atlas()
+    positions, height = atlas.layout(["HELLO", "WORLD"], 400)
+    canvas = np.zeros((height, 400, 4), dtype=np.float32)
+    atlas.compose(canvas, ["HELLO", "WORLD"], positions, ['base', 'active'])
+
+    # Antialiased white glyph edges stay white, only their alpha is partial
+    first_word = canvas[:, :positions[1][0]]
+    edges = first_word[(first_word[..., 3] > 0.05) & (first_word[..., 3] < 0.95)]
+    assert len(edges) and np.allclose(edges[:, :3], 1.0, atol=1e-3)
+
+    # Composing twice over the same spot doesn't darken the color either
+    atlas.compose(canvas, ["HELLO"], positions[:1], ['base'])
+    first_word = canvas[:, :positions[1][0]]
+    covered = first_word[first_word[..., 3] > 0.05]
+    assert np.allclose(covered[:, :3], 1.0, atol=1e-3)
@@ -0,0 +1,52 @@
+import sys
+import os
+import tempfile
+
+# Add project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
+
+from src.workspace import SCRATCH_SUBDIR, JobWorkspace
+
+
+def test_workspace_is_removed_when_the_job_fails():
+    root, scratch_root = tempfile.mkdtemp(prefix="workspaces_"), tempfile.mkdtemp(prefix="scratch_")
+    try:
+        with JobWorkspace("job", root=root, scratch_root=scratch_root, keep=False) as workspace:
+            with open(workspace.file("output.mp4"), "wb") as f:
+                f.write(b"video")
+            with open(workspace.scratch_file("audio.wav"), "wb") as f:
+                f.write(b"audio")
+            assert os.path.dirname(workspace.scratch_dir) == os.path.join(scratch_root, SCRATCH_SUBDIR)
+            raise RuntimeError("render failed")
+    except RuntimeError:
+        pass
+
+    assert not os.path.exists(workspace.path)
+    assert not os.path.exists(workspace.scratch_dir)
+
+
+def test_concurrent_jobs_get_their_own_directories():
+    root = tempfile.mkdtemp(prefix="workspaces_")
+    with JobWorkspace("job", root=root, keep=False) as first, JobWorkspace("job", root=root, keep=False) as second:
+        assert first.path != second.path
+        assert first.scratch_dir.startswith(first.path + os.sep)
+
+
+def test_stale_workspaces_are_swept_and_other_files_left_alone():
+    root, scratch_root = tempfile.mkdtemp(prefix="workspaces_"), tempfile.mkdtemp(prefix="scratch_")
+    stale = [os.path.join(root, "old-job"), os.path.join(scratch_root, SCRATCH_SUBDIR, "old-job")]
+    foreign = os.path.join(scratch_root, "another-program")
+    for directory in stale + [foreign]:
+        os.makedirs(directory)
+        os.utime(directory, (0, 0))
+
+    with JobWorkspace(root=root, scratch_root=scratch_root, keep=False):
+        assert not any(os.path.exists(directory) for directory in stale)
+        assert os.path.exists(foreign)
+
+
+def test_kept_workspace_survives_the_job():
+    root = tempfile.mkdtemp(prefix="workspaces_")
+    with JobWorkspace(root=root, keep=True) as workspace:
+        pass
+    assert os.path.isdir(workspace.path)
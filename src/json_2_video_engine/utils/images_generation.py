@@ -1,10 +1,15 @@
 import os
-import uuid
 import logging
 from dotenv import load_dotenv
 from openai import OpenAI
 import requests
 
+from ...providers.circuit_breaker import get_circuit_breaker
+from ...providers.http_client import http_client
+from ...providers.image_cache import image_cache
+from ...providers.pollinations import fetch_pollinations_image
+from ...providers.rate_limiter import rate_limiter
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -13,68 +18,44 @@ pexels_api_key = os.getenv("PEXELS_API_KEY")
 pixabay_api_key = os.getenv("PIXABAY_API_KEY") or ''
 
 def download_image(image_url):
-    response = requests.get(image_url, timeout=15)
-    #save the image to the assets folder
-    assets_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'images')
-    os.makedirs(assets_dir, exist_ok=True)
-    image_path = os.path.join(assets_dir, f"{uuid.uuid4()}.jpg")
-    with open(image_path, 'wb') as f:
-        f.write(response.content)
-    
-    logging.info(f"Downloaded image to: {image_path}")
+    """Download an image into the image cache, or reuse the cached copy"""
+    cached_path = image_cache.get_file(image_url)
+    if cached_path:
+        logging.info(f"Using cached image: {cached_path}")
+        return cached_path
+
+    try:
+        response = http_client.get(image_url, timeout=15)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.error(f"Failed to download image {image_url}: {e!r}")
+        return None
+    image_path = image_cache.put_bytes(response.content, response.headers.get('Content-Type'), image_url)
+    if image_path:
+        logging.info(f"Downloaded image to: {image_path}")
     return image_path
 
-def generate_image_pollinations(query, width=540, height=960, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=30):
+def generate_image_pollinations(query, width=540, height=960, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=30, base_url=None):
     """Generate an image using Pollinations AI API
     
+    The image is generated and transferred once, the bytes are returned with the seed that produced them.
+
     Args:
         query (str): Text description of the image to generate
-        width (int, optional): Width of generated image. Defaults to 1024
-        height (int, optional): Height of generated image. Defaults to 1024
+        width (int, optional): Width of generated image. Defaults to 540
+        height (int, optional): Height of generated image. Defaults to 960
         model (str, optional): Model to use for generation
-        seed (int, optional): Seed for reproducible results
+        seed (int, optional): Seed for reproducible results, a random one is used and returned if not set
         nologo (bool, optional): Turn off logo rendering. Defaults to False
         private (bool, optional): Prevent image from appearing in public feed. Defaults to True
         enhance (bool, optional): Enable prompt enhancing via LLM. Defaults to False
         timeout (int, optional): Maximum time to wait for image generation in seconds. Defaults to 30
+        base_url (str, optional): Pollinations endpoint, defaults to POLLINATIONS_BASE_URL
     
     Returns:
-        list: List containing the generated image URL if successful, empty list otherwise
+        dict: The image bytes ('content'), 'content_type', 'url', 'seed' and the cached file 'path', None on failure
     """
-    try:
-        # Build query parameters
-        params = {
-            'width': width,
-            'height': height,
-            'nologo': str(nologo).lower(),
-            'private': str(private).lower(),
-            'enhance': str(enhance).lower()
-        }
-        if model:
-            params['model'] = model
-        if seed is not None:
-            params['seed'] = seed
-
-        # URL encode the prompt
-        encoded_query = requests.utils.quote(query)
-        generate_url = f"https://image.pollinations.ai/prompt/{encoded_query}"
-
-        full_url = requests.Request('GET', generate_url, params=params).prepare().url
-        response = requests.get(full_url, timeout=timeout)
-        
-        if response.status_code == 200:
-            # Validate URL before returning
-            if not full_url.startswith(('http://', 'https://')):
-                logging.error(f"Invalid URL generated: {full_url}")
-                return []
-            return [full_url]
-        
-        logging.error(f"Failed to generate image. Status code: {response.status_code}")
-        return []
-        
-    except requests.exceptions.Timeout:
-        logging.error(f"Timeout occurred while generating image: {full_url}")
-        return []
+    return fetch_pollinations_image(query, width, height, model, seed, nologo, private, enhance, timeout, base_url)
 
 def search_pexels_images(query):
     """Search for images using Pexels API and return the URLs."""
@@ -89,19 +70,37 @@ def search_pexels_images(query):
         'per_page': 2
     }
     
+    cached_urls = image_cache.get_urls('pexels', query)
+    if cached_urls:
+        return cached_urls
+
+    # Ask the breaker first, a token is only spent on a request that is actually sent
+    breaker = get_circuit_breaker('pexels')
+    if not breaker.allow():
+        logging.info("Pexels circuit is open, skipping")
+        return []
+
+    if not rate_limiter.acquire('pexels', pexels_api_key):
+        breaker.release()
+        return []
+
     try:
-        response = requests.get(search_url, headers=headers, params=params)
+        response = http_client.get(search_url, headers=headers, params=params)
+        breaker.record_response(response.status_code, response.headers)
         response.raise_for_status()  # Raise an error for bad responses
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP error occurred: {e}")  # Log the error
         return []  # Return an empty list on error
     except Exception as e:
+        breaker.record_failure()
         logging.error(f"An error occurred during the request: {e}")
         return []
 
     search_results = response.json()
     image_urls = [photo['src']['original'] for photo in search_results.get('photos', [])]  # Extract image URLs
-    return image_urls[0]
+    if image_urls:
+        image_cache.put_urls('pexels', query, image_urls)
+    return image_urls
 
 def search_pixabay_images(query):
     """Search for images using Pixabay API and return the URLs."""
@@ -114,17 +113,35 @@ def search_pixabay_images(query):
         'per_page': 3
     }
         
+    cached_urls = image_cache.get_urls('pixabay', query)
+    if cached_urls:
+        return cached_urls
+
+    # Ask the breaker first, a token is only spent on a request that is actually sent
+    breaker = get_circuit_breaker('pixabay')
+    if not breaker.allow():
+        logging.info("Pixabay circuit is open, skipping")
+        return []
+
+    if not rate_limiter.acquire('pixabay', pixabay_api_key):
+        breaker.release()
+        return []
+
     try:
-        response = requests.get(search_url, params=params)
+        response = http_client.get(search_url, params=params)
+        breaker.record_response(response.status_code, response.headers)
         response.raise_for_status()  # Raise an error for bad responses
     except requests.exceptions.HTTPError as e:
         logging.error(f"HTTP error occurred: {e}")  # Log the error
         return []  # Return an empty list on error
     except Exception as e:
+        breaker.record_failure()
         logging.error(f"An error occurred during the request: {e}")
         return []
 
     search_results = response.json()
     image_urls = [hit['largeImageURL'] for hit in search_results.get('hits', [])]  # Extract image URLs
-    return image_urls[0]
+    if image_urls:
+        image_cache.put_urls('pixabay', query, image_urls)
+    return image_urls
 
@@ -0,0 +1,131 @@
+import io
+import logging
+import subprocess
+import threading
+import wave
+
+import numpy as np
+from moviepy.config import get_setting
+
+
+def get_ffmpeg_binary():
+    """Use the same ffmpeg binary as moviepy"""
+    return get_setting("FFMPEG_BINARY")
+
+
+def iter_pcm_blocks(media_path, sample_rate=16000, block_seconds=1.0):
+    """Stream the audio track of any audio/video file as mono float32 PCM blocks.
+
+    ffmpeg decodes and resamples on the fly, so only one block is held in memory at a time.
+
+    Args:
+        media_path (str): Audio or video file
+        sample_rate (int, optional): Output sample rate. Defaults to 16000
+        block_seconds (float, optional): Length of each yielded block. Defaults to 1.0
+
+    Yields:
+        np.ndarray: float32 samples in [-1, 1]
+    """
+    command = [
+        get_ffmpeg_binary(), '-nostdin', '-loglevel', 'error',
+        '-i', media_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-'
+    ]
+    block_bytes = int(sample_rate * block_seconds) * 4
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+        if process.returncode not in (0, -9):
+            logging.error(f"ffmpeg failed to decode {media_path}: {process.stderr.read().decode(errors='ignore')}")
+        process.stderr.close()
+
+
+def load_pcm(media_path, sample_rate=16000, duration=None):
+    """Decode the audio track of any audio/video file to one mono float32 array, straight from an ffmpeg pipe.
+
+    This is the input local Whisper expects (16 kHz mono float32), so nothing is encoded or written to disk.
+
+    Args:
+        media_path (str): Audio or video file
+        sample_rate (int, optional): Output sample rate. Defaults to 16000
+        duration (float, optional): Only decode the first duration seconds, padded with silence to exactly
+            that length. Defaults to the whole track
+
+    Returns:
+        np.ndarray: float32 samples in [-1, 1]
+    """
+    command = [get_ffmpeg_binary(), '-nostdin', '-loglevel', 'error', '-i', media_path]
+    if duration is not None:
+        command += ['-t', str(duration)]
+    command += ['-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', '-']
+    process = subprocess.run(command, capture_output=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {media_path}: {process.stderr.decode(errors='ignore').strip()}")
+    data = process.stdout
+    # Copied into a writable array, torch refuses read-only buffers
+    samples = np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32).copy()
+    if duration is not None:
+        length = int(round(duration * sample_rate))
+        samples = np.pad(samples[:length], (0, max(0, length - len(samples))))
+    return samples
+
+
+def concat_pcm(segments, sample_rate=16000):
+    """Decode (media_path, duration) segments one after the other into one preallocated float32 array"""
+    lengths = [int(round(duration * sample_rate)) for _, duration in segments]
+    samples = np.zeros(sum(lengths), dtype=np.float32)
+    offset = 0
+    for (media_path, duration), length in zip(segments, lengths):
+        samples[offset:offset + length] = load_pcm(media_path, sample_rate, duration)[:length]
+        offset += length
+    return samples
+
+
+class CodecPassMetrics:
+    """Audio encode/decode passes avoided by handing PCM to the ASR in memory instead of through a temp file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def record(self, job, passes_saved):
+        with self._lock:
+            self._jobs[job] = self._jobs.get(job, 0) + passes_saved
+        logging.info(f"{job}: audio handed to the ASR in memory, {passes_saved} encode/decode passes saved")
+
+    def snapshot(self):
+        with self._lock:
+            return {'jobs': dict(self._jobs), 'passes_saved': sum(self._jobs.values())}
+
+
+codec_pass_metrics = CodecPassMetrics()
+
+
+def _write_wav(target, samples, sample_rate):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype('<i2')
+    with wave.open(target, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+
+
+def pcm_to_wav_bytes(samples, sample_rate=16000):
+    """Encode float32 mono samples as an in-memory 16-bit WAV file"""
+    buffer = io.BytesIO()
+    _write_wav(buffer, samples, sample_rate)
+    return buffer.getvalue()
+
+
+def write_wav(wav_path, samples, sample_rate):
+    """Write float32 mono samples to a 16-bit WAV file"""
+    _write_wav(wav_path, samples, sample_rate)
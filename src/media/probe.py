@@ -0,0 +1,77 @@
+import functools
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+import mutagen
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.aac', '.wav', '.ogg', '.opus', '.flac')
+
+
+def _ffprobe(media_path):
+    """Duration, size and frame rate from one ffprobe call"""
+    output = subprocess.run(
+        [shutil.which('ffprobe'), '-v', 'error', '-show_entries',
+         'format=duration:stream=codec_type,width,height,avg_frame_rate', '-of', 'json', media_path],
+        capture_output=True, check=True
+    ).stdout
+    data = json.loads(output)
+    info = {'duration': float(data.get('format', {}).get('duration', 0) or 0), 'width': None, 'height': None, 'fps': None, 'has_audio': False}
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'video' and info['width'] is None:
+            info['width'], info['height'] = stream.get('width'), stream.get('height')
+            num, _, den = stream.get('avg_frame_rate', '0/1').partition('/')
+            info['fps'] = float(num) / float(den) if float(den or 0) else None
+        elif stream.get('codec_type') == 'audio':
+            info['has_audio'] = True
+    return info
+
+
+def _ffmpeg_infos(media_path):
+    """Same information from moviepy's header parser (one `ffmpeg -i`, no decoding) when ffprobe isn't installed"""
+    infos = ffmpeg_parse_infos(media_path)
+    width, height = infos.get('video_size') or (None, None)
+    return {'duration': infos.get('duration'), 'width': width, 'height': height, 'fps': infos.get('video_fps'), 'has_audio': infos.get('audio_found', False)}
+
+
+@functools.lru_cache(maxsize=256)
+def _probe(media_path, size, mtime_ns):
+    if media_path.lower().endswith(AUDIO_EXTENSIONS):
+        # Audio headers are read in-process, no ffmpeg at all
+        audio = mutagen.File(media_path)
+        if audio is not None and audio.info.length:
+            return {'duration': audio.info.length, 'width': None, 'height': None, 'fps': None, 'has_audio': True, 'size': size}
+    info = _ffprobe(media_path) if shutil.which('ffprobe') else _ffmpeg_infos(media_path)
+    info['size'] = size
+    return info
+
+
+def probe(media_path):
+    """Metadata of an audio or video file without opening a moviepy reader.
+
+    Results are cached by (path, size, mtime), so a file rewritten in place is probed again.
+
+    Returns:
+        dict: 'duration' (seconds), 'width', 'height', 'fps', 'has_audio' and 'size' (bytes), None on failure
+    """
+    try:
+        media_path = os.path.abspath(str(media_path))
+        stat = os.stat(media_path)
+        return dict(_probe(media_path, stat.st_size, stat.st_mtime_ns))
+    except Exception as e:
+        logging.error(f"Error probing {media_path}: {e}")
+        return None
+
+
+def get_duration(media_path):
+    info = probe(media_path)
+    return info['duration'] if info else None
+
+
+def get_dimensions(media_path):
+    """(width, height) of a video, (None, None) for audio or on failure"""
+    info = probe(media_path)
+    return (info['width'], info['height']) if info else (None, None)
@@ -0,0 +1,59 @@
+import logging
+import subprocess
+
+from src.captions.ass_writer import ass_filter
+from src.media.pcm import get_ffmpeg_binary
+
+
+def _run_ffmpeg(arguments):
+    process = subprocess.run([get_ffmpeg_binary(), '-y', '-nostdin', '-loglevel', 'error', *arguments], capture_output=True)
+    return process.returncode, process.stderr.decode(errors='ignore').strip()
+
+
+def mux_audio_tracks(video_path, audio_tracks, output_path, ass_captions_path=None, audio_bitrate='128k'):
+    """Put new soundtracks on a video without re-encoding its frames.
+
+    The video stream is copied as is and each audio track is encoded to AAC, so the cost is a remux, not a render.
+    The video is only re-encoded (libx264) when captions are burned in, or as a fallback when the source codec
+    can't be copied into an mp4.
+
+    Args:
+        video_path (str): Source video, its audio is dropped
+        audio_tracks (list): (audio_path, title) tuples, one audio stream each in this order, title may be None
+        output_path (str): mp4 file to write
+        ass_captions_path (str, optional): ASS file to burn in. Defaults to None
+        audio_bitrate (str, optional): AAC bitrate. Defaults to '128k'
+
+    Returns:
+        str: output_path, None on failure
+    """
+    inputs = ['-i', video_path]
+    for audio_path, _ in audio_tracks:
+        inputs += ['-i', audio_path]
+    inputs += ['-map', '0:v:0']
+    for index, (_, title) in enumerate(audio_tracks):
+        inputs += ['-map', f'{index + 1}:a:0']
+        if title:
+            # mp4 players show handler_name as the track name, title is kept for other containers
+            inputs += [f'-metadata:s:a:{index}', f'title={title}', f'-metadata:s:a:{index}', f'handler_name={title}']
+    audio = ['-c:a', 'aac', '-b:a', audio_bitrate, '-movflags', '+faststart', output_path]
+    encode = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '18', '-pix_fmt', 'yuv420p']
+
+    if ass_captions_path:
+        returncode, error = _run_ffmpeg(inputs + encode + ['-vf', ass_filter(ass_captions_path)] + audio)
+    else:
+        returncode, error = _run_ffmpeg(inputs + ['-c:v', 'copy'] + audio)
+        if returncode != 0:
+            logging.warning(f"Could not stream-copy the video of {video_path} ({error}), re-encoding it")
+            returncode, error = _run_ffmpeg(inputs + encode + audio)
+
+    if returncode != 0:
+        logging.error(f"Error muxing {len(audio_tracks)} audio tracks into {video_path}: {error}")
+        return None
+    logging.info(f"{len(audio_tracks)} audio tracks muxed into {output_path}")
+    return output_path
+
+
+def replace_audio(video_path, audio_path, output_path, ass_captions_path=None, audio_bitrate='128k'):
+    """Swap the soundtrack of a video for audio_path, see mux_audio_tracks"""
+    return mux_audio_tracks(video_path, [(audio_path, None)], output_path, ass_captions_path, audio_bitrate)
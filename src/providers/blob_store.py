@@ -0,0 +1,154 @@
+import contextlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class BlobStore:
+    """Files on disk addressed by a hex digest key, indexed in SQLite, shared by every process using the directory.
+
+    Blobs are written atomically (temp file + rename) under cache_dir/<key[:2]>/<key><extension> and are
+    read-only once stored: callers use them in place. Once the store is over max_bytes the least recently used
+    blobs are evicted, except those used in the last min_age seconds, so a running job can't lose a file.
+
+    Subclasses declare extra columns of the blobs table (columns), keep their own tables in the same index
+    (_create_tables) and drop the rows that point to evicted blobs (_forget).
+    """
+
+    name = 'Blob'
+    columns = ()
+
+    def __init__(self, cache_dir, max_bytes, min_age=3600):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.db_path = os.path.join(self.cache_dir, 'index.sqlite3')
+        self.hits = 0
+        self.misses = 0
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as db:
+                        db.execute("PRAGMA journal_mode=WAL")
+                        columns = ''.join(f", {column}" for column in self.columns)
+                        db.execute(f"CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, path TEXT, size INTEGER, last_access REAL{columns})")
+                        db.execute("CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access)")
+                        self._create_tables(db)
+                        db.commit()
+                    self._initialized = True
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _create_tables(self, db):
+        """Create the subclass tables, run once per process"""
+
+    def _forget(self, db, keys):
+        """Delete the subclass rows of blobs that were just evicted"""
+
+    def get(self, key):
+        """Path of the blob stored under key, None if there is none. Counts a hit or a miss"""
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT path FROM blobs WHERE hash = ?", (key,)).fetchone()
+                if row and not os.path.exists(row[0]):
+                    db.execute("DELETE FROM blobs WHERE hash = ?", (key,))
+                    row = None
+                if row:
+                    db.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logging.error(f"{self.name} cache lookup failed: {e}")
+            row = None
+        if row:
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, content, extension, **columns):
+        """Store content under key (if not already stored) and return its path.
+
+        Args:
+            key (str): Hex digest naming the blob
+            content (bytes): File content
+            extension (str): File extension, with its dot
+            **columns: Values of the extra columns of the blobs table added by the subclass
+
+        Returns:
+            str: Path of the stored file
+        """
+        path = os.path.join(self.cache_dir, key[:2], key + extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write next to the target and rename, readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+        names = ['hash', 'path', 'size', 'last_access', *columns]
+        try:
+            with self._connect() as db:
+                db.execute(
+                    f"INSERT OR REPLACE INTO blobs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    (key, path, len(content), time.time(), *columns.values())
+                )
+            self.evict()
+        except sqlite3.Error as e:
+            logging.error(f"{self.name} cache write failed: {e}")
+        return path
+
+    def evict(self):
+        """Delete least recently used blobs until the store fits in max_bytes"""
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            candidates = db.execute(
+                "SELECT hash, path, size FROM blobs WHERE last_access < ? ORDER BY last_access",
+                (time.time() - self.min_age,)
+            ).fetchall()
+            evicted = []
+            for key, path, size in candidates:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.error(f"Could not evict cached file {path}: {e}")
+                    continue
+                db.execute("DELETE FROM blobs WHERE hash = ?", (key,))
+                total -= size
+                evicted.append(key)
+            self._forget(db, evicted)
+        logging.info(f"{self.name} cache evicted {len(evicted)} files, {total / 1024 / 1024:.1f} MB left")
+
+    def contains(self, path):
+        """Whether path is a file owned by the cache, which jobs must not delete"""
+        return os.path.abspath(path).startswith(self.cache_dir + os.sep)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate}
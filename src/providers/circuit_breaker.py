@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker.
+
+    Opens after `failure_threshold` consecutive failures (errors, timeouts, error statuses) or on a 429,
+    then rejects calls for `cooldown` seconds (or the provider's Retry-After, if longer). After the cooldown
+    one probe call is let through: it closes the breaker if it succeeds and re-opens it if it fails.
+    """
+
+    def __init__(self, name, failure_threshold=None, cooldown=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_BREAKER_FAILURES', 3))
+        self.cooldown = cooldown or float(os.getenv('CIRCUIT_BREAKER_COOLDOWN', 60))
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_until = 0
+        self.probe_in_flight = False
+        self.transitions = Counter()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state, reason):
+        logging.warning(f"Circuit breaker {self.name}: {self.state} -> {state} ({reason})")
+        self.transitions[f"{self.state}->{state}"] += 1
+        self.state = state
+
+    def allow(self):
+        """Whether a call to the provider may go ahead. Callers that get True must record the outcome."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() >= self.opened_until:
+                self._transition(HALF_OPEN, "cooldown elapsed")
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self.probe_in_flight):
+                self.probe_in_flight = self.state == HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED, "probe succeeded")
+
+    def record_failure(self, rate_limited=False, retry_after=None):
+        """Record a failed call. A 429 (rate_limited) opens the breaker straight away, for at least retry_after seconds"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self.probe_in_flight = False
+            reason = "rate limited" if rate_limited else f"{self.consecutive_failures} consecutive failures"
+            if rate_limited or self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_until = time.monotonic() + max(self.cooldown, retry_after or 0)
+                if self.state != OPEN:
+                    self._transition(OPEN, reason)
+
+    def release(self):
+        """Give back an allowed call that was cancelled before it had an outcome"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_response(self, status_code, headers=None):
+        """Record the outcome of an HTTP response from its status code"""
+        if status_code >= 400:
+            retry_after = (headers or {}).get('Retry-After')
+            self.record_failure(status_code == 429, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        else:
+            self.record_success()
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'rejected': self.rejected,
+            'transitions': dict(self.transitions)
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """The process-wide breaker of a provider, shared by every ImageHandler and the json2video utils"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def circuit_breaker_stats():
+    """State and counters of every breaker, for monitoring"""
+    with _breakers_lock:
+        return {name: breaker.snapshot() for name, breaker in _breakers.items()}
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 15))
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', 8))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_delay(response, attempt, cap=8.0):
+    """How long to wait before retrying a response, None if it should not be retried.
+
+    A Retry-After longer than cap is not waited out, the response is returned so the caller
+    (and its circuit breaker) can give up on the provider for now.
+    """
+    if response.status_code not in RETRY_STATUSES:
+        return None
+    retry_after = response.headers.get('Retry-After')
+    if retry_after and retry_after.isdigit():
+        return float(retry_after) if float(retry_after) <= cap else None
+    return backoff_delay(attempt, cap=cap)
+
+
+class HttpMetrics:
+    """Request counts, retries, errors and timings per host"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = defaultdict(lambda: {'requests': 0, 'retries': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'statuses': defaultdict(int)})
+
+    def record(self, url, elapsed, status_code=None, retry=False):
+        with self._lock:
+            host = self._hosts[urlparse(url).netloc]
+            host['requests'] += 1
+            host['total_seconds'] += elapsed
+            host['max_seconds'] = max(host['max_seconds'], elapsed)
+            if retry:
+                host['retries'] += 1
+            if status_code is None:
+                host['errors'] += 1
+            else:
+                host['statuses'][status_code] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                netloc: {
+                    'requests': host['requests'],
+                    'retries': host['retries'],
+                    'errors': host['errors'],
+                    'avg_seconds': host['total_seconds'] / host['requests'],
+                    'max_seconds': host['max_seconds'],
+                    'statuses': dict(host['statuses'])
+                }
+                for netloc, host in self._hosts.items()
+            }
+
+
+http_metrics = HttpMetrics()
+
+
+class HttpClient:
+    """Pooled keep-alive requests session with a default timeout and retries on 429/5xx and connection errors.
+
+    Read timeouts are not retried, a slow provider would just be waited on again.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max_connections_per_host, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, retries=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                http_metrics.record(url, time.perf_counter() - start, retry=attempt > 0)
+                if attempt == retries:
+                    raise
+                logging.warning(f"{method} {urlparse(url).netloc} failed ({e.__class__.__name__}), retrying")
+                time.sleep(backoff_delay(attempt))
+                continue
+            except Exception:
+                http_metrics.record(url, time.perf_counter() - start, retry=attempt > 0)
+                raise
+            http_metrics.record(url, time.perf_counter() - start, response.status_code, retry=attempt > 0)
+            delay = retry_delay(response, attempt) if attempt < retries else None
+            if delay is None:
+                return response
+            logging.warning(f"{method} {urlparse(url).netloc} returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+
+class AsyncHttpClient:
+    """Async counterpart of HttpClient around an httpx.AsyncClient.
+
+    httpx pools connections per client, not per host, so the per-host limit is enforced with semaphores.
+    Create one per event loop (e.g. per video) and use it as an async context manager.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+        self.max_retries = max_retries
+        self.max_connections_per_host = max_connections_per_host
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=32)
+        )
+        self._host_limits = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return self._host_limits[host]
+
+    async def request(self, method, url, retries=None, **kwargs):
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                async with self._host_limit(url):
+                    response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                http_metrics.record(url, time.perf_counter() - start, retry=attempt > 0)
+                if attempt == retries:
+                    raise
+                logging.warning(f"{method} {urlparse(url).netloc} failed ({e.__class__.__name__}), retrying")
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            except Exception:
+                http_metrics.record(url, time.perf_counter() - start, retry=attempt > 0)
+                raise
+            http_metrics.record(url, time.perf_counter() - start, response.status_code, retry=attempt > 0)
+            delay = retry_delay(response, attempt) if attempt < retries else None
+            if delay is None:
+                return response
+            logging.warning(f"{method} {urlparse(url).netloc} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+
+http_client = HttpClient()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+
+from .blob_store import BlobStore
+from .image_ingest import normalize_image
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets', 'cache', 'images'
+)
+
+
+def image_extension(content_type):
+    """File extension for an image Content-Type, .jpg when unknown"""
+    subtype = (content_type or '').split(';')[0].split('/')[-1].strip().lower()
+    return {'png': '.png', 'webp': '.webp', 'gif': '.gif'}.get(subtype, '.jpg')
+
+
+def normalize_query(query):
+    """Lowercase, strip punctuation and collapse whitespace, so trivially different phrasings share an entry"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', query.lower()).split())
+
+
+class ImageCache(BlobStore):
+    """Two-level image cache on disk, shared by every process using the same cache directory.
+
+    - Queries: (provider, normalized query, orientation) -> result URLs, valid for query_ttl seconds
+    - Images: source URL -> content hash -> file, files are named after the SHA-256 of their bytes
+
+    Images are validated and normalized (RGB/RGBA, downscaled to MAX_IMAGE_SIDE) before they are stored, their
+    dimensions are kept in the index. Files are stored, shared and evicted by BlobStore.
+    """
+
+    name = 'Image'
+    columns = ('width INTEGER', 'height INTEGER')
+
+    def __init__(self, cache_dir=None, max_bytes=None, query_ttl=None, min_age=3600):
+        super().__init__(
+            cache_dir or IMAGE_CACHE_DIR,
+            max_bytes or int(float(os.getenv('IMAGE_CACHE_MAX_MB', 1024)) * 1024 * 1024),
+            min_age
+        )
+        self.query_ttl = query_ttl or float(os.getenv('IMAGE_QUERY_CACHE_TTL', 7 * 24 * 3600))
+
+    def _create_tables(self, db):
+        db.execute("CREATE TABLE IF NOT EXISTS queries (key TEXT PRIMARY KEY, urls TEXT, expires_at REAL)")
+        db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, hash TEXT)")
+
+    def _forget(self, db, keys):
+        db.executemany("DELETE FROM urls WHERE hash = ?", [(key,) for key in keys])
+        db.execute("DELETE FROM queries WHERE expires_at < ?", (time.time(),))
+
+    @staticmethod
+    def _query_key(provider, query, orientation):
+        return f"{provider}|{orientation or 'any'}|{normalize_query(query)}"
+
+    def get_urls(self, provider, query, orientation=None):
+        """Cached result URLs of a provider query, None on a miss or once expired"""
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT urls, expires_at FROM queries WHERE key = ?", (self._query_key(provider, query, orientation),)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Image cache lookup failed: {e}")
+            return None
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put_urls(self, provider, query, urls, orientation=None):
+        try:
+            with self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO queries (key, urls, expires_at) VALUES (?, ?, ?)",
+                    (self._query_key(provider, query, orientation), json.dumps(list(urls)), time.time() + self.query_ttl)
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Image cache write failed: {e}")
+
+    def get_file(self, url):
+        """Path of the cached image downloaded from url, None if it isn't cached"""
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT hash FROM urls WHERE url = ?", (url,)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Image cache lookup failed: {e}")
+            return None
+        if not row:
+            self.misses += 1
+            return None
+        return self.get(row[0])
+
+    def put_bytes(self, content, content_type='image/jpeg', url=None):
+        """Normalize image bytes (see normalize_image), store them if not already stored and return the cached path.
+
+        Returns:
+            str: Path of the cached file, None if the image was rejected
+        """
+        image = normalize_image(content)
+        if image is None:
+            if url:
+                logging.error(f"Not caching rejected image from {url}")
+            return None
+        content_hash = hashlib.sha256(image['content']).hexdigest()
+        path = self.put(content_hash, image['content'], image_extension(image['content_type']), width=image['width'], height=image['height'])
+        if url:
+            try:
+                with self._connect() as db:
+                    db.execute("INSERT OR REPLACE INTO urls (url, hash) VALUES (?, ?)", (url, content_hash))
+            except sqlite3.Error as e:
+                logging.error(f"Image cache write failed: {e}")
+        return path
+
+    def put_file(self, path):
+        """Normalized cached copy of a local image file (see put_bytes), made once per version of the file.
+
+        Returns:
+            str: Path of the cached file, None if the image was rejected or can't be read
+        """
+        path = os.path.abspath(path)
+        try:
+            key = f"file://{path}?mtime={os.path.getmtime(path)}"
+            cached_path = self.get_file(key)
+            if cached_path:
+                return cached_path
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            logging.error(f"Could not read image {path}: {e}")
+            return None
+        return self.put_bytes(content, url=key)
+
+    def dimensions(self, path):
+        """(width, height) of a cached image from the index, without decoding it. None if unknown"""
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT width, height FROM blobs WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Image cache lookup failed: {e}")
+            return None
+        return tuple(row) if row and row[0] is not None else None
+
+
+image_cache = ImageCache()
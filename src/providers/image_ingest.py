@@ -0,0 +1,66 @@
+import io
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+# Decoded size limit, checked from the header before any pixel is decoded
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 40_000_000))
+# Longest side any timeline needs (1920 for 1080x1920 shorts and 1920x1080 json2video renders)
+MAX_IMAGE_SIDE = int(os.getenv('MAX_IMAGE_SIDE', 1920))
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'BMP'}
+
+
+def has_alpha(img):
+    return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def normalize_image(content, max_side=MAX_IMAGE_SIDE, max_pixels=MAX_IMAGE_PIXELS):
+    """Validate downloaded image bytes and turn them into a render-ready file.
+
+    Rejects unknown formats and images over max_pixels (decompression bombs) before decoding, applies the
+    EXIF orientation, converts to RGB (RGBA if the image has transparency) and downscales so the longest
+    side is at most max_side. JPEGs that already fit are kept byte for byte.
+
+    Returns:
+        dict: 'content', 'content_type', 'width' and 'height' of the normalized image, None if it was rejected
+    """
+    try:
+        img = Image.open(io.BytesIO(content))
+    except Exception as e:
+        logging.error(f"Rejected image: not a readable image ({e})")
+        return None
+
+    try:
+        if img.format not in ALLOWED_FORMATS:
+            logging.error(f"Rejected image: unsupported format {img.format}")
+            return None
+        width, height = img.size
+        if width * height > max_pixels:
+            logging.error(f"Rejected image: {width}x{height} is over the {max_pixels} pixel limit")
+            return None
+
+        orientation = img.getexif().get(0x0112, 1)
+        if img.format == 'JPEG' and img.mode == 'RGB' and orientation == 1 and max(width, height) <= max_side:
+            return {'content': content, 'content_type': 'image/jpeg', 'width': width, 'height': height}
+
+        if img.format == 'JPEG':
+            # Let the JPEG decoder downscale by a power of two while decoding, it is much cheaper
+            img.draft('RGB', (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if has_alpha(img) else 'RGB')
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if img.mode == 'RGBA':
+            img.save(output, format='PNG', optimize=True)
+            content_type = 'image/png'
+        else:
+            img.save(output, format='JPEG', quality=90)
+            content_type = 'image/jpeg'
+        return {'content': output.getvalue(), 'content_type': content_type, 'width': img.width, 'height': img.height}
+    except Exception as e:
+        logging.error(f"Rejected image: could not decode ({e!r})")
+        return None
+    finally:
+        img.close()
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import weakref
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+# Load environment variables from .env file
+load_dotenv()
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+# Per-request timeout of every LLM/TTS/ASR call, a hung call raises instead of stalling the job
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 120))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 20))
+
+# httpx pools are bound to the event loop they were used on, and GUI.py/MindGUI.py run every video in
+# its own asyncio.run(), so the clients are created once per running loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def _loop_clients():
+    loop = asyncio.get_running_loop()
+    clients = _clients.get(loop)
+    if clients is None:
+        http_client = httpx.AsyncClient(
+            timeout=LLM_TIMEOUT,
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        )
+        clients = {'http_client': http_client}
+        _clients[loop] = clients
+    return clients
+
+
+def async_openai():
+    """AsyncOpenAI client for the running event loop, sharing its connection pool with async_openrouter()"""
+    clients = _loop_clients()
+    if 'openai' not in clients:
+        clients['openai'] = AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            http_client=clients['http_client'],
+            timeout=LLM_TIMEOUT
+        )
+    return clients['openai']
+
+
+def async_openrouter():
+    """AsyncOpenAI client pointed at OpenRouter for the running event loop"""
+    clients = _loop_clients()
+    if 'openrouter' not in clients:
+        clients['openrouter'] = AsyncOpenAI(
+            base_url=OPENROUTER_BASE_URL,
+            api_key=os.getenv('OPENROUTER_API_KEY'),
+            http_client=clients['http_client'],
+            timeout=LLM_TIMEOUT
+        )
+    return clients['openrouter']
@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from PIL import Image
+
+from .image_cache import normalize_query
+
+LOCAL_LIBRARY_DB = os.getenv('LOCAL_IMAGE_LIBRARY_DB') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets', 'local_library.sqlite3'
+)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it', 'its', 'of', 'on',
+    'or', 'that', 'the', 'this', 'to', 'with', 'image', 'photo', 'picture', 'showing'
+}
+
+
+def orientation_of(width, height):
+    if width > height:
+        return 'landscape'
+    if height > width:
+        return 'portrait'
+    return 'square'
+
+
+def read_sidecar(image_path):
+    """Tags and caption of an image from a sidecar file next to it.
+
+    image.json can hold {"tags": [...], "caption": "..."}, image.txt holds a caption.
+    """
+    base = os.path.splitext(image_path)[0]
+    tags, caption = [], ''
+    if os.path.exists(base + '.json'):
+        try:
+            with open(base + '.json', 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            tags = data.get('tags', [])
+            caption = data.get('caption', '')
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Could not read sidecar {base}.json: {e}")
+        if not isinstance(tags, list):
+            # A string would be joined character by character
+            logging.warning(f"Ignoring tags of sidecar {base}.json, expected a list")
+            tags = []
+        if not isinstance(caption, str):
+            caption = ''
+    elif os.path.exists(base + '.txt'):
+        try:
+            with open(base + '.txt', 'r', encoding='utf-8', errors='ignore') as f:
+                caption = f.read().strip()
+        except OSError as e:
+            logging.warning(f"Could not read sidecar {base}.txt: {e}")
+    return ' '.join(str(tag) for tag in tags), caption
+
+
+class LocalImageLibrary:
+    """Full-text index (SQLite FTS5, BM25 ranking) of a local stock image library.
+
+    The index holds the file name and folder names, tags and caption of every image, with its dimensions.
+    Build it once with `python -m src.providers.local_library <library dir>`; if the index file doesn't
+    exist the library is simply skipped.
+    """
+
+    def __init__(self, db_path=None, min_score=None):
+        self.db_path = db_path or LOCAL_LIBRARY_DB
+        # Minimum BM25 relevance (higher is better) for a match to be used instead of the remote providers
+        self.min_score = min_score or float(os.getenv('LOCAL_IMAGE_MIN_SCORE', 5.0))
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return os.path.exists(self.db_path)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _create_tables(self, db):
+        db.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL, width INTEGER, height INTEGER)")
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(filename, tags, caption, tokenize='porter unicode61')")
+
+    def index_directory(self, library_dir):
+        """Index (or re-index the changed files of) every image under library_dir.
+
+        Returns:
+            int: Number of images added or updated
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        library_dir = os.path.abspath(library_dir)
+        updated = 0
+        seen = set()
+        with self._lock, self._connect() as db:
+            self._create_tables(db)
+            known = {path: (file_id, mtime) for file_id, path, mtime in db.execute("SELECT id, path, mtime FROM files")}
+            for root, _, files in os.walk(library_dir):
+                for file_name in files:
+                    if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, file_name)
+                    seen.add(path)
+                    mtime = os.path.getmtime(path)
+                    if path in known and known[path][1] == mtime:
+                        continue
+                    try:
+                        with Image.open(path) as img:
+                            width, height = img.size
+                    except Exception as e:
+                        logging.warning(f"Skipping unreadable image {path}: {e}")
+                        continue
+
+                    if path in known:
+                        file_id = known[path][0]
+                        db.execute("UPDATE files SET mtime = ?, width = ?, height = ? WHERE id = ?", (mtime, width, height, file_id))
+                        db.execute("DELETE FROM images_fts WHERE rowid = ?", (file_id,))
+                    else:
+                        file_id = db.execute("INSERT INTO files (path, mtime, width, height) VALUES (?, ?, ?, ?)", (path, mtime, width, height)).lastrowid
+                    # Folder names are usually categories ("nature/forest"), index them with the file name
+                    relative_name = os.path.splitext(os.path.relpath(path, library_dir))[0]
+                    tags, caption = read_sidecar(path)
+                    db.execute(
+                        "INSERT INTO images_fts (rowid, filename, tags, caption) VALUES (?, ?, ?, ?)",
+                        (file_id, re.sub(r'[\W_]+', ' ', relative_name), tags, caption)
+                    )
+                    updated += 1
+
+            removed = [(file_id,) for path, (file_id, _) in known.items() if path.startswith(library_dir + os.sep) and path not in seen]
+            db.executemany("DELETE FROM images_fts WHERE rowid = ?", removed)
+            db.executemany("DELETE FROM files WHERE id = ?", removed)
+        logging.info(f"Local image library: {updated} images indexed, {len(removed)} removed")
+        return updated
+
+    @staticmethod
+    def _match_expression(query):
+        terms = [term for term in normalize_query(query).split() if term not in STOPWORDS]
+        return ' OR '.join(f'"{term}"' for term in terms)
+
+    def search(self, query, orientation=None, min_width=0, min_height=0, limit=5):
+        """Best matching images for a query, most relevant first.
+
+        Returns:
+            list: dicts with 'path', 'width', 'height' and 'score' (higher is better)
+        """
+        expression = self._match_expression(query)
+        if not expression or not self.available:
+            return []
+
+        sql = (
+            "SELECT f.path, f.width, f.height, bm25(images_fts, 1.0, 2.0, 1.5) AS rank FROM images_fts "
+            "JOIN files f ON f.id = images_fts.rowid "
+            "WHERE images_fts MATCH ? AND f.width >= ? AND f.height >= ?"
+        )
+        params = [expression, min_width, min_height]
+        if orientation == 'landscape':
+            sql += " AND f.width > f.height"
+        elif orientation == 'portrait':
+            sql += " AND f.height > f.width"
+        elif orientation == 'square':
+            sql += " AND f.width = f.height"
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self._connect() as db:
+                rows = db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Local image library search failed: {e}")
+            return []
+        # FTS5 bm25() is negative, more negative is more relevant
+        return [{'path': path, 'width': width, 'height': height, 'score': -rank} for path, width, height, rank in rows if os.path.exists(path)]
+
+    def best_match(self, query, orientation=None, min_width=0, min_height=0, min_score=None):
+        """Path of the best local image for a query if it scores at least min_score (self.min_score by default), None otherwise"""
+        results = self.search(query, orientation, min_width, min_height, limit=1)
+        if results and results[0]['score'] >= (min_score or self.min_score):
+            logging.info(f"Local image library match ({results[0]['score']:.1f}) for {query}: {results[0]['path']}")
+            return results[0]['path']
+        return None
+
+    def contains(self, path):
+        """Whether path is an indexed library image, which jobs must never delete"""
+        if not self.available:
+            return False
+        try:
+            with self._connect() as db:
+                return db.execute("SELECT 1 FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
+
+local_library = LocalImageLibrary()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Index a local image library for image search")
+    parser.add_argument('library_dir', help="Directory with the library images (and optional .json/.txt sidecars)")
+    parser.add_argument('--db', default=None, help="Index file, defaults to LOCAL_IMAGE_LIBRARY_DB")
+    args = parser.parse_args()
+    LocalImageLibrary(args.db).index_directory(args.library_dir)
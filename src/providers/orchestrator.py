@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import time
+from collections import deque
+
+
+class ProviderStats:
+    """Rolling latency and success statistics of one provider over its last `window` calls"""
+
+    def __init__(self, window=50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.calls = 0
+        self.cancelled = 0
+
+    def record(self, latency, success):
+        self.calls += 1
+        self.outcomes.append(bool(success))
+        if success:
+            self.latencies.append(latency)
+
+    def record_cancelled(self, elapsed=None):
+        """A call cancelled after elapsed seconds, its latency is at least that (a censored sample)"""
+        self.cancelled += 1
+        if elapsed is not None:
+            # Leaving slow cancelled calls out would pull the percentiles, and so the hedge delay, ever lower
+            self.latencies.append(elapsed)
+
+    @property
+    def success_rate(self):
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else None
+
+    def percentile(self, q):
+        """Latency percentile (0-100) of the successful and cancelled calls in the window, None without samples"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'cancelled': self.cancelled,
+            'success_rate': self.success_rate,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90)
+        }
+
+
+class ProviderOrchestrator:
+    """Runs a chain of providers in sequential, race or hedged mode.
+
+    - sequential: the next provider starts only when the previous one failed (the old behaviour, the default)
+    - race: all providers start at once, the first acceptable result wins
+    - hedged: the next provider also starts once the running one has taken longer than its p90 latency
+
+    The first acceptable result is returned in every mode and the providers still running are cancelled.
+    Stats are kept per provider name across calls, they drive the hedge delay and are exposed by stats().
+    Latencies are measured from when a provider got its concurrency slot, and a cancelled call counts with
+    the time it had run.
+    """
+
+    MODES = ('sequential', 'race', 'hedged')
+
+    def __init__(self, mode=None, window=50, min_samples=5, default_hedge_delay=5.0, min_hedge_delay=0.5):
+        self.mode = mode or os.getenv('IMAGE_PROVIDER_MODE', 'sequential')
+        if self.mode not in self.MODES:
+            logging.warning(f"Unknown provider mode {self.mode}, using sequential")
+            self.mode = 'sequential'
+        self.window = window
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self._stats = {}
+
+    def get_stats(self, name):
+        if name not in self._stats:
+            self._stats[name] = ProviderStats(self.window)
+        return self._stats[name]
+
+    def stats(self):
+        """Rolling stats of every provider seen so far, for monitoring"""
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def hedge_delay(self, name):
+        """How long to wait for a provider before starting the next one"""
+        if self.mode == 'race':
+            return 0
+        if self.mode == 'sequential':
+            return None
+        stats = self.get_stats(name)
+        if len(stats.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, stats.percentile(90))
+
+    async def _timed(self, name, provider, accept, limit=None):
+        start = None
+        try:
+            # Time spent queued behind the provider's concurrency limit is not the provider's latency
+            async with limit or contextlib.nullcontext():
+                start = time.perf_counter()
+                try:
+                    result = await provider()
+                except Exception as e:
+                    logging.error(f"Provider {name} failed: {e!r}")
+                    result = None
+        except asyncio.CancelledError:
+            self.get_stats(name).record_cancelled(None if start is None else time.perf_counter() - start)
+            raise
+        self.get_stats(name).record(time.perf_counter() - start, accept(result))
+        return result
+
+    async def run(self, providers, accept=bool):
+        """Run providers until one returns an acceptable result.
+
+        Args:
+            providers (list): (name, provider) or (name, provider, limit) tuples in order of preference,
+                provider is a coroutine function taking no arguments and limit an asyncio.Semaphore it runs under
+            accept (callable, optional): Whether a result is usable. Defaults to truthiness
+
+        Returns:
+            tuple: (name, result) of the winning provider, (None, None) if no provider succeeded
+        """
+        remaining = list(providers)
+        running = {}
+        try:
+            while remaining or running:
+                if remaining:
+                    name, provider, *limit = remaining.pop(0)
+                    running[asyncio.create_task(self._timed(name, provider, accept, *limit))] = name
+                    delay = self.hedge_delay(name)
+                    if delay == 0 and remaining:
+                        continue
+                else:
+                    delay = None
+
+                # Wait for a result, or until it is time to start the next provider
+                while running:
+                    done, _ = await asyncio.wait(running, timeout=delay if remaining else None, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        if remaining:
+                            logging.info(f"Provider {running[next(iter(running))]} is slow, hedging with {remaining[0][0]}")
+                        break
+                    for task in done:
+                        name = running.pop(task)
+                        result = task.result()
+                        if accept(result):
+                            return name, result
+                    if remaining:
+                        # A provider failed, start the next one straight away
+                        break
+            return None, None
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
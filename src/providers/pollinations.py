@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import random
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from .circuit_breaker import get_circuit_breaker
+from .http_client import http_client
+from .image_cache import image_cache
+
+POLLINATIONS_BASE_URL = os.getenv('POLLINATIONS_BASE_URL', 'https://image.pollinations.ai')
+
+
+def build_pollinations_url(query, width=1024, height=1024, model=None, seed=None, nologo=False, private=True, enhance=False, base_url=None):
+    """Build the Pollinations generation URL for a prompt.
+
+    A random seed is picked when none is given, so the image can be reproduced later.
+
+    Returns:
+        tuple: (full_url, seed)
+    """
+    if seed is None:
+        seed = random.randint(0, 2**31 - 1)
+
+    params = {
+        'width': width,
+        'height': height,
+        'seed': seed,
+        'nologo': str(nologo).lower(),
+        'private': str(private).lower(),
+        'enhance': str(enhance).lower()
+    }
+    if model:
+        params['model'] = model
+
+    # URL encode the prompt
+    generate_url = f"{base_url or POLLINATIONS_BASE_URL}/prompt/{requests.utils.quote(query)}"
+    full_url = requests.Request('GET', generate_url, params=params).prepare().url
+    return full_url, seed
+
+
+def _image_result(response, full_url, seed):
+    content_type = response.headers.get('Content-Type', '')
+    if response.status_code != 200:
+        logging.error(f"Failed to generate image. Status code: {response.status_code}")
+        return None
+    if not content_type.startswith('image/') or not response.content:
+        logging.error(f"Pollinations returned no image ({content_type or 'no content type'})")
+        return None
+    return {
+        'provider': 'pollinations',
+        'url': full_url,
+        'seed': seed,
+        'content': response.content,
+        'content_type': content_type
+    }
+
+
+def _cached_image(query, width, height, seed):
+    """Image generated earlier for the same prompt and size, unless a specific seed is asked for"""
+    if seed is not None:
+        return None
+    urls = image_cache.get_urls('pollinations', query, f"{width}x{height}")
+    path = image_cache.get_file(urls[0]) if urls else None
+    if not path:
+        return None
+    with open(path, 'rb') as f:
+        content = f.read()
+    logging.info(f"Using cached Pollinations image for: {query}")
+    return {
+        'provider': 'pollinations',
+        'url': urls[0],
+        'seed': int(parse_qs(urlparse(urls[0]).query).get('seed', [0])[0]),
+        'content': content,
+        'content_type': mimetypes.guess_type(path)[0] or 'image/jpeg',
+        'path': path
+    }
+
+
+def _cache_image(query, width, height, result):
+    if not result:
+        return None
+    result['path'] = image_cache.put_bytes(result['content'], result['content_type'], result['url'])
+    if not result['path']:
+        return None  # Rejected at ingestion
+    image_cache.put_urls('pollinations', query, [result['url']], f"{width}x{height}")
+    return result
+
+
+def fetch_pollinations_image(query, width=1024, height=1024, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=30, base_url=None):
+    """Generate an image with Pollinations and keep the bytes from that single request.
+
+    Images are kept in the image cache, a prompt already generated at the same size is served from there.
+
+    Returns:
+        dict: 'provider', 'url', 'seed', 'content' (image bytes), 'content_type' and 'path' (the cached file),
+            None on failure
+    """
+    cached = _cached_image(query, width, height, seed)
+    if cached:
+        return cached
+
+    breaker = get_circuit_breaker('pollinations')
+    if not breaker.allow():
+        logging.info("Pollinations circuit is open, skipping")
+        return None
+
+    full_url, seed = build_pollinations_url(query, width, height, model, seed, nologo, private, enhance, base_url)
+    try:
+        response = http_client.get(full_url, timeout=timeout)
+    except Exception as e:
+        breaker.record_failure()
+        logging.error(f"Error generating image with Pollinations: {e!r}")
+        return None
+    breaker.record_response(response.status_code, response.headers)
+    return _cache_image(query, width, height, _image_result(response, full_url, seed))
+
+
+async def fetch_pollinations_image_async(client, query, width=1024, height=1024, model=None, seed=None, nologo=False, private=True, enhance=False, timeout=30, base_url=None):
+    """Async version of fetch_pollinations_image using an httpx.AsyncClient"""
+    cached = await asyncio.to_thread(_cached_image, query, width, height, seed)
+    if cached:
+        return cached
+
+    breaker = get_circuit_breaker('pollinations')
+    if not breaker.allow():
+        logging.info("Pollinations circuit is open, skipping")
+        return None
+
+    full_url, seed = build_pollinations_url(query, width, height, model, seed, nologo, private, enhance, base_url)
+    try:
+        response = await client.get(full_url, timeout=timeout)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        breaker.record_failure()
+        logging.error(f"Error generating image with Pollinations: {e!r}")
+        return None
+    breaker.record_response(response.status_code, response.headers)
+    return await asyncio.to_thread(_cache_image, query, width, height, _image_result(response, full_url, seed))
@@ -0,0 +1,151 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+RATE_LIMITER_DB = os.getenv('RATE_LIMITER_DB') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets', 'cache', 'rate_limits.sqlite3'
+)
+
+# requests/seconds per API key, overridable with <PROVIDER>_RATE_LIMIT (e.g. PEXELS_RATE_LIMIT=200/3600)
+DEFAULT_RATE_LIMITS = {
+    'pexels': '200/3600',
+    'pixabay': '100/60'
+}
+
+
+def parse_rate_limit(value):
+    """'200/3600' -> (capacity 200, 200 / 3600 tokens per second)"""
+    count, seconds = value.split('/')
+    return float(count), float(count) / float(seconds)
+
+
+class RateLimiter:
+    """Token buckets per provider and API key, stored in SQLite so all generator processes on a node share them.
+
+    A call takes a token if one is available, otherwise it waits for the bucket to refill instead of
+    sending a request that would get a 429. Waits longer than max_wait are not worth it: the call is
+    refused and the caller moves on to the next source.
+    """
+
+    def __init__(self, db_path=None, limits=None, max_wait=None):
+        self.db_path = db_path or RATE_LIMITER_DB
+        self.limits = limits or {
+            provider: parse_rate_limit(os.getenv(f'{provider.upper()}_RATE_LIMIT', default))
+            for provider, default in DEFAULT_RATE_LIMITS.items()
+        }
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('RATE_LIMIT_MAX_WAIT', 30))
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    with contextlib.closing(sqlite3.connect(self.db_path, timeout=30)) as db:
+                        db.execute("PRAGMA journal_mode=WAL")
+                        db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+                        db.commit()
+                    self._initialized = True
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            # Take the write lock up front, the read-refill-write below must not interleave across processes
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _bucket_key(provider, api_key):
+        key_hash = hashlib.sha256((api_key or '').encode()).hexdigest()[:12]
+        return f"{provider}:{key_hash}"
+
+    def _refill(self, db, key, capacity, rate, now):
+        row = db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return capacity
+        return min(capacity, row[0] + (now - row[1]) * rate)
+
+    def _try_acquire(self, provider, api_key):
+        """Take a token if there is one. Returns 0 on success, otherwise the seconds until one is available."""
+        capacity, rate = self.limits[provider]
+        key = self._bucket_key(provider, api_key)
+        now = time.time()
+        with self._transaction() as db:
+            tokens = self._refill(db, key, capacity, rate, now)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            db.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+        return wait
+
+    def acquire(self, provider, api_key=None):
+        """Block until a request to provider may be sent.
+
+        Returns:
+            bool: True if a token was taken, False if the provider would be rate limited for longer than max_wait
+        """
+        if provider not in self.limits:
+            return True
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                wait = self._try_acquire(provider, api_key)
+            except sqlite3.Error as e:
+                logging.error(f"Rate limiter unavailable, not limiting {provider}: {e}")
+                return True
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                logging.warning(f"{provider} quota exhausted, next request possible in {wait:.0f}s")
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, provider, api_key=None):
+        """acquire() for async code, waits without blocking the event loop"""
+        if provider not in self.limits:
+            return True
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            try:
+                wait = await asyncio.to_thread(self._try_acquire, provider, api_key)
+            except sqlite3.Error as e:
+                logging.error(f"Rate limiter unavailable, not limiting {provider}: {e}")
+                return True
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                logging.warning(f"{provider} quota exhausted, next request possible in {wait:.0f}s")
+                return False
+            await asyncio.sleep(wait)
+
+    def remaining(self, provider, api_key=None):
+        """Requests left in the bucket right now and the bucket size, e.g. (37.5, 200.0)"""
+        if provider not in self.limits:
+            return None, None
+        capacity, rate = self.limits[provider]
+        try:
+            with self._transaction() as db:
+                return self._refill(db, self._bucket_key(provider, api_key), capacity, rate, time.time()), capacity
+        except sqlite3.Error as e:
+            logging.error(f"Rate limiter unavailable: {e}")
+            return None, capacity
+
+    def budget_low(self, provider, api_key=None, threshold=0.1):
+        """Whether less than threshold of the provider's quota is left"""
+        tokens, capacity = self.remaining(provider, api_key)
+        return tokens is not None and tokens < capacity * threshold
+
+
+rate_limiter = RateLimiter()
@@ -2,16 +2,17 @@ import yaml
 import logging
 from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, TextClip, CompositeAudioClip, ColorClip
 import random
-from openai import OpenAI
 import os
 import re
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-
 from .image_handler import ImageHandler
 from .video_editor import VideoEditor
 from .captions.caption_handler import CaptionHandler
+from .media.probe import get_dimensions, get_duration
+from .providers.llm_clients import async_openrouter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
 
 def load_prompt(file_path):
     """Load the YAML prompt template file."""
@@ -33,17 +34,15 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 openai_api_key = os.getenv('OPENAI_API_KEY')
 pexels_api_key = os.getenv('PEXELS_API_KEY')
 
-openai = OpenAI(api_key=openai_api_key)
-
 class RedditStoryGenerator:
     def __init__(self):
         self.video_editor: VideoEditor = VideoEditor()
         self.image_handler: ImageHandler = ImageHandler(pexels_api_key, openai_api_key)
         self.caption_handler: CaptionHandler = CaptionHandler()
 
-    def gpt_summary_of_script(self, video_script: str) -> str:
+    async def gpt_summary_of_script(self, video_script: str) -> str:
         try:
-            completion = self.video_editor.openrouter.chat.completions.create(
+            completion = await async_openrouter().chat.completions.create(
                 model="mistralai/mistral-7b-instruct:free",
                 temperature=0.25,
                 max_tokens=250,
@@ -60,13 +59,11 @@ class RedditStoryGenerator:
             logging.error(f"Error generating script summary: {e}")
             return ""
 
-    async def create_reddit_question_clip(self, reddit_question: str, video_height: int = 720) -> tuple[TextClip, str]:
+    async def create_reddit_question_clip(self, reddit_question: str, video_height: int = 720, tts_backend: str = None) -> tuple[TextClip, str]:
         try:
             # Generate audio
-            reddit_question_audio_path = await self.video_editor.generate_voice(reddit_question)
-            reddit_question_audio_clip = AudioFileClip(reddit_question_audio_path)
-            reddit_question_audio_duration = reddit_question_audio_clip.duration
-            reddit_question_audio_clip.close()
+            reddit_question_audio_path = await self.video_editor.generate_voice(reddit_question, tts_backend)
+            reddit_question_audio_duration = get_duration(reddit_question_audio_path)
 
             # Create text clip using Pillow
             text_clip = self.video_editor.create_text_clip(
@@ -87,7 +84,8 @@ class RedditStoryGenerator:
                             video_url: str = '', 
                             video_topic: str = '',
                             captions_settings: dict = {},
-                            add_images: bool = True
+                            add_images: bool = True,
+                            tts_backend: str = None
                             ) -> dict:
         """Generate a video based on the provided topic or ready-made script.
 
@@ -97,6 +95,7 @@ class RedditStoryGenerator:
             video_url (str): The URL of the video to download.
             video_topic (str): The topic of the video if script type is 'based_on_topic'.        
             captions_settings (dict): The settings for the captions. (font, color, etc)
+            tts_backend (str): TTS engine of the voice-overs ('openai', or 'espeak'/'piper' for offline drafts).
 
         Returns:
             dict: A dictionary with the status of the video generation and a message.
@@ -118,8 +117,7 @@ class RedditStoryGenerator:
                 logging.error("Failed to download video.")
                 return {"status": "error", "message": "No video path provided."}
             # Get video dimensions
-            with VideoFileClip(video_path) as video:
-                video_width, video_height = video.w, video.h
+            video_width, video_height = get_dimensions(video_path)
 
             """ Handle Script Generation and Process """
             # Load prompt template
@@ -140,16 +138,14 @@ class RedditStoryGenerator:
             """ Define video length for each clip (question and story) """
             # Initialize Reddit clips
                         # Create the Reddit question clip with the actual video width
-            reddit_question_text_clip, reddit_question_audio_path = await self.create_reddit_question_clip(reddit_question, video_height)
+            reddit_question_text_clip, reddit_question_audio_path = await self.create_reddit_question_clip(reddit_question, video_height, tts_backend)
             reddit_question_audio_clip: AudioFileClip = AudioFileClip(reddit_question_audio_path)
             reddit_question_audio_duration: float = reddit_question_audio_clip.duration
             clips_to_close.append(reddit_question_audio_clip)
             # Initialize Background video
-            background_video_clip: VideoFileClip = VideoFileClip(video_path)
-            clips_to_close.append(background_video_clip)
-            background_video_length: float = background_video_clip.duration
+            background_video_length: float = get_duration(video_path)
             ## Initialize Story Audio
-            story_audio_path: str = await self.video_editor.generate_voice(youtube_short_story)
+            story_audio_path: str = await self.video_editor.generate_voice(youtube_short_story, tts_backend)
             if not story_audio_path:
                 logging.error("Failed to generate audio.")
                 return {"status": "error", "message": "Failed to generate audio."}
@@ -187,16 +183,33 @@ class RedditStoryGenerator:
             font_size = video_width * 0.025
 
             # Generate subtitles
-            story_subtitles_path, story_subtitles_clips = await self.caption_handler.process(
-                story_audio_path,
-                captions_settings.get('color', 'white'),
-                captions_settings.get('shadow_color', 'black'),
-                captions_settings.get('font_size', font_size),
-                captions_settings.get('font', 'LEMONMILK-Bold.otf')
-            )
+            story_captions_ass_path = None
+            if captions_settings.get('mode') == 'ass':
+                # Captions are burned in by ffmpeg in render_final_video instead of being composited per frame
+                story_subtitles, story_captions_ass_path = await self.caption_handler.process_ass(
+                    story_audio_path,
+                    captions_settings.get('color', 'white'),
+                    captions_settings.get('shadow_color', 'black'),
+                    captions_settings.get('font_size', font_size),
+                    captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                    video_width=story_video.w,
+                    video_height=story_video.h,
+                    time_offset=reddit_question_audio_duration
+                )
+                story_subtitles_clips = []
+            else:
+                story_subtitles, story_subtitles_clips = await self.caption_handler.process(
+                    story_audio_path,
+                    captions_settings.get('color', 'white'),
+                    captions_settings.get('shadow_color', 'black'),
+                    captions_settings.get('font_size', font_size),
+                    captions_settings.get('font', 'LEMONMILK-Bold.otf'),
+                    mode=captions_settings.get('mode', 'clips'),
+                    highlight_color=captions_settings.get('highlight_color', 'yellow')
+                )
 
             video_context: str = video_topic
-            story_image_paths = self.image_handler.get_images_from_subtitles(story_subtitles_path, video_context, story_audio_length) if add_images else []
+            story_image_paths = await self.image_handler.get_images_from_subtitles(story_subtitles, video_context, story_audio_length) if add_images else []
             story_video = self.video_editor.add_images_to_video(story_video, story_image_paths)
             
             story_video = self.video_editor.add_captions_to_video(story_video, story_subtitles_clips)
@@ -206,10 +219,13 @@ class RedditStoryGenerator:
                 story_video.set_start(reddit_question_audio_duration)
             ])
 
-            final_video_output_path = self.video_editor.render_final_video(combined_clips)
+            final_video_output_path = self.video_editor.render_final_video(combined_clips, story_captions_ass_path)
             
             # Cleanup: Ensure temporary files are removed
-            self.video_editor.cleanup_files([story_audio_path, cut_video_path, story_subtitles_path, reddit_question_audio_path], story_image_paths)
+            temp_files = [story_audio_path, cut_video_path, reddit_question_audio_path]
+            if story_captions_ass_path:
+                temp_files.append(story_captions_ass_path)
+            self.video_editor.cleanup_files(temp_files, story_image_paths)
             
             logging.info(f"FINAL OUTPUT PATH: {final_video_output_path}")
             return {"status": "success", "message": "Video generated successfully.", "output_path": final_video_output_path}
@@ -0,0 +1,118 @@
+import logging
+import os
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.media.pcm import iter_pcm_blocks, write_wav
+
+# Native rate of the OpenAI TTS voices, their WAV output is used without resampling
+DUBBING_SAMPLE_RATE = int(os.getenv('DUBBING_SAMPLE_RATE', 24000))
+
+
+def decode_audio(audio_path, sample_rate=DUBBING_SAMPLE_RATE):
+    """Decode an audio file to mono float32 samples at sample_rate.
+
+    16-bit WAV files already at sample_rate are read in-process, anything else goes through one ffmpeg pipe.
+    """
+    if audio_path.lower().endswith('.wav'):
+        try:
+            with wave.open(audio_path, 'rb') as wav_file:
+                channels, sample_width, framerate = wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate()
+                # Streamed WAVs (OpenAI TTS) carry a placeholder frame count, so read up to the end of the file
+                data = wav_file.readframes(2 ** 31 - 1) if sample_width == 2 and framerate == sample_rate else b''
+            if data:
+                samples = np.frombuffer(data[:len(data) - len(data) % (2 * channels)], dtype='<i2').astype(np.float32) / 32768
+                return samples.reshape(-1, channels).mean(axis=1) if channels > 1 else samples
+        except (wave.Error, EOFError) as e:
+            logging.warning(f"Could not read {audio_path} as WAV, decoding it with ffmpeg: {e}")
+    blocks = list(iter_pcm_blocks(audio_path, sample_rate=sample_rate))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+
+def time_stretch(samples, target_length, frame_length=1024, tolerance=256):
+    """Stretch or compress samples to target_length samples without changing the pitch (WSOLA).
+
+    Output frames are laid every frame_length // 2 samples and taken from the input at the stretched
+    position, shifted by up to tolerance samples to the offset that best continues the previous frame,
+    so the overlap-add stays in phase.
+
+    Args:
+        samples (np.ndarray): Mono float32 samples
+        target_length (int): Length of the output in samples
+        frame_length (int, optional): Analysis frame length. Defaults to 1024 (~43 ms at 24 kHz)
+        tolerance (int, optional): Maximum shift of a frame from its nominal position. Defaults to 256
+
+    Returns:
+        np.ndarray: float32 samples of length target_length
+    """
+    target_length = int(target_length)
+    if target_length <= 0:
+        return np.zeros(0, dtype=np.float32)
+    length = len(samples)
+    # Within half a frame of the target, padding or trimming is inaudible
+    if length == 0 or abs(length - target_length) <= frame_length // 2 or length < 2 * frame_length:
+        output = np.zeros(target_length, dtype=np.float32)
+        output[:min(length, target_length)] = samples[:target_length]
+        return output
+
+    hop = frame_length // 2
+    rate = length / target_length
+    window = np.hanning(frame_length + 1)[:-1].astype(np.float32)
+    padded = np.pad(samples.astype(np.float32), (tolerance, frame_length + 2 * tolerance + int(np.ceil(hop * rate)) + hop))
+    n_frames = target_length // hop + 1
+    output = np.zeros(n_frames * hop + frame_length, dtype=np.float32)
+    weights = np.zeros_like(output)
+
+    previous = 0
+    for k in range(n_frames):
+        nominal = int(round(k * hop * rate))
+        if k == 0:
+            position = 0
+        else:
+            # What would naturally follow the previous frame, and the candidate frames around the nominal position
+            natural = padded[previous + tolerance + hop:previous + tolerance + hop + frame_length]
+            candidates = sliding_window_view(padded[nominal:nominal + 2 * tolerance + frame_length], frame_length)
+            position = nominal - tolerance + int(np.argmax(candidates @ natural))
+        start = k * hop
+        output[start:start + frame_length] += padded[position + tolerance:position + tolerance + frame_length] * window
+        weights[start:start + frame_length] += window
+        previous = position
+
+    output = output[:target_length]
+    weights = weights[:target_length]
+    np.divide(output, weights, out=output, where=weights > 1e-3)
+    return output
+
+
+def assemble_dub(cues, output_path, sample_rate=DUBBING_SAMPLE_RATE, total_duration=None):
+    """Lay the speech of every cue on one audio track, each stretched to fit its cue.
+
+    Cues are decoded one at a time into a single preallocated buffer and the track is written once, so memory
+    is bounded by the output length.
+
+    Args:
+        cues (list): (start_seconds, end_seconds, audio_path) tuples
+        output_path (str): WAV file to write
+        sample_rate (int, optional): Sample rate of the track. Defaults to DUBBING_SAMPLE_RATE
+        total_duration (float, optional): Length of the track. Defaults to the end of the last cue
+
+    Returns:
+        str: output_path
+    """
+    if total_duration is None:
+        total_duration = max((end for _, end, _ in cues), default=0)
+    track = np.zeros(int(round(total_duration * sample_rate)), dtype=np.float32)
+
+    for start, end, audio_path in cues:
+        offset = int(round(start * sample_rate))
+        length = min(int(round(end * sample_rate)), len(track)) - offset
+        if length <= 0:
+            continue
+        speech = decode_audio(audio_path, sample_rate)
+        track[offset:offset + length] += time_stretch(speech, length)
+
+    write_wav(output_path, track, sample_rate)
+    logging.info(f"Dubbed track of {len(cues)} cues assembled: {output_path}")
+    return output_path
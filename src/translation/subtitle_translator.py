@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from src.providers.llm_clients import async_openrouter
+
+
+class SubtitleTranslator:
+    """Translates subtitles in windows of cues, one chat completion per window.
+
+    Each request carries window_size cues to translate plus context_size cues on each side as read-only
+    context, and gets back a JSON object mapping cue index to translation. Windows run concurrently (at most
+    max_concurrency at a time). Cues missing from an answer are asked for again once, in one request per
+    window, and keep their original text if they are still missing.
+    """
+
+    def __init__(self, model="deepseek/deepseek-r1:free", window_size=None, context_size=3, max_concurrency=None):
+        self.model = model
+        self.window_size = window_size or int(os.getenv('TRANSLATION_WINDOW_SIZE', 20))
+        self.context_size = context_size
+        self.max_concurrency = max_concurrency or int(os.getenv('TRANSLATION_MAX_CONCURRENCY', 4))
+
+    async def _request(self, texts, indices, target_language):
+        """Translate texts[i] for i in indices, returns {index: translation} with whatever came back valid"""
+        first, last = indices[0], indices[-1]
+        before = range(max(0, first - self.context_size), first)
+        after = range(last + 1, min(len(texts), last + 1 + self.context_size))
+        payload = {
+            'context_before': {str(i): texts[i] for i in before},
+            'translate': {str(i): texts[i] for i in indices},
+            'context_after': {str(i): texts[i] for i in after}
+        }
+
+        response = await async_openrouter().chat.completions.create(
+            extra_headers={
+                "HTTP-Referer": "https://your-site.com",
+                "X-Title": "Your Site Name",
+            },
+            model=self.model,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": (
+                    f"You are a professional translator. Translate every subtitle in 'translate' to {target_language}. "
+                    "The subtitles in 'context_before' and 'context_after' are only there so the translation is coherent, "
+                    "do not translate them. Keep line breaks. Answer with a JSON object mapping each subtitle index of "
+                    "'translate' to its translation: {\"translations\": {\"<index>\": \"<translated subtitle>\"}}"
+                )},
+                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+            ]
+        )
+        answer = json.loads(response.choices[0].message.content)
+        translations = answer.get('translations', answer) if isinstance(answer, dict) else {}
+        if isinstance(translations, list):
+            # Also accept [{"index": 3, "text": "..."}]
+            translations = {str(item.get('index')): item.get('text') for item in translations if isinstance(item, dict)}
+
+        valid = {}
+        for i in indices:
+            text = translations.get(str(i)) if isinstance(translations, dict) else None
+            if isinstance(text, str) and text.strip():
+                valid[i] = text.strip()
+        return valid
+
+    async def _translate_window(self, semaphore, texts, indices, target_language, translated):
+        async with semaphore:
+            for attempt in range(2):
+                try:
+                    translated.update(await self._request(texts, indices, target_language))
+                except Exception as e:
+                    logging.error(f"Error translating subtitles {indices[0]}-{indices[-1]}: {e}")
+                indices = [i for i in indices if i not in translated]
+                if not indices:
+                    return
+                if attempt == 0:
+                    logging.warning(f"{len(indices)} subtitles missing from the translation, retrying them")
+            logging.error(f"Subtitles {indices} could not be translated, keeping the original text")
+
+    async def translate(self, texts, target_language):
+        """Translate a list of subtitle texts.
+
+        Returns:
+            list: The translated texts, in order
+        """
+        start_time = time.perf_counter()
+        texts = list(texts)
+        translated = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        windows = [list(range(i, min(i + self.window_size, len(texts)))) for i in range(0, len(texts), self.window_size)]
+        await asyncio.gather(*(self._translate_window(semaphore, texts, indices, target_language, translated) for indices in windows))
+
+        elapsed = time.perf_counter() - start_time
+        logging.info(f"Translated {len(texts)} subtitles in {len(windows)} windows in {elapsed:.1f}s ({len(texts) / max(elapsed, 1e-6):.1f} cues/s)")
+        return [translated.get(i, text) for i, text in enumerate(texts)]
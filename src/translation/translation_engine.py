@@ -18,184 +18,199 @@ NOT READY YET, STILL WORKING ON IT.
 
 """
 
+import asyncio
 import os
+import re
+import time
 import logging
-from openai import OpenAI
-from moviepy.editor import AudioFileClip, VideoFileClip, concatenate_audioclips, CompositeAudioClip
-import pysrt
-from typing import List
-import json
 
 from src.video_editor import VideoEditor
 from src.captions.subtitle_generator import SubtitleGenerator
-from moviepy.audio.fx.all import audio_fadein, audio_fadeout
-from moviepy.video.fx.all import speedx
+from src.captions.subtitle_track import SubtitleTrack
+from src.tts.voice_service import voice_service
+from src.translation.subtitle_translator import SubtitleTranslator
+from src.translation.dubbing import DUBBING_SAMPLE_RATE, assemble_dub
+from src.captions.ass_writer import write_ass
+from src.media.pcm import codec_pass_metrics, load_pcm
+from src.media.probe import get_dimensions
+from src.media.remux import mux_audio_tracks, replace_audio
+from src.workspace import JobWorkspace
+
+TRANSLATION_OUTPUT_DIR = os.getenv('TRANSLATION_OUTPUT_DIR') or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+# Subtitle lines synthesized at the same time, per language
+TTS_MAX_CONCURRENCY = int(os.getenv('TTS_MAX_CONCURRENCY', 4))
+
+
+def language_suffix(language):
+    """'_brazilian_portuguese' for 'Brazilian Portuguese', so every language gets its own output files"""
+    slug = re.sub(r'[^a-z0-9]+', '_', (language or '').lower()).strip('_')
+    return f'_{slug}' if slug else ''
 
 
 class TranslationEngine:
     def __init__(self):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY")
-        )
         self.video_editor = VideoEditor()
         self.subtitle_generator = SubtitleGenerator()
+        self.subtitle_translator = SubtitleTranslator()
 
-    async def translate_video(self, video_path, target_language):
+    async def translate_video(self, video_path, target_language, chunked_transcription=True, burn_captions=False, multi_track=False, job_id=None, tts_backend=None):
         """
         Translate the video script and generate a new audio file.
 
+        The video is transcribed once whatever the number of languages, then every language is translated,
+        voiced and muxed concurrently. Intermediate files live in a workspace private to the job, deleted when
+        it ends, so several translations can run at the same time.
+
         Args:
             video_path (str): Path to the original video file.
-            target_language (str): The target language for translation.
+            target_language (str or list): The target language for translation, or a list of them.
+            chunked_transcription (bool): Stream the soundtrack straight from the video and transcribe it in
+                silence-aligned chunks instead of decoding it into memory and transcribing that in one call.
+            burn_captions (bool): Burn the translated subtitles into the video, which requires re-encoding it.
+            multi_track (bool): Write one video with an audio track per language instead of one video per
+                language. Captions can't be burned in that case.
+            job_id (str, optional): Name of the job, used for its workspace and output files. Defaults to a random id.
+            tts_backend (str, optional): TTS engine of the dubbed voices ('openai', or 'espeak'/'piper' for offline
+                drafts). Defaults to TTS_BACKEND.
 
         Returns:
-            dict: A dictionary containing the status and the path to the translated video.
+            dict: For one language, the status, the path to the translated video and the time spent per step.
+                For a list, the overall status, the same dict per language under 'outputs' and the shared
+                'timings'.
         """
         try:
-            # Ensure the downloads directory exists
-            downloads_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'downloads')
-            os.makedirs(downloads_dir, exist_ok=True)
-            os.chmod(downloads_dir, 0o777)  # Set permissions
-
-            # Proceed with video download
-            video_path = os.path.join(downloads_dir, 'video.mp4')
-            # Your video download logic here...
-
-            # Extract audio from the video
-            video = VideoFileClip(video_path)
-            audio = video.audio
-            # Save audio path
-            audio_path = os.path.join(self.base_dir, '..', '..', 'assets', 'extracted_audio.mp3')
-            audio.write_audiofile(audio_path)
-
-            # Generate subtitles from the audio
-            subtitles_path = await self.subtitle_generator.generate_subtitles_for_translation(audio_path)
-
-            translated_script = await self._translate_subtitles(subtitles_path, target_language)
-            
-            # Generate new audio for the translated script
-            translated_audio_path = await self.generate_voice(translated_script)
-            
-            # Add translated audio to the video
-            translated_video = self.video_editor.add_audio_to_video(
-                video_path,
-                translated_audio_path
-            )
-
-            # Generate a path for the output video
-            output_dir = os.path.join(self.base_dir, '..', 'assets')
-            os.makedirs(output_dir, exist_ok=True)
-            translated_video_path = os.path.join(output_dir, 'translated_video.mp4')
-
-            logging.info(f"Rendering the translated video: {translated_video_path}")
-            translated_video.write_videofile(translated_video_path, codec='libx264', audio_codec='aac')
-
-            return {"status": "success", "translated_video_path": translated_video_path}
+            with JobWorkspace(job_id) as workspace:
+                start_time = time.perf_counter()
+                if chunked_transcription:
+                    # ffmpeg decodes the soundtrack chunk by chunk, nothing is written to disk
+                    audio_path = video_path
+                else:
+                    # 16 kHz mono PCM piped from ffmpeg into memory, instead of encoding an mp3 to be decoded again
+                    audio_path = await asyncio.to_thread(load_pcm, video_path)
+                    codec_pass_metrics.record(f"translation {workspace.job_id}", 2)
+
+                # Generate subtitles from the audio, once for every language
+                subtitles = await self.subtitle_generator.generate_subtitles_for_translation(audio_path, chunked=chunked_transcription)
+                timings = {'transcription': time.perf_counter() - start_time}
+
+                # Final videos go to the output directory under a job-unique name, everything else stays in the workspace
+                output_dir = TRANSLATION_OUTPUT_DIR
+                os.makedirs(output_dir, exist_ok=True)
+
+                if multi_track and burn_captions:
+                    logging.warning("Captions can't be burned into a multi-track video, they are skipped")
+                languages = [target_language] if isinstance(target_language, str) else list(dict.fromkeys(target_language))
+                results = await asyncio.gather(*(
+                    self._dub_language(workspace, video_path, subtitles, language, output_dir, burn_captions and not multi_track, mux=not multi_track, tts_backend=tts_backend)
+                    for language in languages
+                ))
+                outputs = dict(zip(languages, results))
+
+                if multi_track:
+                    dubbed = {language: result for language, result in outputs.items() if result['status'] == 'success'}
+                    if dubbed:
+                        start_time = time.perf_counter()
+                        translated_video_path = os.path.join(output_dir, f'translated_video_{workspace.job_id}_multi.mp4')
+                        audio_tracks = [(result['translated_audio_path'], language) for language, result in dubbed.items()]
+                        if not await asyncio.to_thread(mux_audio_tracks, video_path, audio_tracks, translated_video_path):
+                            raise RuntimeError("Could not add the translated audio tracks to the video")
+                        timings['mux'] = time.perf_counter() - start_time
+                        for result in dubbed.values():
+                            result['translated_video_path'] = translated_video_path
+
+                for result in results:
+                    # The dubbed tracks are removed with the workspace, they only live on in the videos
+                    result.pop('translated_audio_path', None)
+
+                if isinstance(target_language, str):
+                    result = outputs[target_language]
+                    result['timings'] = {**timings, **result['timings']}
+                    return result
+
+                succeeded = sum(result['status'] == 'success' for result in outputs.values())
+                status = 'success' if succeeded == len(outputs) else 'partial' if succeeded else 'error'
+                logging.info(f"{succeeded}/{len(outputs)} languages translated, transcription took {timings['transcription']:.1f}s")
+                return {"status": status, "outputs": outputs, "timings": timings}
 
         except Exception as e:
             logging.error(f"Error in video translation: {e}")
             return {"status": "error", "message": f"Error in video translation: {str(e)}"}
 
+    async def _dub_language(self, workspace, video_path, subtitles, target_language, output_dir, burn_captions=False, mux=True, tts_backend=None):
+        """Translate, voice and (if mux) remux the video for one language, timing each step."""
+        timings = {}
+        try:
+            start_time = time.perf_counter()
+            translated_script = await self._translate_subtitles(subtitles, target_language)
+            timings['translation'] = time.perf_counter() - start_time
 
-    async def _translate_subtitles(self, subtitles_path: str, target_language: str) -> List[pysrt.SubRipItem]:
-        """Translate each subtitle in the SRT file using OpenRouter's API."""
+            # Generate new audio for the translated script
+            start_time = time.perf_counter()
+            translated_audio_path = await self.generate_voice(translated_script, target_language, workspace.scratch_dir, tts_backend)
+            timings['voice'] = time.perf_counter() - start_time
+            result = {"status": "success", "translated_audio_path": translated_audio_path, "timings": timings}
+
+            if mux:
+                start_time = time.perf_counter()
+                suffix = language_suffix(target_language)
+                translated_video_path = os.path.join(output_dir, f'translated_video_{workspace.job_id}{suffix}.mp4')
+
+                ass_captions_path = None
+                if burn_captions:
+                    video_width, video_height = get_dimensions(video_path)
+                    # Regular subtitles: sized to the video, near the bottom, in the translation's own case
+                    ass_captions_path = write_ass(
+                        translated_script, workspace.scratch_file(f'translated_captions{suffix}.ass'), video_width, video_height,
+                        font_size=video_height * 0.045, caption_width=video_width, position=('center', 0.92),
+                        anchor='bottom', uppercase=False
+                    )
+
+                # Copy the video stream and mux in the translated audio, frames are only re-encoded to burn captions in
+                logging.info(f"Muxing the translated audio into: {translated_video_path}")
+                if not await asyncio.to_thread(replace_audio, video_path, translated_audio_path, translated_video_path, ass_captions_path):
+                    raise RuntimeError("Could not add the translated audio to the video")
+                timings['mux'] = time.perf_counter() - start_time
+                result["translated_video_path"] = translated_video_path
+
+            logging.info(f"{target_language} done in {sum(timings.values()):.1f}s: " + ", ".join(f"{step} {seconds:.1f}s" for step, seconds in timings.items()))
+            return result
+        except Exception as e:
+            logging.error(f"Error translating the video to {target_language}: {e}")
+            return {"status": "error", "message": f"Error in video translation: {str(e)}", "timings": timings}
+
+    async def _translate_subtitles(self, subtitles: SubtitleTrack, target_language: str) -> SubtitleTrack:
+        """Translate the subtitles of the track in batched windows using OpenRouter's API."""
         try:
-            subs = pysrt.open(subtitles_path)
-            translated_subs = []
-            
-            for i, sub in enumerate(subs):
-                prev_text = subs[i-1].text if i > 0 else ""
-                next_text = subs[i+1].text if i < len(subs) - 1 else ""
-
-                json_response = '''{
-                    "current_translated_subtitle": ""
-                }'''
-                
-                response = self.client.chat.completions.create(
-                    extra_headers={
-                        "HTTP-Referer": "https://your-site.com",
-                        "X-Title": "Your Site Name",
-                    },
-                    model="deepseek/deepseek-r1:free",
-                    response_format={"type": "json_object"},
-                    messages=[
-                        {"role": "system", "content": f"You are a professional translator. Translate the current subtitle to {target_language}. Use the previous and next subtitles as context to ensure the translation is coherent. Answer in the JSON format: {json_response}"},
-                        {"role": "user", "content": f"Previous subtitle: {prev_text}\nCurrent subtitle: {sub.text}\nNext subtitle: {next_text}"}
-                    ]
-                )
-                
-                response_json = response.choices[0].message.content
-                translated_sub_data = json.loads(response_json)
-                translated_text = translated_sub_data.get("current_translated_subtitle", "")
-                
-                translated_sub = pysrt.SubRipItem(
-                    index=sub.index,
-                    start=sub.start,
-                    end=sub.end,
-                    text=translated_text
-                )
-                translated_subs.append(translated_sub)
-            
-            return translated_subs
+            translated_texts = await self.subtitle_translator.translate(subtitles.texts, target_language)
+            return subtitles.with_texts(translated_texts)
         except Exception as e:
             logging.error(f"Error translating subtitles: {e}")
             raise
 
     # Common function
-    async def generate_voice(self, translated_subtitles):
+    async def generate_voice(self, translated_subtitles, target_language=None, output_dir=None, tts_backend=None):
         """Generate a new audio file for each translated subtitle line and match with timing."""
         try:
-            speech_file_dir = os.path.join(self.base_dir, '..', 'assets')
+            speech_file_dir = output_dir or os.path.join(self.base_dir, '..', 'assets')
             os.makedirs(speech_file_dir, exist_ok=True)
             
-            audio_clips = []
-            
-            for i, subtitle in enumerate(translated_subtitles):
-                speech_file_path = os.path.join(speech_file_dir, f'generated_speech_{i}.mp3')
-                response = self.client.audio.speech.create(
-                    model="tts-1",
-                    voice="echo",
-                    input=subtitle.text
-                )
-                response.stream_to_file(speech_file_path)
-                
-                # Load the generated audio
-                audio_clip = AudioFileClip(speech_file_path)
-                
-                # Calculate the desired duration based on subtitle timing
-                desired_duration = (subtitle.end.seconds + subtitle.end.milliseconds / 1000) - (subtitle.start.seconds + subtitle.start.milliseconds / 1000)
-                
-                # if audio duration is longer than desired duration, speed up the audio
-                if audio_clip.duration > desired_duration:
-                    speed_factor = audio_clip.duration / desired_duration
-                    audio_clip = CompositeAudioClip([audio_clip]).set_duration(audio_clip.duration)
-                    audio_clip = speedx(audio_clip, factor=speed_factor)
-                # if audio duration is shorter than desired duration, slow down the audio
-                elif audio_clip.duration < desired_duration:
-                    speed_factor = desired_duration / audio_clip.duration
-                    audio_clip = CompositeAudioClip([audio_clip]).set_duration(audio_clip.duration)
-                    audio_clip = speedx(audio_clip, factor=speed_factor)
-
-                # Ensure the audio clip duration matches the desired duration
-                audio_clip = audio_clip.set_duration(desired_duration)
-
-                # Set the start time for the audio clip
-                audio_clip = audio_clip.set_start(subtitle.start.seconds + subtitle.start.milliseconds / 1000)
-                
-                audio_clips.append(audio_clip)
-                
-                # Remove the temporary audio file
-                os.remove(speech_file_path)
-            
-            # Combine all audio clips
-            final_audio = CompositeAudioClip(audio_clips)
-            final_audio.fps = 44100
-            
-            # Export the full audio
-            full_audio_path = os.path.join(speech_file_dir, 'full_generated_speech.mp3')
-            final_audio.write_audiofile(full_audio_path)
+            # Lines are synthesized concurrently (at most TTS_MAX_CONCURRENCY at a time), as WAV at the dub's
+            # sample rate so the assembler reads them without ffmpeg
+            semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+
+            async def synthesize(text):
+                async with semaphore:
+                    return await voice_service.synthesize(
+                        text, response_format="wav", sample_rate=DUBBING_SAMPLE_RATE, backend=tts_backend, language=target_language
+                    )
+
+            speech_paths = await asyncio.gather(*(synthesize(text) for _, _, text in translated_subtitles))
+            cues = [(start, end, speech_path) for (start, end, _), speech_path in zip(translated_subtitles, speech_paths)]
+
+            # Stretch each line to its subtitle timing and lay them all on one track, written once
+            full_audio_path = os.path.join(speech_file_dir, f'full_generated_speech{language_suffix(target_language)}.wav')
+            await asyncio.to_thread(assemble_dub, cues, full_audio_path)
             
             logging.info("Voice generated successfully for all subtitle lines.")
             return full_audio_path
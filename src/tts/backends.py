@@ -0,0 +1,334 @@
+import asyncio
+import atexit
+import glob
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+from ..media.pcm import get_ffmpeg_binary
+from ..providers.llm_clients import async_openai
+
+# Backend used when a job doesn't pick one: 'openai', 'espeak' or 'piper'
+DEFAULT_TTS_BACKEND = os.getenv('TTS_BACKEND', 'openai')
+
+# ffmpeg output options of every response format
+FFMPEG_FORMATS = {
+    'mp3': ['-f', 'mp3'],
+    'wav': ['-f', 'wav'],
+    'flac': ['-f', 'flac'],
+    'opus': ['-c:a', 'libopus', '-f', 'ogg'],
+    'aac': ['-c:a', 'aac', '-f', 'adts'],
+    'pcm': ['-f', 's16le']
+}
+
+# ISO 639-1 code of the language names jobs ask for, codes and locales ('pt-br') are also accepted as is
+LANGUAGE_CODES = {
+    'arabic': 'ar', 'bengali': 'bn', 'chinese': 'zh', 'mandarin': 'zh', 'czech': 'cs', 'danish': 'da',
+    'dutch': 'nl', 'english': 'en', 'finnish': 'fi', 'french': 'fr', 'german': 'de', 'greek': 'el',
+    'hebrew': 'he', 'hindi': 'hi', 'hungarian': 'hu', 'indonesian': 'id', 'italian': 'it', 'japanese': 'ja',
+    'korean': 'ko', 'malay': 'ms', 'norwegian': 'nb', 'persian': 'fa', 'polish': 'pl', 'portuguese': 'pt',
+    'brazilian portuguese': 'pt-br', 'romanian': 'ro', 'russian': 'ru', 'spanish': 'es', 'swahili': 'sw',
+    'swedish': 'sv', 'tamil': 'ta', 'thai': 'th', 'turkish': 'tr', 'ukrainian': 'uk', 'urdu': 'ur',
+    'vietnamese': 'vi'
+}
+
+
+def language_code(language):
+    """'pt-br' for 'Brazilian Portuguese', 'fr' for 'French' or 'fr', None if the language is unknown"""
+    name = re.sub(r'\s+', ' ', (language or '').strip().lower().replace('_', '-'))
+    if name in LANGUAGE_CODES:
+        return LANGUAGE_CODES[name]
+    if re.fullmatch(r'[a-z]{2,3}(-[a-z0-9]{2,4})?', name):
+        return name
+    return None
+
+
+def wav_bytes(pcm, sample_rate):
+    """Wrap 16-bit mono PCM in a WAV header with its real length (streamed WAVs carry a placeholder)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def resample_wav(content, content_format, input_rate, sample_rate):
+    """16-bit mono WAV at sample_rate from 16-bit mono PCM/WAV at input_rate, or None if it can't be done in-process.
+
+    Only upsampling is done here (linear interpolation adds no aliasing), which covers the offline voices
+    (22.05 kHz) going into a 24 kHz dub without an ffmpeg run per line.
+    """
+    if sample_rate < input_rate:
+        return None
+    if content_format == 'wav':
+        try:
+            with wave.open(io.BytesIO(content), 'rb') as wav_file:
+                if wav_file.getnchannels() != 1 or wav_file.getsampwidth() != 2:
+                    return None
+                input_rate = wav_file.getframerate()
+                # Piped WAVs (espeak --stdout) carry a placeholder frame count, read up to the end
+                content = wav_file.readframes(2 ** 31 - 1)
+        except (wave.Error, EOFError):
+            return None
+    samples = np.frombuffer(content[:len(content) - len(content) % 2], dtype='<i2').astype(np.float32)
+    if input_rate != sample_rate and len(samples):
+        positions = np.arange(int(round(len(samples) * sample_rate / input_rate))) * (input_rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return wav_bytes(np.clip(np.round(samples), -32768, 32767).astype('<i2').tobytes(), sample_rate)
+
+
+async def transcode(content, response_format, sample_rate, input_format=None, input_rate=None):
+    """Convert audio bytes to mono response_format at sample_rate with one ffmpeg run.
+
+    input_format 'pcm' is raw 16-bit mono at input_rate, anything else is probed by ffmpeg.
+    """
+    command = [get_ffmpeg_binary(), '-nostdin', '-loglevel', 'error']
+    if input_format == 'pcm':
+        command += ['-f', 's16le', '-ar', str(input_rate), '-ac', '1']
+    command += ['-i', 'pipe:0', '-ac', '1', '-ar', str(sample_rate)] + FFMPEG_FORMATS[response_format]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Written to a file, not a pipe, so ffmpeg can seek back and fill in the WAV/FLAC length
+        output_path = os.path.join(tmp_dir, f'speech.{response_format}')
+        process = await asyncio.create_subprocess_exec(*command, output_path, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        _, error = await process.communicate(content)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg could not convert the speech to {response_format}: {error.decode(errors='ignore').strip()}")
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+
+async def _run(command, stdin_text):
+    process = await asyncio.create_subprocess_exec(*command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    output, error = await process.communicate(stdin_text.encode('utf-8'))
+    if process.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(command[0])} failed: {error.decode(errors='ignore').strip()}")
+    return output
+
+
+class TTSBackend:
+    """A text to speech engine VoiceService can synthesize with.
+
+    Subclasses set their name, default model/voice and native sample rate and implement _generate, which
+    returns audio bytes in whatever format the engine produces ('pcm' being raw 16-bit mono at the native
+    rate). synthesize converts them to the requested format and sample rate when they differ.
+    """
+
+    name = None
+    default_model = None
+    default_voice = None
+    sample_rate = None
+
+    def available(self):
+        """Whether the backend can run here (binary installed, model present, ...)"""
+        return True
+
+    def cache_name(self, model):
+        """Model identity in VoiceService cache keys, distinct between backends"""
+        return f"{self.name}:{model}"
+
+    def for_language(self, language):
+        """(model, voice) that speak language, None for the defaults"""
+        return None, None
+
+    def model_sample_rate(self, model):
+        """Sample rate the engine produces with model"""
+        return self.sample_rate
+
+    async def _generate(self, text, model, voice, speed, response_format):
+        """Returns (audio bytes, their format)"""
+        raise NotImplementedError
+
+    async def synthesize(self, text, model=None, voice=None, speed=1.0, response_format="mp3", sample_rate=None):
+        """Audio bytes of text spoken by voice, in response_format at sample_rate (the engine's own rate if None)"""
+        if response_format not in FFMPEG_FORMATS:
+            raise ValueError(f"Unsupported TTS format {response_format}, use one of {', '.join(FFMPEG_FORMATS)}")
+        model = model or self.default_model
+        content, content_format = await self._generate(text, model, voice or self.default_voice, speed, response_format)
+        native_rate = self.model_sample_rate(model)
+        sample_rate = sample_rate or native_rate
+        if sample_rate == native_rate:
+            if content_format == 'pcm' and response_format == 'wav':
+                return wav_bytes(content, sample_rate)
+            if content_format == response_format != 'wav':
+                return content
+        if response_format == 'wav' and content_format in ('pcm', 'wav'):
+            resampled = resample_wav(content, content_format, native_rate, sample_rate)
+            if resampled is not None:
+                return resampled
+        return await transcode(content, response_format, sample_rate, content_format, native_rate)
+
+
+class OpenAITTSBackend(TTSBackend):
+    """OpenAI's hosted voices"""
+
+    name = 'openai'
+    default_model = 'tts-1'
+    default_voice = 'echo'
+    sample_rate = 24000
+
+    def cache_name(self, model):
+        # Bare model name, as in the keys written before there were other backends
+        return model
+
+    async def _generate(self, text, model, voice, speed, response_format):
+        # WAVs are built from raw PCM (24 kHz 16-bit mono), OpenAI streams them with a placeholder length
+        requested = 'pcm' if response_format in ('pcm', 'wav') else response_format
+        response = await async_openai().audio.speech.create(model=model, voice=voice, input=text, speed=speed, response_format=requested)
+        return response.content, requested
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng, offline and near instant, robotic voice: for drafts, previews and load tests"""
+
+    name = 'espeak'
+    default_model = 'espeak-ng'
+    default_voice = os.getenv('ESPEAK_VOICE', 'en-us')
+    sample_rate = 22050
+
+    def __init__(self):
+        self.binary = shutil.which('espeak-ng') or shutil.which('espeak')
+
+    def available(self):
+        return self.binary is not None
+
+    def for_language(self, language):
+        # espeak-ng voices are named after the language code ('fr', 'pt-br'), 'cmn' for Mandarin
+        code = language_code(language)
+        if code is None:
+            logging.warning(f"No espeak voice for {language}, using {self.default_voice}")
+            return None, None
+        return None, {'zh': 'cmn'}.get(code, code)
+
+    async def _generate(self, text, model, voice, speed, response_format):
+        # espeak speaks 175 words per minute at normal speed, the text goes through stdin
+        command = [self.binary, '-v', voice, '-s', str(int(175 * speed)), '--stdout', '--stdin']
+        return await _run(command, text), 'wav'
+
+
+class PiperBackend(TTSBackend):
+    """Piper neural voices, offline on CPU. The model is the path of a voice .onnx file, the voice a speaker id.
+
+    Loading a voice takes longer than speaking a line, so each (model, speaker, speed) keeps one piper process
+    alive that reads lines on stdin and writes one WAV per line, instead of a process per line.
+    """
+
+    name = 'piper'
+    default_model = os.getenv('PIPER_MODEL')
+    # Voices named like their language ('de_DE-thorsten-medium.onnx'), looked up by for_language
+    voices_dir = os.getenv('PIPER_VOICES_DIR')
+
+    def __init__(self):
+        self.binary = shutil.which('piper')
+        self._processes = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def available(self):
+        return self.binary is not None and bool(self.default_model) and os.path.exists(self.default_model)
+
+    @property
+    def sample_rate(self):
+        return self.model_sample_rate(self.default_model)
+
+    def model_sample_rate(self, model):
+        try:
+            with open(f"{model}.json", encoding='utf-8') as f:
+                return json.load(f)['audio']['sample_rate']
+        except (OSError, KeyError, TypeError, ValueError):
+            return 22050
+
+    def cache_name(self, model):
+        return f"{self.name}:{os.path.basename(model or '')}"
+
+    def for_language(self, language):
+        code = language_code(language)
+        if code and self.voices_dir:
+            prefix = code.split('-')[0]
+            models = sorted(glob.glob(os.path.join(self.voices_dir, f'{prefix}_*.onnx')))
+            # A voice of the exact locale ('pt_BR' for 'pt-br') first, then any voice of the language
+            exact = [path for path in models if os.path.basename(path).lower().startswith(code.replace('-', '_'))]
+            if exact or models:
+                return (exact or models)[0], None
+        logging.warning(f"No piper voice for {language}, using {self.default_model}")
+        return None, None
+
+    def _process(self, model, voice, speed):
+        """The running piper process of these settings, started if needed, with its output dir and lock"""
+        key = (model, voice, speed)
+        with self._lock:
+            entry = self._processes.get(key)
+            if entry is None or entry[0].poll() is not None:
+                output_dir = tempfile.mkdtemp(prefix='piper-')
+                command = [self.binary, '--model', model, '--output_dir', output_dir, '--length_scale', str(1 / speed)]
+                if voice is not None:
+                    command += ['--speaker', str(voice)]
+                process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+                entry = self._processes[key] = (process, output_dir, threading.Lock())
+            return entry
+
+    def _speak(self, text, model, voice, speed):
+        process, _, lock = self._process(model, voice, speed)
+        with lock:
+            try:
+                # One line in, the path of its WAV out
+                process.stdin.write(' '.join(text.split()) + '\n')
+                process.stdin.flush()
+                output_path = process.stdout.readline().strip()
+            except (BrokenPipeError, OSError) as e:
+                raise RuntimeError(f"piper exited: {e}")
+        if not output_path:
+            raise RuntimeError(f"piper exited with code {process.poll()}")
+        try:
+            with open(output_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(output_path)
+
+    async def _generate(self, text, model, voice, speed, response_format):
+        return await asyncio.to_thread(self._speak, text, model, voice, speed), 'wav'
+
+    def close(self):
+        """Stop the piper processes"""
+        with self._lock:
+            for process, output_dir, _ in self._processes.values():
+                if process.poll() is None:
+                    process.stdin.close()
+                    process.kill()
+                    process.wait()
+                shutil.rmtree(output_dir, ignore_errors=True)
+            self._processes.clear()
+
+
+_backends = {backend.name: backend for backend in (OpenAITTSBackend(), EspeakBackend(), PiperBackend())}
+
+
+def register_tts_backend(backend):
+    """Make a TTSBackend selectable by its name"""
+    _backends[backend.name] = backend
+
+
+def get_tts_backend(backend=None):
+    """TTSBackend by name (or the instance itself), DEFAULT_TTS_BACKEND if None"""
+    if isinstance(backend, TTSBackend):
+        return backend
+    name = backend or DEFAULT_TTS_BACKEND
+    if name not in _backends:
+        raise ValueError(f"Unknown TTS backend {name}, use one of {', '.join(_backends)}")
+    if not _backends[name].available():
+        raise RuntimeError(f"TTS backend {name} is not available on this machine")
+    return _backends[name]
+
+
+def available_tts_backends():
+    return [name for name, backend in _backends.items() if backend.available()]
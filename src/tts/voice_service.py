@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import unicodedata
+
+from ..providers.blob_store import BlobStore
+from .backends import get_tts_backend
+
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets', 'cache', 'tts'
+)
+
+
+def normalize_text(text):
+    """NFC, trimmed, whitespace collapsed: spacing differences don't change the speech"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class VoiceService(BlobStore):
+    """Text to speech behind a persistent content-addressed cache.
+
+    Audio is keyed by (normalized text, backend model, voice, speed, format, sample rate), so hooks, recurring
+    intros and retried jobs reuse the audio generated the first time. Files are stored, shared and evicted by
+    BlobStore.
+    """
+
+    name = 'Voice'
+
+    def __init__(self, cache_dir=None, max_bytes=None, min_age=3600):
+        super().__init__(
+            cache_dir or TTS_CACHE_DIR,
+            max_bytes or int(float(os.getenv('TTS_CACHE_MAX_MB', 512)) * 1024 * 1024),
+            min_age
+        )
+
+    @staticmethod
+    def cache_key(text, model, voice, speed, response_format, sample_rate=None):
+        fields = [normalize_text(text), model, voice, round(float(speed), 3), response_format]
+        if sample_rate:
+            fields.append(int(sample_rate))
+        payload = json.dumps(fields)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def synthesize(self, text, model=None, voice=None, speed=1.0, response_format="mp3", sample_rate=None, backend=None, language=None):
+        """Path of an audio file of text spoken with the given settings, generated only on a cache miss.
+
+        The file belongs to the cache: use it in place and don't delete it.
+
+        Args:
+            text (str): Text to speak
+            model (str, optional): Backend model. Defaults to the backend's (tts-1 for OpenAI)
+            voice (str, optional): Backend voice. Defaults to the backend's (echo for OpenAI)
+            speed (float, optional): Speaking rate. Defaults to 1.0
+            response_format (str, optional): mp3, wav, flac, opus, aac or pcm. Defaults to "mp3"
+            sample_rate (int, optional): Output sample rate. Defaults to the backend's own
+            backend (str or TTSBackend, optional): 'openai', 'espeak', 'piper'... Defaults to TTS_BACKEND
+            language (str, optional): Language of text, picks the model/voice of the offline backends. Defaults to None
+        """
+        backend = get_tts_backend(backend)
+        if language and not (model and voice):
+            language_model, language_voice = backend.for_language(language)
+            model, voice = model or language_model, voice or language_voice
+        model = model or backend.default_model
+        voice = voice or backend.default_voice
+        key = self.cache_key(text, backend.cache_name(model), voice, speed, response_format, sample_rate)
+        path = await asyncio.to_thread(self.get, key)
+        if path:
+            logging.info(f"Voice cache hit ({self.hit_rate:.0%} hit rate): {path}")
+            return path
+
+        content = await backend.synthesize(text, model, voice, speed, response_format, sample_rate)
+        path = await asyncio.to_thread(self.put, key, content, f".{response_format}")
+        logging.info(f"Voice generated with {backend.name} and cached ({self.hit_rate:.0%} hit rate): {path}")
+        return path
+
+
+voice_service = VoiceService()
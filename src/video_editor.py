@@ -2,7 +2,6 @@ import os
 import logging
 import requests
 from moviepy.editor import VideoFileClip, AudioFileClip, TextClip, CompositeVideoClip, ImageClip
-from openai import OpenAI
 import pysrt
 from yt_dlp import YoutubeDL
 from pathlib import Path
@@ -12,6 +11,13 @@ import json  # Added import for JSON operations
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
+from .captions.ass_writer import ass_filter
+from .captions.font_registry import font_registry, load_font
+from .providers.http_client import DEFAULT_TIMEOUT, MAX_RETRIES
+from .providers.image_cache import image_cache
+from .providers.llm_clients import async_openrouter
+from .providers.local_library import local_library
+from .tts.voice_service import voice_service
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -24,11 +30,6 @@ openai_api_key = os.getenv('OPENAI_API_KEY')
 
 class VideoEditor:
     def __init__(self):
-        self.openai = OpenAI(api_key=openai_api_key)
-        self.openrouter = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY")
-        )
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
 
     def create_text_clip(self, text, fontsize=50, color='white', bg_color=None, font='Arial', video_width=1920, video_height=1080):
@@ -37,7 +38,7 @@ class VideoEditor:
             # Try to load the specified font
             font_path = self.get_font_path(font)
             if font_path:
-                font = ImageFont.truetype(font_path, fontsize)
+                font = load_font(font_path, fontsize)
             else:
                 # Fallback to default font
                 font = ImageFont.load_default()
@@ -95,20 +96,8 @@ class VideoEditor:
             return None
 
     def get_font_path(self, font_name):
-        """Try to locate the font file"""
-        # Look for the font in the 'fonts' directory
-        font_path = os.path.join(self.base_dir, 'fonts', font_name)
-        if os.path.exists(font_path):
-            return font_path
-        
-        # Try system fonts
-        try:
-            from matplotlib.font_manager import findfont, FontProperties
-            return findfont(FontProperties(family=font_name))
-        except ImportError:
-            logging.warning("matplotlib not installed, using default font")
-        
-        return None
+        """Try to locate the font file in the bundled and system fonts"""
+        return font_registry.find(font_name)
 
     def download_video(self, youtube_url):
         try:
@@ -120,12 +109,16 @@ class VideoEditor:
                 'postprocessors': [{
                     'key': 'FFmpegVideoConvertor',
                     'preferedformat': 'mp4',
-                }]
+                }],
+                # Same timeout and retry policy as the provider HTTP client
+                'socket_timeout': DEFAULT_TIMEOUT,
+                'retries': MAX_RETRIES,
+                'fragment_retries': MAX_RETRIES
             }
             
             with YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
-                info_dict = ydl.extract_info(youtube_url, download=False)
+                # One extraction that also downloads, instead of downloading and then fetching the metadata again
+                info_dict = ydl.extract_info(youtube_url, download=True)
                 video_path = ydl.prepare_filename(info_dict)
                 # Ensure the video path is in mp4 format
                 if not video_path.endswith('.mp4'):
@@ -158,7 +151,7 @@ class VideoEditor:
     # Create antoher class to handle ai generation
     async def generate_script(self, topic, prompt_template):
         try:
-            completion = self.openrouter.chat.completions.create(
+            completion = await async_openrouter().chat.completions.create(
                 model="mistralai/mistral-7b-instruct:free",
                 max_tokens=400,
                 response_format={"type": "json_object"},
@@ -207,7 +200,7 @@ class VideoEditor:
 
     async def gpt_summary_of_script(self, video_script: str) -> str:
         try:
-            completion = self.openrouter.chat.completions.create(
+            completion = await async_openrouter().chat.completions.create(
                 model="mistralai/mistral-7b-instruct:free",
                 temperature=0.25,
                 max_tokens=250,
@@ -226,7 +219,7 @@ class VideoEditor:
     
     async def gpt_image_prompt_from_scene(self, scene, script_summary):
         try:
-            completion = self.openrouter.chat.completions.create(
+            completion = await async_openrouter().chat.completions.create(
                 model="mistralai/mistral-7b-instruct:free",
                 temperature=0.25,
                 messages=[
@@ -276,7 +269,7 @@ class VideoEditor:
             }
         """
         try:
-            completion = self.openrouter.chat.completions.create(
+            completion = await async_openrouter().chat.completions.create(
                 model="mistralai/mistral-7b-instruct:free",
                 temperature=0.25,
                 response_format={"type": "json_object"},
@@ -296,19 +289,13 @@ class VideoEditor:
             logging.error(f"Error creating scenes from script: {e}")
             return script
     # Create antoher class to handle ai generation
-    async def generate_voice(self, script):
+    async def generate_voice(self, script, tts_backend=None):
+        """Voice-over of the script, from the shared voice cache. The file must not be deleted by the caller.
+
+        tts_backend picks the TTS engine ('openai', or 'espeak'/'piper' for offline drafts), TTS_BACKEND if None.
+        """
         try:
-            unique_id = uuid.uuid4()
-            assets_dir = os.path.join(self.base_dir, '..', 'assets')
-            os.makedirs(assets_dir, exist_ok=True)
-            speech_file_path = os.path.join(assets_dir, f"voice_{unique_id}.mp3")
-            
-            response = self.openai.audio.speech.create(
-                model="tts-1",
-                voice="echo",
-                input=script
-            )
-            response.stream_to_file(speech_file_path)
+            speech_file_path = await voice_service.synthesize(script, backend=tts_backend)
             logging.info("Voice generated successfully.")
             return speech_file_path
         except Exception as e:
@@ -381,8 +368,16 @@ class VideoEditor:
         for i, image_path in enumerate(images):
             if image_path is not None:
                 try:
+                    # A third of the video high. The size comes from the cache index, images are decoded once,
+                    # already at their final size
+                    image_size = image_cache.dimensions(image_path)
+                    if image_size is None:
+                        with Image.open(image_path) as img:
+                            image_size = img.size
+                    image_width, image_height = image_size
+                    scale = video_clip.h / 3 / image_height
                     image_clip = ImageClip(image_path).set_duration(image_duration)
-                    image_clip = image_clip.set_position(('center', 70)).resize(height=video_clip.h / 3)
+                    image_clip = image_clip.set_position(('center', 70)).resize(newsize=(round(image_width * scale), round(image_height * scale)))
                     
                     # Calculate start time for each image
                     start_time = i * image_duration
@@ -398,8 +393,11 @@ class VideoEditor:
         
         return CompositeVideoClip(clips)
 
-    def render_final_video(self, final_clip) -> str:
-        """Render the final video with all components added."""
+    def render_final_video(self, final_clip, ass_captions_path=None) -> str:
+        """Render the final video with all components added.
+
+        If ass_captions_path is given, the captions are burned in by ffmpeg (libass) during this encode.
+        """
         unique_id = uuid.uuid4()
         result_dir = os.path.abspath(os.path.join(self.base_dir, '../result'))
         os.makedirs(result_dir, exist_ok=True)
@@ -413,12 +411,16 @@ class VideoEditor:
             height -= 1
         
         final_clip = final_clip.resize(newsize=(width, height))
+
+        ffmpeg_params = ['-crf', '10', '-pix_fmt', 'yuv420p']
+        if ass_captions_path:
+            ffmpeg_params += ['-vf', ass_filter(ass_captions_path)]
         
         final_clip.write_videofile(
             output_path,
             codec='libx264',
             preset='veryfast',
-            ffmpeg_params=['-crf', '10', '-pix_fmt', 'yuv420p'],
+            ffmpeg_params=ffmpeg_params,
             audio_codec='aac',
             audio_bitrate='128k',
             fps=30
@@ -432,6 +434,8 @@ class VideoEditor:
         """Delete temporary files and generated images to clean up the workspace."""
         # Clean up temporary files
         for file_path in file_paths:
+            if file_path and voice_service.contains(file_path):
+                continue  # Cached voice-overs are shared with other jobs, the cache evicts them
             try:
                 if os.path.exists(file_path):
                     os.remove(file_path)
@@ -444,6 +448,8 @@ class VideoEditor:
         # Clean up generated images
         if image_paths:
             for image_path in image_paths:
+                if image_path and (image_cache.contains(image_path) or local_library.contains(image_path)):
+                    continue  # Cached and library images are shared with other jobs
                 try:
                     if os.path.exists(image_path):
                         os.remove(image_path)
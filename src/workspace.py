@@ -0,0 +1,91 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+WORKSPACE_ROOT = os.getenv('WORKSPACE_ROOT') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workspaces'
+)
+# Intermediates (extracted audio, dubbed tracks, caption files) can live on a tmpfs such as /dev/shm
+WORKSPACE_SCRATCH_ROOT = os.getenv('WORKSPACE_SCRATCH_ROOT')
+# Keep workspaces after the job for debugging
+KEEP_WORKSPACES = os.getenv('KEEP_WORKSPACES', '').lower() in ('1', 'true', 'yes')
+# Workspaces left behind by a killed process are removed once they are this old
+STALE_WORKSPACE_AGE = float(os.getenv('STALE_WORKSPACE_AGE', 24 * 3600))
+# Scratch directories go in this subdirectory of the scratch root, the only part of it swept for stale ones
+SCRATCH_SUBDIR = 'aishorts-workspaces'
+
+
+class JobWorkspace:
+    """Private directories for one job, deleted when the job ends whether it succeeded or failed.
+
+    Every job gets a unique directory under root (and one under scratch_root/aishorts-workspaces for
+    intermediates, if set), so concurrent jobs never share a path.
+
+    Usage:
+        with JobWorkspace() as workspace:
+            audio_path = workspace.scratch_file('extracted_audio.mp3')
+    """
+
+    def __init__(self, job_id=None, root=None, scratch_root=None, keep=None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.root = os.path.abspath(root or WORKSPACE_ROOT)
+        self.scratch_root = scratch_root or WORKSPACE_SCRATCH_ROOT
+        # The scratch root (/dev/shm, /tmp) is shared with other programs, so only a directory of our own is used
+        self.scratch_base = os.path.join(os.path.abspath(self.scratch_root), SCRATCH_SUBDIR) if self.scratch_root else None
+        self.keep = KEEP_WORKSPACES if keep is None else keep
+        self.path = None
+        self.scratch_dir = None
+
+    def __enter__(self):
+        os.makedirs(self.root, exist_ok=True)
+        remove_stale_workspaces(self.root)
+        self.path = tempfile.mkdtemp(prefix=f"{self.job_id}-", dir=self.root)
+        if self.scratch_base:
+            os.makedirs(self.scratch_base, exist_ok=True)
+            remove_stale_workspaces(self.scratch_base)
+            self.scratch_dir = tempfile.mkdtemp(prefix=f"{self.job_id}-", dir=self.scratch_base)
+        else:
+            self.scratch_dir = os.path.join(self.path, 'scratch')
+            os.makedirs(self.scratch_dir)
+        logging.info(f"Workspace of job {self.job_id}: {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def file(self, name):
+        """Path of a file in the job directory"""
+        return os.path.join(self.path, name)
+
+    def scratch_file(self, name):
+        """Path of an intermediate file, on the scratch root if one is configured"""
+        return os.path.join(self.scratch_dir, name)
+
+    def cleanup(self):
+        if self.keep:
+            logging.info(f"Keeping the workspace of job {self.job_id}: {self.path}")
+            return
+        for directory in (self.scratch_dir, self.path):
+            if directory and os.path.isdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+        logging.info(f"Workspace of job {self.job_id} removed")
+
+
+def remove_stale_workspaces(root, max_age=STALE_WORKSPACE_AGE):
+    """Delete workspaces under root that are older than max_age seconds"""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logging.info(f"Removed stale workspace {entry.path}")
+        except OSError as e:
+            logging.error(f"Could not remove stale workspace {entry.path}: {e}")